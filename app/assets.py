@@ -0,0 +1,127 @@
+"""
+Static asset pipeline, run once when the app is built.
+
+- Every file under `app/static` is served from memory at `/assets/<name>.<hash>.<ext>`,
+  where the hash is taken from its content (after rewriting its own references), so it
+  can be cached forever (`immutable`).
+- References to `/static/...` in the CSS, JS, partials and `index.html` are rewritten to
+  the fingerprinted URLs.
+- The HTML partials are inlined into `index.html` as `<template>` elements, so a repeat
+  visit needs one small, revalidated request for the page and nothing else.
+- Text assets are precompressed with gzip, and brotli when the package is installed.
+
+The plain `/static` and `/partials` mounts stay available for pages cached before.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional
+from app.logger import logger
+from app.statefile import parse_accept_encoding
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+STATIC_DIR = Path("app/static")
+TEMPLATES_DIR = Path("app/templates")
+ASSETS_URL = "/assets/"
+HASH_LENGTH = 12
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json"}
+MIN_COMPRESS_SIZE = 256  # bytes; smaller files are not worth an encoded variant
+# Build order: files that others refer to first
+BUILD_ORDER = {".css": 1, ".js": 2}
+STATIC_REFERENCE = re.compile(r"/static/([A-Za-z0-9_./-]+)")
+
+
+class Asset:
+    """
+    One in-memory file and its precompressed variants, keyed by content encoding.
+    """
+    __slots__ = ("content_type", "digest", "bodies")
+
+    def __init__(self, data: bytes, content_type: str, compress: bool):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(data).hexdigest()[:32]
+        self.bodies = {"identity": data}
+        if compress and len(data) >= MIN_COMPRESS_SIZE:
+            self.bodies["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(data, quality=11)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        """
+        Pick the smallest encoding the client accepts.
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return "identity"
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+class Assets:
+    """
+    Singleton-like registry of the fingerprinted assets and the built `index.html`.
+    """
+    files: Dict[str, Asset] = {}
+    urls: Dict[str, str] = {}  # "/static/<path>" to its fingerprinted URL
+    index: Asset = None
+
+    @classmethod
+    def build(cls):
+        """
+        Fingerprint and precompress the static files, then build `index.html`.
+        """
+        files, urls = {}, {}
+        paths = sorted(
+            (p for p in STATIC_DIR.rglob("*") if p.is_file()),
+            key=lambda p: (BUILD_ORDER.get(p.suffix, 0), str(p)),
+        )
+        for path in paths:
+            data = path.read_bytes()
+            if path.suffix in COMPRESSIBLE:
+                data = cls.rewrite(data.decode("utf-8"), urls).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            relative = path.relative_to(STATIC_DIR)
+            name = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}").as_posix()
+            files[name] = Asset(data, guess_type(path), path.suffix in COMPRESSIBLE)
+            urls[f"/static/{relative.as_posix()}"] = ASSETS_URL + name
+
+        html = (TEMPLATES_DIR / "index.html").read_text(encoding="utf-8")
+        templates = "".join(
+            f'\n    <template id="partial-{partial.stem}">\n'
+            f'{cls.rewrite(partial.read_text(encoding="utf-8"), urls)}\n    </template>'
+            for partial in sorted((TEMPLATES_DIR / "partials").glob("*.html"))
+        )
+        html = cls.rewrite(html, urls).replace("</body>", f"{templates}\n</body>", 1)
+
+        cls.files, cls.urls = files, urls
+        cls.index = Asset(html.encode("utf-8"), "text/html; charset=utf-8", True)
+        size = sum(len(asset.bodies["identity"]) for asset in files.values())
+        logger.debug(f"{len(files)} static assets fingerprinted ({size} bytes), {len(templates)} bytes of partials inlined")
+
+    @classmethod
+    def rewrite(cls, text: str, urls: Dict[str, str]) -> str:
+        """
+        Replace `/static/...` references with the fingerprinted URLs built so far.
+        """
+        return STATIC_REFERENCE.sub(lambda m: urls.get(m.group(0), m.group(0)), text)
+
+    @classmethod
+    def get(cls, name: str) -> Optional[Asset]:
+        return cls.files.get(name)
+
+
+def guess_type(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or path.suffix in (".js", ".svg", ".json"):
+        content_type += "; charset=utf-8"
+    return content_type
@@ -1,14 +1,108 @@
 """
 Handles user authentication using username/password pairs from the configuration.
 Provides a dependency for protecting routes and identifying the current user.
+
+Passwords may be stored in plain text (`password`) or hashed (`password_hash`).
+Since verifying a hash is deliberately slow, successfully verified credentials are
+cached for a short time, so only the first request of a session pays for it.
 """
 
+import hmac
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Header
 from app.config import Config
+from app.logger import logger
+from app.metrics import Metrics
+from app.passwords import verify_password, check_hash_format, dummy_hash
 from base64 import b64decode
 
+SESSION_CACHE_SIZE = 256  # verified credentials kept in memory
+SESSION_CACHE_TTL = 10 * 60  # seconds before credentials are verified again
+
+
+def load_credentials() -> dict:
+    """
+    Build {username: (kind, secret)} from the configured users,
+    where kind is "plain" or "hash".
+    """
+    credentials = {}
+    for user in Config.get("users"):
+        username = str(user["username"])
+        if "password_hash" in user:
+            password_hash = str(user["password_hash"])
+            try:
+                check_hash_format(password_hash)
+            except ValueError as e:
+                logger.error(f"Invalid password_hash for user '{username}': {e}")
+                continue
+            credentials[username] = ("hash", password_hash)
+        else:
+            credentials[username] = ("plain", str(user["password"]))
+    return credentials
+
+USER_CREDENTIALS = load_credentials()
+
+
+class SessionCache:
+    """
+    LRU cache of recently verified Authorization headers, with expiry.
+    Keys are keyed HMACs of the header, so no credentials are kept in memory.
+    Used from threadpool threads (`get_current_user`), the event loop (rate limiting)
+    and the config watcher thread, hence the lock.
+    """
+    _key = secrets.token_bytes(32)
+    _entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def fingerprint(cls, authorization: str) -> bytes:
+        return hmac.new(cls._key, authorization.encode("utf-8"), hashlib.sha256).digest()
+
+    @classmethod
+    def get(cls, fingerprint: bytes):
+        """
+        Return the cached username, or None if unknown or expired.
+        """
+        with cls._lock:
+            entry = cls._entries.get(fingerprint)
+            if entry is None:
+                return None
+            username, expires = entry
+            if expires < time.monotonic() or username not in USER_CREDENTIALS:
+                del cls._entries[fingerprint]
+                return None
+            cls._entries.move_to_end(fingerprint)
+            return username
+
+    @classmethod
+    def put(cls, fingerprint: bytes, username: str):
+        with cls._lock:
+            cls._entries[fingerprint] = (username, time.monotonic() + SESSION_CACHE_TTL)
+            cls._entries.move_to_end(fingerprint)
+            while len(cls._entries) > SESSION_CACHE_SIZE:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+
+def reload_credentials():
+    """
+    Apply a reloaded user list and drop all cached sessions.
+    """
+    global USER_CREDENTIALS
+    USER_CREDENTIALS = load_credentials()
+    SessionCache.clear()
+    logger.info(f"User credentials reloaded ({len(USER_CREDENTIALS)} users).")
+
+Config.on_reload(reload_credentials)
 
-USER_CREDENTIALS = {user["username"]: str(user["password"]) for user in Config.get("users")}
 
 def authenticate_user(username: str, password: str) -> bool:
     """
@@ -16,8 +110,32 @@ def authenticate_user(username: str, password: str) -> bool:
     Returns:
         bool: True if the credentials are valid, False otherwise.
     """
+    credential = USER_CREDENTIALS.get(username)
+    if credential is None:
+        # Take as long as for a known user, so response times do not reveal which users exist
+        check_dummy_password(password)
+        return False
+    kind, secret = credential
+    if kind == "plain":
+        return hmac.compare_digest(secret.encode("utf-8"), password.encode("utf-8"))
+    try:
+        return verify_password(password, secret)
+    except ValueError as e:
+        logger.error(f"Cannot verify password of user '{username}': {e}")
+        return False
 
-    return USER_CREDENTIALS.get(username) == password
+def check_dummy_password(password: str):
+    """
+    Verify `password` against a hash like the first configured one, which matches nothing.
+    """
+    hashes = [secret for kind, secret in USER_CREDENTIALS.values() if kind == "hash"]
+    try:
+        if hashes:
+            verify_password(password, dummy_hash(hashes[0]))
+        else:
+            hmac.compare_digest(secrets.token_bytes(16), password.encode("utf-8"))
+    except ValueError:
+        pass
 
 def get_current_user(authorization: str = Header(None)) -> str:
     """
@@ -26,18 +144,28 @@ def get_current_user(authorization: str = Header(None)) -> str:
         HTTPException: If authentication fails.
     """
     if not authorization or not authorization.startswith("Basic "):
+        Metrics.auth_failures["missing"].inc()
         raise HTTPException(status_code=401, detail="Authorization header missing or invalid")
 
+    # Recently verified credentials skip the (slow) password check
+    fingerprint = SessionCache.fingerprint(authorization)
+    username = SessionCache.get(fingerprint)
+    if username is not None:
+        return username
+
     # Decode the Basic Auth credentials
     try:
         encoded_credentials = authorization.split(" ")[1]
         decoded_credentials = b64decode(encoded_credentials).decode("utf-8")
-        username, password = decoded_credentials.split(":")
+        username, password = decoded_credentials.split(":", 1)
     except Exception:
+        Metrics.auth_failures["malformed"].inc()
         raise HTTPException(status_code=401, detail="Invalid Authorization header format")
 
     # Validate the credentials
     if authenticate_user(username, password):
+        SessionCache.put(fingerprint, username)
         return username
 
-    raise HTTPException(status_code=401, detail="Invalid username or password")
\ No newline at end of file
+    Metrics.auth_failures["invalid"].inc()
+    raise HTTPException(status_code=401, detail="Invalid username or password")
@@ -1,18 +1,36 @@
 """
 Loads and provides access to the application configuration from `config.yaml`.
+
+The user configuration is merged over the defaults and flattened into an immutable
+snapshot, so every lookup is a single dict access. `ConfigWatcher` reloads the file
+when it changes and swaps the snapshot atomically once it has been validated.
 """
 
+import ipaddress
+import re
 import yaml
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, List
 from app.logger import logger
 import os
 
+RELOAD_INTERVAL = 2  # seconds between config.yaml modification checks
+INSTANCE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+RATE_LIMIT = re.compile(r"^\s*[1-9]\d*\s*/\s*(second|minute|hour|day)\s*$")
+
+
 class Config:
     """
     Singleton class for loading and accessing configuration settings.
     """
     _config: dict = None
     _default: dict = None
+    _snapshot: MappingProxyType = MappingProxyType({})
+    _path: Path = None
+    _mtime: float = None
+    _listeners: List[Callable[[], None]] = []
 
     @classmethod
     def load_config(cls, config_path: Path):
@@ -21,12 +39,20 @@ class Config:
         """
         if not config_path.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
+        mtime = config_path.stat().st_mtime
         with config_path.open("r", encoding="utf-8") as file:
-            cls._config = yaml.safe_load(file)
+            config = yaml.safe_load(file)
 
-        if cls._config is None:
+        if config is None:
             raise ValueError("Configuration file is empty or invalid.")
 
+        snapshot = build_snapshot(cls._default or {}, config)
+        validate(snapshot)
+        cls._config = config
+        cls._snapshot = snapshot
+        cls._path = config_path
+        cls._mtime = mtime
+
         logger.info("Configuration loaded successfully.")
 
     @classmethod
@@ -38,9 +64,9 @@ class Config:
         with default_config_path.open("r", encoding="utf-8") as file:
             cls._default = yaml.safe_load(file)
 
-        dcs_mission_dir = os.path.expanduser("~\\Saved Games\\DCS.release_server\\Missions") 
+        dcs_mission_dir = os.path.expanduser("~\\Saved Games\\DCS.release_server\\Missions")
         cls._default["server"]["dcs_mission_dir"] = dcs_mission_dir
-        
+        cls._snapshot = build_snapshot(cls._default, cls._config or {})
 
     @classmethod
     def get(cls, key: str):
@@ -49,23 +75,56 @@ class Config:
         Supports nested keys using dot notation (e.g., "server.dcs_saved_game_dir").
 
         When a key is not found, it will return the default value from the default config.
+        Returned values are read-only (mappings and tuples).
+        """
+        try:
+            return cls._snapshot[key]
+        except KeyError:
+            raise KeyError(f"Key '{key}' not found in configuration.")
+
+    @classmethod
+    def on_reload(cls, callback: Callable[[], None]):
+        """
+        Register a callback to run after the configuration has been reloaded.
         """
+        cls._listeners.append(callback)
+
+    @classmethod
+    def reload_if_changed(cls) -> bool:
+        """
+        Reload the configuration file if it was modified.
+        An invalid file is logged and ignored, keeping the current configuration.
+        Returns:
+            bool: True if a new configuration was applied.
+        """
+        if cls._path is None:
+            return False
+        try:
+            mtime = cls._path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == cls._mtime:
+            return False
+
+        try:
+            cls.load_config(cls._path)
+        except OSError as e:
+            # Briefly missing (saved by rename) or locked: retried on the next poll
+            logger.debug(f"Cannot read config.yaml yet: {e}")
+            return False
+        except (ValueError, KeyError, TypeError, yaml.YAMLError) as e:
+            cls._mtime = mtime
+            logger.error(f"Error reloading config.yaml, keeping previous configuration: {e}")
+            return False
+
+        for callback in cls._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error applying reloaded configuration: {e}")
+        logger.info("Configuration reloaded. Server paths and app host/port still require a restart.")
+        return True
 
-        keys = key.split(".")
-        config = cls._config or {}
-        default_config = cls._default or {}
-
-        for k in keys:
-            if k in config:
-                config = config[k]
-            elif k in default_config:
-                config = default_config[k]
-            else:
-                raise KeyError(f"Key '{key}' not found in configuration.")
-            default_config = default_config.get(k, {})
-
-        return config
-    
     @classmethod
     def get_user_home_dir(cls) -> str:
         """
@@ -77,11 +136,200 @@ class Config:
         return os.path.expanduser("~")
 
 
-# Load the configuration at startup
-Config.load_default()
-try:
-    Config.load_config(Path("config.yaml"))
-except (FileNotFoundError, ValueError, KeyError) as e:
-    logger.error(f"Error loading config.yaml: {e}")
-    input("Press Enter to exit...")
-    exit(1)
+class ConfigWatcher:
+    """
+    Singleton-like daemon thread polling `config.yaml` for changes.
+    """
+    _thread: threading.Thread = None
+    _stop = threading.Event()
+
+    @classmethod
+    def start(cls):
+        if cls._thread and cls._thread.is_alive():
+            return
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._run, name="config-watcher", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+
+    @classmethod
+    def _run(cls):
+        while not cls._stop.wait(RELOAD_INTERVAL):
+            try:
+                Config.reload_if_changed()
+            except Exception as e:
+                logger.exception(f"Error watching config.yaml: {e}")
+
+
+def build_snapshot(default: dict, config: dict) -> MappingProxyType:
+    """
+    Merge `config` over `default` and flatten it into {"dotted.key": value},
+    including an entry for every intermediate mapping.
+    """
+    flat = {}
+
+    def flatten(prefix: str, value):
+        value = freeze(value)
+        if prefix:
+            flat[prefix] = value
+        if isinstance(value, MappingProxyType):
+            for k, v in value.items():
+                flatten(f"{prefix}.{k}" if prefix else str(k), v)
+
+    flatten("", merge(default, config))
+    return MappingProxyType(flat)
+
+def merge(default, config):
+    """
+    Recursively merge two mappings, values from `config` taking precedence.
+    """
+    if isinstance(default, dict) and isinstance(config, dict):
+        merged = dict(default)
+        for k, v in config.items():
+            merged[k] = merge(default.get(k), v) if k in default else v
+        return merged
+    return config
+
+def freeze(value):
+    """
+    Return a read-only copy of a parsed YAML value.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def validate(snapshot: MappingProxyType):
+    """
+    Check the settings that can be changed without a restart.
+    Raises:
+        ValueError: If a setting is invalid.
+    """
+    users = snapshot.get("users")
+    if not users or not isinstance(users, tuple):
+        raise ValueError("'users' must be a non-empty list.")
+    for user in users:
+        if not isinstance(user, MappingProxyType) or "username" not in user:
+            raise ValueError("Each user needs a 'username'.")
+        if "password" not in user and "password_hash" not in user:
+            raise ValueError(f"User '{user['username']}' needs a 'password' or 'password_hash'.")
+
+    filenames = snapshot.get("app.allowed_filenames")
+    if not isinstance(filenames, tuple) or not all(isinstance(f, str) for f in filenames):
+        raise ValueError("'app.allowed_filenames' must be a list of file names.")
+
+    max_size = snapshot.get("app.allowed_max_size")
+    if not isinstance(max_size, int) or max_size < 0:
+        raise ValueError("'app.allowed_max_size' must be a non-negative integer.")
+
+    for key in ("server.max_running_time", "server.idle_shutdown"):
+        check_minutes(key, snapshot.get(key))
+    check_placement("server", snapshot.get("server"))
+    check_launcher("server", snapshot.get("server"))
+
+    instances = snapshot.get("instances")
+    if not isinstance(instances, tuple):
+        raise ValueError("'instances' must be a list.")
+    names = {snapshot.get("server.name")}
+    for instance in instances:
+        if not isinstance(instance, MappingProxyType) or "name" not in instance or "dcs_mission_dir" not in instance:
+            raise ValueError("Each instance needs a 'name' and a 'dcs_mission_dir'.")
+        name = instance["name"]
+        if not isinstance(name, str) or not INSTANCE_NAME.match(name):
+            raise ValueError(f"Invalid instance name '{name}', use letters, digits, '.', '_' or '-'.")
+        if name in names:
+            raise ValueError(f"Duplicate instance name '{name}'.")
+        names.add(name)
+        for key in ("max_running_time", "idle_shutdown"):
+            if key in instance:
+                check_minutes(f"instances.{name}.{key}", instance[key])
+        check_placement(f"instances.{name}", instance)
+        check_launcher(f"instances.{name}", instance)
+
+    interval = snapshot.get("app.resource_sample_interval")
+    if not isinstance(interval, (int, float)) or interval <= 0:
+        raise ValueError("'app.resource_sample_interval' must be a positive number.")
+
+    history = snapshot.get("app.resource_history")
+    if not isinstance(history, int) or history < 1:
+        raise ValueError("'app.resource_history' must be a positive integer.")
+
+    for key in ("app.state_history_max_size", "app.state_history_max_days"):
+        value = snapshot.get(key)
+        if not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"'{key}' must be a non-negative number.")
+
+    reserved = snapshot.get("app.reserved_cores")
+    if not isinstance(reserved, int) or reserved < 0:
+        raise ValueError("'app.reserved_cores' must be a non-negative integer.")
+
+    if snapshot.get("app.log_format") not in ("text", "json"):
+        raise ValueError("'app.log_format' must be 'text' or 'json'.")
+    log_max_size = snapshot.get("app.log_max_size")
+    if not isinstance(log_max_size, (int, float)) or log_max_size < 0:
+        raise ValueError("'app.log_max_size' must be a non-negative number.")
+    if not isinstance(snapshot.get("app.log_daily_rotation"), bool):
+        raise ValueError("'app.log_daily_rotation' must be true or false.")
+    log_backups = snapshot.get("app.log_backups")
+    if not isinstance(log_backups, int) or log_backups < 0:
+        raise ValueError("'app.log_backups' must be a non-negative integer.")
+
+    for route in ("control", "upload", "read", "static", "auth"):
+        limit = snapshot.get(f"app.rate_limits.{route}")
+        if limit != 0 and not (isinstance(limit, str) and RATE_LIMIT.match(limit)):
+            raise ValueError(f"'app.rate_limits.{route}' must be '<count>/<second|minute|hour|day>' or 0.")
+    proxies = snapshot.get("app.trusted_proxies")
+    if not isinstance(proxies, tuple):
+        raise ValueError("'app.trusted_proxies' must be a list of addresses.")
+    for proxy in proxies:
+        try:
+            ipaddress.ip_network(str(proxy), strict=False)
+        except ValueError:
+            raise ValueError(f"Invalid address '{proxy}' in 'app.trusted_proxies'.")
+
+def check_minutes(key: str, minutes):
+    if not isinstance(minutes, (int, float)) or minutes < 0:
+        raise ValueError(f"'{key}' must be a non-negative number of minutes.")
+
+def check_placement(prefix: str, block: MappingProxyType):
+    """
+    Check the CPU placement settings of the `server` block or of an instance.
+    """
+    from app.placement import CPU_PRIORITIES, IO_PRIORITIES
+
+    affinity = block.get("cpu_affinity", "auto")
+    if affinity not in ("auto", "all") and not (
+        isinstance(affinity, tuple) and affinity
+        and all(isinstance(core, int) and not isinstance(core, bool) and core >= 0 for core in affinity)
+    ):
+        raise ValueError(f"'{prefix}.cpu_affinity' must be 'auto', 'all' or a list of core numbers.")
+    if block.get("cpu_priority", "high") not in CPU_PRIORITIES:
+        raise ValueError(f"'{prefix}.cpu_priority' must be one of: {', '.join(CPU_PRIORITIES)}.")
+    if block.get("io_priority") not in (None, *IO_PRIORITIES):
+        raise ValueError(f"'{prefix}.io_priority' must be empty or one of: {', '.join(IO_PRIORITIES)}.")
+
+def check_launcher(prefix: str, block: MappingProxyType):
+    from app.launcher import Launcher
+
+    launcher = block.get("launcher", "direct")
+    if launcher not in Launcher.launchers:
+        raise ValueError(f"'{prefix}.launcher' must be one of: {', '.join(Launcher.launchers)}.")
+
+
+def load_or_exit():
+    """
+    Load the default and user configuration once, exiting with a message on error.
+    """
+    if Config._path is not None:
+        return
+    Config.load_default()
+    try:
+        Config.load_config(Path("config.yaml"))
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        logger.error(f"Error loading config.yaml: {e}")
+        input("Press Enter to exit...")
+        exit(1)
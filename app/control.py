@@ -1,277 +1,491 @@
 """
 Handles interactions with the DCS server and related files.
 Includes functionality for starting/stopping the server, managing files, and more.
+
+Each configured DCS server instance (its own `-w` Saved Games folder) is controlled by
+a `DCSControl` object with its own paths, process tracking and lock, so operations on
+different instances can run concurrently. `Instances` is the registry of all of them.
 """
 
-import subprocess
+import tempfile
+import threading
 import psutil
 import time
 import os
-from typing import Tuple
+from typing import AsyncIterator, Dict, List, Optional
 from pathlib import Path
 from datetime import timedelta
+from fastapi.concurrency import run_in_threadpool
 from app.config import Config
+from app.hooklink import HOOK_PORT_ENV, HOOK_INSTANCE_ENV
+from app.launcher import Launcher, LaunchError
 from app.logger import logger
-import luadata
+from app.luapatch import LuaPatcher, serialize_settings
+from app.placement import CpuPlacement
+from app.timing import PhaseTimer
 
 HOOKS_LUA_SOURCE = Path("resources/retribution-control.lua")
-COMMENT_LINES = [
-    "sanitizeModule('os')",
-    "sanitizeModule('io')",
-    "sanitizeModule('lfs')",
-]
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # bytes written to disk per worker thread call
+SCAN_MAX_AGE = 10  # seconds a "not running" scan result is trusted without rescanning
 
-class DCSControl:
+# MissionScripting.lua belongs to the DCS installation and may be shared by several instances
+shared_files_lock = threading.Lock()
+
+
+class FileTooLargeError(Exception):
+    """
+    Raised when an uploaded file exceeds the allowed size limit.
+    """
+
+class ProcessScanner:
     """
-    Singleton-like class for controlling the DCS server process and managing mission files.
+    Singleton-like scan of the DCS server processes on the host.
+    One pass over the process list serves every instance, and concurrent scans are shared.
     """
-    process: psutil.Process = None
+    lock = threading.Lock()
+    scanned_at: float = float("-inf")
+    index: Dict[Optional[str], psutil.Process] = {}
+    exe_names: set = set()
 
     @classmethod
-    def initialize(cls):
+    def scan(cls, since: float) -> Dict[Optional[str], psutil.Process]:
+        """
+        Return the DCS server processes keyed by their save folder (`-w` argument, None if
+        not given), from a scan that started no earlier than `since` (monotonic time).
+        """
+        with cls.lock:
+            # Another thread finished a scan while we were waiting, use its result
+            if cls.scanned_at >= since:
+                return cls.index
+            index = {}
+            for proc in psutil.process_iter(["name", "cmdline"]):
+                if proc.info["name"] in cls.exe_names:
+                    index[get_save_folder(proc.info["cmdline"] or [])] = proc
+            cls.index = index
+            cls.scanned_at = time.monotonic()
+            return index
+
+
+class DCSControl:
+    """
+    Controls one DCS server instance: its process and its mission files.
+    """
+    def __init__(self, name: str, mission_dir: Path, dcs_server_exe: Path, data_dir: Path):
+        self.name = name
+        self.process: psutil.Process = None
+        self.lock = threading.Lock()  # serializes start/stop of this instance
+        self.initialize(mission_dir, dcs_server_exe, data_dir)
+
+    def initialize(self, mission_dir: Path, dcs_server_exe: Path, data_dir: Path):
         """
         Initialize and validate DCS-specific paths and other configurations.
-        This method is called automatically when the module is loaded.
         """
         # Paths
-        cls.mission_dir = Path(Config.get("server.dcs_mission_dir"))
-        if not cls.mission_dir.exists() or not cls.mission_dir.is_dir():
-            raise FileNotFoundError(f"DCS Mission directory not found at: {cls.mission_dir}")
-        cls.state_json = cls.mission_dir / "state.json"
-        cls.save_dir = cls.mission_dir.parent
-
-        cls.settings_lua = cls.save_dir / "Config" / "serverSettings.lua"
-        cls.settings_lua_backup = cls.settings_lua.with_suffix(".original.lua")
-        cls.last_upload_txt = cls.settings_lua.parent / "retRemoteLastUpload.txt"
-        if not cls.settings_lua.exists() or not cls.settings_lua.is_file():
-            raise FileNotFoundError(f"serverSettings.lua not found at: {cls.settings_lua}")
-        
-        cls.hooks_lua = cls.save_dir / "Scripts" / "Hooks" / HOOKS_LUA_SOURCE.name
-        cls.hooks_lua.parent.mkdir(parents=True, exist_ok=True)
-
-        cls.dcs_server_exe = Path(Config.get("server.dcs_server_exe"))
-        if not cls.dcs_server_exe.exists() or not cls.dcs_server_exe.is_file():
-            raise FileNotFoundError(f"DCS_server.exe not found at: {cls.dcs_server_exe}")
-        cls.install_dir = cls.dcs_server_exe.parent.parent
-        
-        cls.sanitize_lua = cls.install_dir / "Scripts" / "MissionScripting.lua"
-        cls.sanitize_lua_backup = cls.sanitize_lua.with_suffix(".original.lua")
-        if not cls.sanitize_lua.exists() or not cls.sanitize_lua.is_file():
-            raise FileNotFoundError(f"MissionScripting.lua not found at: {cls.sanitize_lua}")
-        
-        cls.data_dir = Path("data").absolute()
-        cls.state_json = cls.data_dir / "state.json"
-        
+        self.mission_dir = mission_dir
+        if not self.mission_dir.exists() or not self.mission_dir.is_dir():
+            raise FileNotFoundError(f"DCS Mission directory not found at: {self.mission_dir}")
+        self.save_dir = self.mission_dir.parent
+
+        self.settings_lua = self.save_dir / "Config" / "serverSettings.lua"
+        self.settings_lua_backup = self.settings_lua.with_suffix(".original.lua")
+        self.last_upload_txt = self.settings_lua.parent / "retRemoteLastUpload.txt"
+        if not self.settings_lua.exists() or not self.settings_lua.is_file():
+            raise FileNotFoundError(f"serverSettings.lua not found at: {self.settings_lua}")
+
+        self.hooks_lua = self.save_dir / "Scripts" / "Hooks" / HOOKS_LUA_SOURCE.name
+        self.hooks_lua.parent.mkdir(parents=True, exist_ok=True)
+
+        self.dcs_server_exe = dcs_server_exe
+        if not self.dcs_server_exe.exists() or not self.dcs_server_exe.is_file():
+            raise FileNotFoundError(f"DCS_server.exe not found at: {self.dcs_server_exe}")
+        self.install_dir = self.dcs_server_exe.parent.parent
+
+        self.sanitize_lua = self.install_dir / "Scripts" / "MissionScripting.lua"
+        self.sanitize_lua_backup = self.sanitize_lua.with_suffix(".original.lua")
+        if not self.sanitize_lua.exists() or not self.sanitize_lua.is_file():
+            raise FileNotFoundError(f"MissionScripting.lua not found at: {self.sanitize_lua}")
+
+        self.data_dir = data_dir.absolute()
+        self.state_json = self.data_dir / "state.json"
+
         try:
-            with (cls.install_dir / "variant.txt").open("r") as f:
-                cls.default_folder = f"DCS.{f.read().strip()}"
+            with (self.install_dir / "variant.txt").open("r") as f:
+                self.default_folder = f"DCS.{f.read().strip()}"
         except FileNotFoundError:
-            cls.default_folder = "DCS.release_server"
+            self.default_folder = "DCS.release_server"
 
-        logger.info(f"DCS Mission directory: {cls.mission_dir}")
-        logger.info(f"DCS server executable: {cls.dcs_server_exe}")
+        logger.info(f"[{self.name}] DCS Mission directory: {self.mission_dir}")
+        logger.info(f"[{self.name}] DCS server executable: {self.dcs_server_exe}")
+        logger.info(f"[{self.name}] state.json will be saved at: {self.state_json}")
 
         # Process management
-        cls.max_running_time = timedelta(minutes=Config.get("server.max_running_time"))
-        cls.cmd = f'Start "" /high "{cls.dcs_server_exe}" -w "{cls.save_dir.name}'
+        ProcessScanner.exe_names.add(self.dcs_server_exe.name)
 
-    @classmethod
-    def start_process(cls):
+    def setting(self, key: str):
+        """
+        Get a per-instance server setting (e.g. "max_running_time"), falling back to
+        the `server` block when the instance does not set it.
+        """
+        if self is not Instances.main:
+            for block in Config.get("instances"):
+                if block["name"] == self.name and key in block:
+                    return block[key]
+        return Config.get(f"server.{key}")
+
+    def start_process(self, timer: PhaseTimer = None):
         """
         Start the DCS server process using the executable path from the configuration.
+        - The instance's launcher returns the process handle, nothing is scanned or polled.
+        - Per-phase durations are recorded in `timer` and logged.
         """
-        if cls.find_process():
-            logger.warning("DCS server is already running, cannot start again.")
-            return True
-        
-        cls.setup_before_start()
-        
-        # Set exporting state.json to current working directory
-        cls.data_dir.mkdir(parents=True, exist_ok=True)
-        data_dir = str(cls.data_dir)
-        env = dict(os.environ)
-        env["RETRIBUTION_EXPORT_DIR"] = data_dir
-        env["LIBERATION_EXPORT_DIR"] = data_dir
-        logger.debug(f"state.json export dir set to: {data_dir}")
-        subprocess.Popen(cls.cmd, shell=True, env=env)
-        for _ in range(20):
-            if cls.find_process():
-                logger.debug(f"DCS server started (PID: {cls.process.pid})")
-                return True
-            time.sleep(0.5)
-        logger.error(
-            f"DCS is still not starting after 10 seconds, failed to start!"
-        )
-        return False
+        timer = timer or PhaseTimer()
+        with self.lock:
+            with timer.phase("find_process"):
+                if self.find_process(refresh=True):
+                    logger.warning(f"[{self.name}] DCS server is already running, cannot start again.")
+                    return True
 
+            self.setup_before_start(timer)
 
-    @classmethod
-    def stop_process(cls):
+            with timer.phase("launch"):
+                # Set exporting state.json to the instance data directory
+                self.data_dir.mkdir(parents=True, exist_ok=True)
+                data_dir = str(self.data_dir)
+                env = dict(os.environ)
+                env["RETRIBUTION_EXPORT_DIR"] = data_dir
+                env["LIBERATION_EXPORT_DIR"] = data_dir
+                env[HOOK_PORT_ENV] = str(Config.get("app.hook_port"))
+                env[HOOK_INSTANCE_ENV] = self.name
+                logger.debug(f"[{self.name}] state.json export dir set to: {data_dir}")
+                try:
+                    proc = Launcher.get(self.setting("launcher")).launch(self, env)
+                except LaunchError as e:
+                    logger.error(f"[{self.name}] Failed to start DCS server: {e}")
+                    return False
+                self.process = proc if proc.poll() is None else None
+
+            if self.process:
+                with timer.phase("placement"):
+                    try:
+                        CpuPlacement.apply(self, self.process, CpuPlacement.plan(Instances.all())[self.name])
+                    except psutil.NoSuchProcess:
+                        pass  # exited right away, reported by the watcher
+
+            logger.info(f"[{self.name}] Start timings: {timer.report()}")
+            if self.process:
+                logger.debug(f"[{self.name}] DCS server started (PID: {self.process.pid})")
+                return True
+            logger.error(f"[{self.name}] DCS server exited right after launch (exit code {proc.returncode}), failed to start!")
+            return False
+
+    def stop_process(self, timer: PhaseTimer = None):
         """
         Stop the DCS server process by terminating the running process.
+        - Per-phase durations are recorded in `timer` and logged.
         """
-        if not cls.find_process():
-            logger.warning("DCS server is not running, nothing to stop.")
-            return True
-        
-        try:
-            logger.debug("Stopping DCS server...")
-            cls.process.terminate()
-            cls.process.wait(timeout=15)
-            logger.debug("DCS server stopped successfully.")
-            cls.process = None
-            cls.restore_after_stop()
-            return True
-        except psutil.TimeoutExpired:
-            logger.error("DCS server did not stop in time, killing process...")
-            cls.process.kill()
-            cls.process = None
-            cls.restore_after_stop()
-            return False
+        timer = timer or PhaseTimer()
+        with self.lock:
+            with timer.phase("find_process"):
+                if not self.find_process(refresh=True):
+                    logger.warning(f"[{self.name}] DCS server is not running, nothing to stop.")
+                    return True
 
+            stopped = True
+            with timer.phase("terminate"):
+                try:
+                    logger.debug(f"[{self.name}] Stopping DCS server...")
+                    self.process.terminate()
+                    self.process.wait(timeout=15)
+                    logger.debug(f"[{self.name}] DCS server stopped successfully.")
+                except psutil.TimeoutExpired:
+                    logger.error(f"[{self.name}] DCS server did not stop in time, killing process...")
+                    self.process.kill()
+                    stopped = False
+                self.process = None
 
-    @classmethod
-    def get_status(cls) -> timedelta:
+            self.restore_after_stop(timer)
+            logger.info(f"[{self.name}] Stop timings: {timer.report()}")
+            return stopped
+
+    def get_status(self) -> timedelta:
         """
         Check if the DCS server process is currently running.
         If running, return the running time, otherwise return None.
         Returns:
             timedelta: The running time of the DCS server process.
         """
-        if cls.find_process():
-            return timedelta(seconds=int(time.time() - cls.process.create_time()))
+        proc = self.find_process()
+        if proc:
+            return timedelta(seconds=int(time.time() - proc.create_time()))
         return None
 
-    @classmethod
-    def save_mission_file(cls, file: bytes, filename: str):
+    async def save_mission_stream(self, chunks: AsyncIterator[bytes], filename: str, max_size: int = 0) -> int:
         """
-        Save the uploaded mission file to the specified path.
-        - Overwrites the existing mission file.
+        Stream an uploaded mission file to disk without holding it in memory.
+        - Incoming data is buffered into fixed-size chunks and written to a temp file
+          in the mission directory from a worker thread.
+        - Aborts as soon as more than `max_size` bytes (0 to disable) have arrived.
+        - The temp file atomically replaces the existing mission file once complete.
+        Returns:
+            int: The number of bytes written.
+        Raises:
+            FileTooLargeError: If the upload exceeds `max_size`.
+        """
+        tmp = await run_in_threadpool(
+            tempfile.NamedTemporaryFile,
+            dir=self.mission_dir, prefix=f".{filename}.", suffix=".part", delete=False,
+        )
+        tmp_path = Path(tmp.name)
+        size = 0
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise FileTooLargeError(f"Upload exceeds the limit of {max_size} bytes")
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(tmp.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(tmp.write, bytes(buffer))
+            await run_in_threadpool(tmp.close)
+            await run_in_threadpool(self.commit_mission_file, tmp_path, filename)
+        except BaseException:
+            await run_in_threadpool(discard_file, tmp, tmp_path)
+            raise
+        return size
+
+    def commit_mission_file(self, tmp_path: Path, filename: str):
+        """
+        Atomically move a fully written temp file into place as the mission file,
+        and record it as the last upload.
         """
-        file_path = cls.mission_dir / filename
-        file_path.write_bytes(file)
-        logger.debug(f"Mission file saved: {file_path}")
+        file_path = self.mission_dir / filename
+        os.replace(tmp_path, file_path)
+        logger.debug(f"[{self.name}] Mission file saved: {file_path}")
 
         # Record the last uploaded file
-        write_text_LF(cls.last_upload_txt, str(file_path))
+        write_text_LF(self.last_upload_txt, str(file_path))
 
-    @classmethod
-    def get_state_file(cls) -> Path:
+    def staged_mission(self) -> Path:
+        """
+        Return the mission file the server will run on the next start: the last upload,
+        or the first allowed file name when nothing was uploaded through the app.
+        """
+        if self.last_upload_txt.exists():
+            return Path(self.last_upload_txt.read_text(encoding="utf-8").strip())
+        return self.mission_dir / Config.get("app.allowed_filenames")[0]
+
+    def get_state_file(self) -> Path:
         """
         Load and return the state.json path from the DCS mission directory.
         Returns:
             Path: to state.json if it exists.
         """
-        if not cls.state_json.exists():
-            raise FileNotFoundError(f"State file not found: {cls.state_json}")
+        if not self.state_json.exists():
+            raise FileNotFoundError(f"State file not found: {self.state_json}")
 
-        return cls.state_json
-    
-    @classmethod
-    def find_process(cls) -> Tuple[psutil.Process, int]:
+        return self.state_json
+
+    def find_process(self, refresh: bool = False) -> psutil.Process:
+        """
+        Return the running DCS server process, or None.
+        - The tracked process is checked in O(1).
+        - Without `refresh`, a missing process is looked up in the last scan
+          (kept fresh by the process watcher) instead of scanning again.
+        - Concurrent refreshes, from any instance, share a single scan.
+        """
         # Check if the registered process running
-        if cls.process and cls.process.is_running():
-            return cls.process
-
-        # Check if any process with the same save folder is running
-        cls.process = None
-        for proc in psutil.process_iter(["name", "cmdline"]):
-            if proc.info["name"] == cls.dcs_server_exe.name:
-                folder = cls.get_save_folder(proc.info["cmdline"])
-                if folder == cls.save_dir.name:
-                    cls.process = proc
-                    return proc
-        return None
-    
-    @classmethod
-    def get_save_folder(cls, cmdline: list) -> str:
-        for i, arg in enumerate(cmdline):
-            if arg == "-w" and len(cmdline) > i + 1:
-                return cmdline[i + 1]
-        return cls.default_folder
-    
-    @classmethod
-    def setup_before_start(cls):
+        proc = self.process
+        if proc and proc.is_running():
+            return proc
+        if not refresh and time.monotonic() - ProcessScanner.scanned_at < SCAN_MAX_AGE:
+            index = ProcessScanner.index
+        else:
+            index = ProcessScanner.scan(time.monotonic())
+
+        proc = index.get(self.save_dir.name)
+        if proc is None and self.default_folder == self.save_dir.name:
+            proc = index.get(None)
+        self.process = proc if proc and proc.is_running() else None
+        return self.process
+
+    def shares_installation_with_running(self) -> bool:
+        """
+        Whether another running instance uses the same MissionScripting.lua.
+        """
+        return any(
+            other is not self and other.sanitize_lua == self.sanitize_lua and other.find_process()
+            for other in Instances.all()
+        )
+
+    def setup_before_start(self, timer: PhaseTimer):
         """
         Setup scripts and server settings before starting the DCS server.
+        Files that already have the right content are not rewritten.
         """
         # Copy the hooks lua script to the hooks directory
-        write_text_LF(cls.hooks_lua, HOOKS_LUA_SOURCE.read_text(encoding="utf-8"))
-        logger.debug(f"Hooks script copied to Scripts/Hooks directory.")
-        
-        # Backup the original MissionScripting.lua file
-        backup_path = cls.sanitize_lua_backup
-        if not backup_path.exists():
-            write_text_LF(backup_path, cls.sanitize_lua.read_text(encoding="utf-8"))
-            logger.debug(f"MissionScripting.lua backup created at oringinal location.")
-
-        # De-sanitize the MissionScripting.lua file
-        lines = cls.sanitize_lua.read_text(encoding="utf-8").splitlines()
-        sanitized_line = []
-        for line in lines:
-            stripped_line = line.strip()
-            if stripped_line in COMMENT_LINES:
-                line = f"\t-- {stripped_line}"
-                logger.debug(f"MissionScripting.lua line de-sanitized: {line.strip()}")
-            sanitized_line.append(line)
-        write_text_LF(cls.sanitize_lua, "\n".join(sanitized_line))
-        logger.debug(f"MissionScripting.lua de-sanitized successfully.")
-
-        # Set the mission to run when the server starts
-        if cls.last_upload_txt.exists():
-            last_upload = Path(cls.last_upload_txt.read_text(encoding="utf-8").strip())
-        else:
-            last_upload = cls.mission_dir / Config.get("app.allowed_filenames")[0]
-
-        if not last_upload.exists():
-            logger.error(f"Last uploaded mission file not found: {last_upload}")
-            return
-        
-        cfg = luadata.read(cls.settings_lua, encoding="utf-8")
-        cfg["listStartIndex"] = 1
-        cfg["missionList"] = [str(last_upload)]
-        if "lastSelectedMission" in cfg:
-            cfg['lastSelectedMission'] = str(last_upload)
-        
-        write_text_LF(cls.settings_lua_backup, cls.settings_lua.read_text(encoding="utf-8"))
-        logger.debug(f"serverSettings.lua backup created at original location.")
-        luadata.write(cls.settings_lua, cfg, encoding="utf-8", indent="    ", prefix="cfg = ")
-        logger.debug(f"serverSettings.lua set to run mission: {last_upload.name}")
+        with timer.phase("setup.hooks"):
+            if LuaPatcher.write_if_changed(self.hooks_lua, LuaPatcher.read_text(HOOKS_LUA_SOURCE).text):
+                logger.debug(f"[{self.name}] Hooks script copied to Scripts/Hooks directory.")
 
-    @classmethod
-    def restore_after_stop(cls):
+        with timer.phase("setup.mission_scripting"), shared_files_lock:
+            # Backup the original MissionScripting.lua file
+            backup_path = self.sanitize_lua_backup
+            if not backup_path.exists():
+                LuaPatcher.write_if_changed(backup_path, LuaPatcher.read_text(self.sanitize_lua).text)
+                logger.debug(f"MissionScripting.lua backup created at oringinal location.")
+
+            # De-sanitize the MissionScripting.lua file
+            if LuaPatcher.write_if_changed(self.sanitize_lua, LuaPatcher.desanitize(self.sanitize_lua)):
+                logger.debug(f"MissionScripting.lua de-sanitized successfully.")
+
+        with timer.phase("setup.server_settings"):
+            # Set the mission to run when the server starts
+            last_upload = self.staged_mission()
+
+            if not last_upload.exists():
+                logger.error(f"[{self.name}] Last uploaded mission file not found: {last_upload}")
+                return
+
+            cfg = LuaPatcher.read_settings(self.settings_lua)
+            cfg["listStartIndex"] = 1
+            cfg["missionList"] = [str(last_upload)]
+            if "lastSelectedMission" in cfg:
+                cfg['lastSelectedMission'] = str(last_upload)
+
+            # Keep an existing backup: it holds the original if the last run was not restored
+            if not self.settings_lua_backup.exists():
+                LuaPatcher.write_if_changed(self.settings_lua_backup, LuaPatcher.read_text(self.settings_lua).text)
+                logger.debug(f"[{self.name}] serverSettings.lua backup created at original location.")
+            if LuaPatcher.write_if_changed(self.settings_lua, serialize_settings(cfg)):
+                logger.debug(f"[{self.name}] serverSettings.lua set to run mission: {last_upload.name}")
+
+    def restore_after_stop(self, timer: PhaseTimer):
         """
         Restore all files to their original state after the DCS server is stopped.
+        MissionScripting.lua stays de-sanitized while another instance of the same
+        installation is still running.
         """
-        # Delete the hooks script
-        if cls.hooks_lua.exists():
-            cls.hooks_lua.unlink()
-            logger.debug(f"Hooks script deleted.")
+        with timer.phase("restore"):
+            # Delete the hooks script
+            if self.hooks_lua.exists():
+                self.hooks_lua.unlink()
+                logger.debug(f"[{self.name}] Hooks script deleted.")
 
-        # Restore the original MissionScripting.lua file
-        if cls.sanitize_lua_backup.exists():
-            write_text_LF(cls.sanitize_lua, cls.sanitize_lua_backup.read_text(encoding="utf-8"))
-            cls.sanitize_lua_backup.unlink()
-            logger.debug(f"MissionScripting.lua restored successfully.")
-        else:
-            logger.warning(f"MissionScripting.lua backup not found. Cannot restore.")
-        
-        if cls.settings_lua_backup.exists():
-            write_text_LF(cls.settings_lua, cls.settings_lua_backup.read_text(encoding="utf-8"))
-            cls.settings_lua_backup.unlink()
-            logger.debug(f"serverSettings.lua restored successfully.")
-        else:
-            logger.warning(f"serverSettings.lua backup not found. Cannot restore.")
+            # Restore the original MissionScripting.lua file
+            with shared_files_lock:
+                if self.shares_installation_with_running():
+                    logger.debug(f"MissionScripting.lua still in use by another instance, not restored.")
+                elif self.sanitize_lua_backup.exists():
+                    LuaPatcher.write_if_changed(self.sanitize_lua, LuaPatcher.read_text(self.sanitize_lua_backup).text)
+                    self.sanitize_lua_backup.unlink()
+                    logger.debug(f"MissionScripting.lua restored successfully.")
+                else:
+                    logger.warning(f"MissionScripting.lua backup not found. Cannot restore.")
+
+            if self.settings_lua_backup.exists():
+                LuaPatcher.write_if_changed(self.settings_lua, LuaPatcher.read_text(self.settings_lua_backup).text)
+                self.settings_lua_backup.unlink()
+                logger.debug(f"[{self.name}] serverSettings.lua restored successfully.")
+            else:
+                logger.warning(f"[{self.name}] serverSettings.lua backup not found. Cannot restore.")
+
+
+class Instances:
+    """
+    Singleton-like registry of the configured DCS server instances.
+    - The `server` block of the configuration is the main instance.
+    - Each entry of `instances` adds one more, unset keys falling back to `server`.
+    """
+    main: DCSControl = None
+    by_name: Dict[str, DCSControl] = {}
 
+    @classmethod
+    def initialize(cls):
+        """
+        Create a `DCSControl` for every configured instance.
+        Raises:
+            FileNotFoundError: If the paths of an instance are invalid.
+            ValueError: If two instances share a Saved Games folder.
+        """
+        data_dir = Path("data")
+        by_name = {}
+        main = DCSControl(
+            Config.get("server.name"),
+            Path(Config.get("server.dcs_mission_dir")),
+            Path(Config.get("server.dcs_server_exe")),
+            data_dir,
+        )
+        by_name[main.name] = main
+        for block in Config.get("instances"):
+            by_name[block["name"]] = DCSControl(
+                block["name"],
+                Path(block["dcs_mission_dir"]),
+                Path(block.get("dcs_server_exe", Config.get("server.dcs_server_exe"))),
+                data_dir / "instances" / block["name"],
+            )
+
+        save_dirs = [dcs.save_dir.resolve() for dcs in by_name.values()]
+        if len(set(save_dirs)) != len(save_dirs):
+            raise ValueError("Each instance needs its own Saved Games folder.")
+        cls.main = main
+        cls.by_name = by_name
+
+    @classmethod
+    def apply_placement(cls):
+        """
+        Re-apply the CPU placement to the running instances, e.g. after a configuration reload.
+        """
+        plan = CpuPlacement.plan(cls.all())
+        for dcs in cls.all():
+            proc = dcs.find_process()
+            if proc:
+                try:
+                    CpuPlacement.apply(dcs, proc, plan[dcs.name])
+                except psutil.NoSuchProcess:
+                    pass
+
+    @classmethod
+    def get(cls, name: str) -> Optional[DCSControl]:
+        return cls.by_name.get(name)
+
+    @classmethod
+    def all(cls) -> List[DCSControl]:
+        return list(cls.by_name.values())
+
+
+Config.on_reload(Instances.apply_placement)
+
+
+def get_save_folder(cmdline: list) -> Optional[str]:
+    for i, arg in enumerate(cmdline):
+        if arg == "-w" and len(cmdline) > i + 1:
+            return cmdline[i + 1]
+    return None
 
 def write_text_LF(path: Path, text: str):
     with path.open("w", encoding="utf-8", newline="\n") as f:
         f.write(text)
 
-# Automatically initialize the class when the module is loaded
-try:
-    DCSControl.initialize()
-except (FileNotFoundError, ValueError) as e:
-    logger.error(f"Error initializing DCSControl: {e}")
-    input("Please check your 'config.yaml'.\nPress Enter to exit...")
-    exit(1)
\ No newline at end of file
+def discard_file(file, path: Path):
+    """
+    Close and delete a partially written file, ignoring errors.
+    """
+    try:
+        file.close()
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not remove partial file {path}: {e}")
+
+def initialize_or_exit():
+    """
+    Initialize the DCS server instances, exiting with a message if the configured paths are invalid.
+    """
+    try:
+        Instances.initialize()
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"Error initializing DCSControl: {e}")
+        input("Please check your 'config.yaml'.\nPress Enter to exit...")
+        exit(1)
@@ -0,0 +1,149 @@
+"""
+Pushes server status changes to connected web clients over Server-Sent Events.
+
+A single producer task watches the (in-memory) status of every DCS instance and fans
+events out to every subscriber, so clients no longer need to poll `/api/v1/status`.
+Instance events carry an `instance` field.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.control import DCSControl, Instances
+from app.jobs import JobManager
+from app.logger import logger
+from app.statearchive import StateArchive
+
+TICK_INTERVAL = 1  # seconds between status checks
+UPTIME_INTERVAL = 10  # seconds between uptime ticks while running
+HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments
+SUBSCRIBER_QUEUE_SIZE = 64  # events buffered per client before the oldest are dropped
+
+
+def server_status(dcs: DCSControl) -> dict:
+    """
+    Build the current status of an instance, without scanning processes unless the last
+    scan is stale. Blocking: call it from a worker thread.
+    - `status` is one of starting, running, stopping, stopped.
+    """
+    uptime = dcs.get_status()
+    job = JobManager.active(dcs.name)
+    if job and job.action == "start":
+        status = "starting"
+    elif job and job.action == "stop":
+        status = "stopping"
+    else:
+        status = "running" if uptime is not None else "stopped"
+    return {
+        "instance": dcs.name,
+        "status": status,
+        "uptime": str(uptime) if uptime is not None else "N/A",
+        "job": job.to_dict() if job else None,
+    }
+
+
+class EventBus:
+    """
+    Singleton-like fan-out of events to all connected clients.
+    Each client has a bounded queue; a slow client loses its oldest events instead of
+    holding up the producer or growing memory.
+    """
+    subscribers: set = set()
+
+    @classmethod
+    def publish(cls, event: str, data: dict):
+        message = format_sse(event, data)
+        for queue in cls.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @classmethod
+    async def subscribe(cls, initial: List[Tuple[str, dict]]) -> AsyncIterator[str]:
+        """
+        Yield SSE messages for one client, starting with the `initial` (event, data) pairs.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        cls.subscribers.add(queue)
+        try:
+            for event, data in initial:
+                yield format_sse(event, data)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            cls.subscribers.discard(queue)
+
+
+class StatusProducer:
+    """
+    Singleton-like background task that publishes status transitions, uptime ticks,
+    job updates and new state.json files to the `EventBus`. New state.json files are
+    also archived in a worker thread.
+    """
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls):
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        last_status: Dict[str, str] = {}
+        last_jobs = {job.id: job.state for job in JobManager.jobs.values()}
+        last_state_mtime = {dcs.name: state_mtime(dcs) for dcs in Instances.all()}
+        ticks = 0
+        while True:
+            ticks += 1
+            for dcs in Instances.all():
+                try:
+                    current, mtime = await run_in_threadpool(lambda: (server_status(dcs), state_mtime(dcs)))
+                    if current["status"] != last_status.get(dcs.name):
+                        EventBus.publish("status", current)
+                    elif current["status"] == "running" and ticks % UPTIME_INTERVAL == 0:
+                        EventBus.publish("uptime", {"instance": dcs.name, "uptime": current["uptime"]})
+                    last_status[dcs.name] = current["status"]
+
+                    if mtime and mtime != last_state_mtime.get(dcs.name):
+                        EventBus.publish("state", {"instance": dcs.name, "modified": mtime})
+                        asyncio.get_running_loop().run_in_executor(None, archive_state, dcs)
+                    last_state_mtime[dcs.name] = mtime
+                except Exception as e:
+                    logger.error(f"[{dcs.name}] Status producer error: {e}")
+
+            jobs = {job.id: job.state for job in JobManager.jobs.values()}
+            for job_id, state in jobs.items():
+                if last_jobs.get(job_id) != state:
+                    EventBus.publish("job", JobManager.get(job_id).to_dict())
+            last_jobs = jobs
+            await asyncio.sleep(TICK_INTERVAL)
+
+
+def state_mtime(dcs: DCSControl) -> Optional[float]:
+    try:
+        return dcs.state_json.stat().st_mtime
+    except OSError:
+        return None
+
+def archive_state(dcs: DCSControl):
+    try:
+        StateArchive.capture(dcs, "change")
+    except Exception as e:
+        logger.error(f"[{dcs.name}] Error archiving state.json: {e}")
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
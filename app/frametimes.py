@@ -0,0 +1,57 @@
+"""
+Server frame-time telemetry reported by the DCS hook script.
+
+The hook counts every simulation frame into a fixed histogram and sends one `frames`
+summary per interval (p50/p95/max/average frame time in ms, effective tick rate and the
+bucket counts), so nothing is sent or stored per frame. The app keeps the recent summaries
+of each instance for the API and the web interface chart.
+"""
+
+import time
+from collections import deque
+from typing import Dict, List
+from app.control import Instances
+from app.events import EventBus
+from app.hooklink import HookLink
+
+HISTORY = 720  # summaries kept per instance (2 hours at the hook's 10 s interval)
+SUMMARY_FIELDS = ("interval", "frames", "tick_rate", "p50", "p95", "max", "avg")
+# Upper bounds (ms) of the hook's histogram buckets, as in resources/retribution-control.lua
+FRAME_BUCKETS = (2, 4, 6, 8, 10, 12, 14, 17, 20, 25, 33, 40, 50, 67, 100, 150, 250, 500, 1000)
+
+
+class FrameTelemetry:
+    """
+    Singleton-like store of the recent frame-time summaries of every instance.
+    All methods run on the event loop.
+    """
+    summaries: Dict[str, deque] = {}
+
+    @classmethod
+    def on_frames(cls, message: dict):
+        """
+        Store a `frames` summary from the hook and publish it to the web clients.
+        """
+        instance = message.get("instance") or Instances.main.name
+        if not isinstance(instance, str) or Instances.get(instance) is None:
+            return
+        if not all(isinstance(message.get(field), (int, float)) for field in SUMMARY_FIELDS):
+            return
+        summary = {"time": time.time(), **{field: message[field] for field in SUMMARY_FIELDS}}
+        buckets = message.get("buckets")
+        if (isinstance(buckets, list) and len(buckets) == len(FRAME_BUCKETS) + 1
+                and all(isinstance(count, (int, float)) for count in buckets)):
+            summary["buckets"] = buckets
+        cls.summaries.setdefault(instance, deque(maxlen=HISTORY)).append(summary)
+        EventBus.publish("frames", {"instance": instance, **summary})
+
+    @classmethod
+    def history(cls, instance: str, seconds: float) -> List[dict]:
+        """
+        Return the summaries of an instance from the last `seconds`, oldest first.
+        """
+        since = time.time() - seconds
+        return [s for s in cls.summaries.get(instance, ()) if s["time"] >= since]
+
+
+HookLink.on("frames", FrameTelemetry.on_frames)
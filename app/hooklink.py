@@ -0,0 +1,86 @@
+"""
+Receives messages from the DCS hook script (`resources/retribution-control.lua`).
+
+The hook sends small JSON datagrams to `127.0.0.1:<app.hook_port>`; the port and the
+instance name are passed to DCS in the `RETRIBUTION_REMOTE_HOOK_PORT` and
+`RETRIBUTION_REMOTE_INSTANCE` environment variables when the server is started.
+Each message has a `type` and an `instance`, and handlers are registered per type.
+
+With `app.hook_record`, every message is also appended to `data/hook_recording.jsonl`
+with its arrival time, to be played back later with `python -m app.replay`.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO
+from app.config import Config
+from app.logger import logger
+
+HOOK_PORT_ENV = "RETRIBUTION_REMOTE_HOOK_PORT"
+HOOK_INSTANCE_ENV = "RETRIBUTION_REMOTE_INSTANCE"
+RECORDING_JSONL = Path("data/hook_recording.jsonl")
+
+
+class HookProtocol(asyncio.DatagramProtocol):
+    def datagram_received(self, data: bytes, addr):
+        try:
+            message = json.loads(data)
+            kind = message["type"]
+        except (ValueError, KeyError, TypeError):
+            logger.debug(f"Ignoring malformed hook message from {addr}")
+            return
+        HookLink.dispatch(kind, message)
+
+
+class HookLink:
+    """
+    Singleton-like UDP endpoint on localhost for messages from the DCS hook script.
+    """
+    handlers: Dict[str, List[Callable[[dict], None]]] = {}
+    _transport: Optional[asyncio.DatagramTransport] = None
+    _recording: Optional[TextIO] = None
+
+    @classmethod
+    def on(cls, kind: str, handler: Callable[[dict], None]):
+        """
+        Register a handler for messages of the given `type`. Handlers run on the event loop.
+        """
+        cls.handlers.setdefault(kind, []).append(handler)
+
+    @classmethod
+    def dispatch(cls, kind: str, message: dict):
+        if cls._recording:
+            cls._recording.write(json.dumps({"t": time.time(), "message": message}) + "\n")
+        for handler in cls.handlers.get(kind, ()):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"Error handling '{kind}' hook message: {e}")
+
+    @classmethod
+    async def start(cls):
+        port = Config.get("app.hook_port")
+        if not port or cls._transport is not None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            cls._transport, _ = await loop.create_datagram_endpoint(HookProtocol, local_addr=("127.0.0.1", port))
+        except OSError as e:
+            logger.error(f"Cannot listen for DCS hook messages on UDP port {port}: {e}")
+            return
+        logger.debug(f"Listening for DCS hook messages on UDP port {port}")
+        if Config.get("app.hook_record"):
+            RECORDING_JSONL.parent.mkdir(parents=True, exist_ok=True)
+            cls._recording = RECORDING_JSONL.open("a", encoding="utf-8", buffering=64 * 1024)
+            logger.info(f"Recording DCS hook messages to {RECORDING_JSONL}")
+
+    @classmethod
+    def stop(cls):
+        if cls._transport is not None:
+            cls._transport.close()
+            cls._transport = None
+        if cls._recording is not None:
+            cls._recording.close()
+            cls._recording = None
@@ -1,17 +1,18 @@
-from cryptography import x509
-from cryptography.x509.oid import NameOID
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, NoEncryption
-from cryptography.hazmat.primitives.serialization import BestAvailableEncryption
-from cryptography.hazmat.backends import default_backend
+"""
+Self-signed certificate handling for HTTPS.
+`cryptography` is only imported when HTTPS is enabled, and `prepare_cert` can run in a
+background thread while the rest of the app starts.
+"""
+
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Optional, Tuple
 from app.logger import logger
 from app.config import Config
 
-cert_file: Path = None
-key_file: Path = None
+cert_dir = Path("data")
+cert_file = cert_dir / "cert.pem"
+key_file = cert_dir / "key.pem"
 
 COUNTRY_NAME = "US"
 ORGANIZATION_NAME = "DCS Retribution"
@@ -24,6 +25,9 @@ def check_cert():
     Returns:
         bool: True if the certificate is valid, False otherwise.
     """
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+
     if cert_file.exists() and key_file.exists():
         try:
             with open(cert_file, "rb") as f:
@@ -41,6 +45,13 @@ def generate_cert():
     """
     Generate a new self-signed SSL certificate and key.
     """
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, NoEncryption
+    from cryptography.hazmat.backends import default_backend
+
     cert_dir.mkdir(parents=True, exist_ok=True)
 
     # Generate a private key
@@ -81,10 +92,14 @@ def generate_cert():
 
     logger.info("Self-signed SSL certificate and key generated successfully.")
 
-if Config.get("app.https"):
-    cert_dir = Path("data")
-    cert_file = cert_dir / "cert.pem"
-    key_file = cert_dir / "key.pem"
+def prepare_cert() -> Tuple[Optional[Path], Optional[Path]]:
+    """
+    Make sure a valid certificate exists if HTTPS is enabled.
+    Returns:
+        tuple: (cert_file, key_file), or (None, None) if HTTPS is disabled.
+    """
+    if not Config.get("app.https"):
+        return None, None
 
     # Check if the certificate and key files exist and are not expired
     if check_cert():
@@ -92,4 +107,4 @@ if Config.get("app.https"):
     else:
         generate_cert()
         logger.info("HTTPS enabled.")
-
+    return cert_file, key_file
@@ -0,0 +1,178 @@
+"""
+Background jobs for long-running server operations (start/stop).
+Jobs of one DCS instance run one at a time in that instance's worker thread, so the event
+loop stays responsive while DCS is launched or shut down, and instances do not wait on
+each other.
+"""
+
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from app.control import DCSControl
+from app.logger import logger
+from app.metrics import Metrics
+from app.statearchive import StateArchive
+from app.timing import PhaseTimer
+from app.watcher import ProcessWatcher
+
+MAX_FINISHED_JOBS = 50  # finished jobs kept for status queries
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobRefused(Exception):
+    """
+    Raised by a job function that refuses to run, e.g. a start with an invalid mission.
+    """
+
+
+class Job:
+    """
+    A single background operation and its state: queued -> running -> succeeded/failed.
+    `func` receives the job (e.g. to record phase timings) and returns whether it succeeded.
+    """
+    def __init__(self, instance: str, action: str, func: Callable[["Job"], bool], user: str):
+        self.id = secrets.token_urlsafe(8)
+        self.instance = instance
+        self.action = action
+        self.func = func
+        self.user = user
+        self.state = QUEUED
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.timer = PhaseTimer()
+
+    @property
+    def done(self) -> bool:
+        return self.state in (SUCCEEDED, FAILED)
+
+    def run(self):
+        self.state = RUNNING
+        self.started = time.time()
+        logger.debug(f"Job {self.id} ({self.action}) started")
+        try:
+            ok = self.func(self)
+            self.state = SUCCEEDED if ok else FAILED
+            if not ok:
+                self.error = f"Failed to {self.action} DCS server"
+        except JobRefused as e:
+            logger.warning(f"[{self.instance}] {self.action.capitalize()} refused: {e}")
+            self.state = FAILED
+            self.error = str(e)
+        except Exception as e:
+            logger.exception(f"Job {self.id} ({self.action}) raised an error")
+            self.state = FAILED
+            self.error = str(e)
+        self.finished = time.time()
+        Metrics.observe_job(self.instance, self.action, self.state, self.finished - self.started, self.timer.phases)
+        logger.debug(f"Job {self.id} ({self.action}) {self.state} in {self.finished - self.started:.2f}s")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "instance": self.instance,
+            "action": self.action,
+            "user": self.user,
+            "state": self.state,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "timings": self.timer.to_dict(),
+        }
+
+
+class JobManager:
+    """
+    Singleton-like queue of background jobs.
+    - Jobs of the same instance are executed sequentially by that instance's worker thread.
+    - Submitting an action that is already queued or running returns the existing job.
+    """
+    jobs: "OrderedDict[str, Job]" = OrderedDict()
+    executors: Dict[str, ThreadPoolExecutor] = {}
+
+    @classmethod
+    def submit(cls, instance: str, action: str, func: Callable[[Job], bool], user: str) -> Job:
+        """
+        Queue `func` as a job of `instance`, unless a job for the same action is already in flight.
+        Returns:
+            Job: The new or the already in-flight job.
+        """
+        for job in cls.jobs.values():
+            if job.instance == instance and job.action == action and not job.done:
+                logger.debug(f"Job {job.id} ({instance} {action}) already in flight, request from '{user}' deduplicated")
+                return job
+
+        executor = cls.executors.get(instance)
+        if executor is None:
+            executor = cls.executors[instance] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"dcs-job-{instance}"
+            )
+        job = Job(instance, action, func, user)
+        cls.jobs[job.id] = job
+        cls.prune()
+        executor.submit(job.run)
+        return job
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Job]:
+        return cls.jobs.get(job_id)
+
+    @classmethod
+    def active(cls, instance: str) -> Optional[Job]:
+        """
+        Return the oldest job of `instance` that has not finished yet.
+        """
+        return next((job for job in cls.jobs.values() if job.instance == instance and not job.done), None)
+
+    @classmethod
+    def prune(cls):
+        finished = [job_id for job_id, job in cls.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del cls.jobs[job_id]
+
+
+SERVER_ACTIONS = {
+    "start": (DCSControl.start_process, "started"),
+    "stop": (DCSControl.stop_process, "stopped"),
+}
+
+def run_server_action(dcs: DCSControl, action: str, user: str, job: Job) -> bool:
+    """
+    Run a start/stop action inside a background job, logging who triggered it.
+    A start is refused when the staged mission file was found invalid, whoever asked for it.
+    Raises:
+        JobRefused: If the staged mission is invalid.
+    """
+    from app.mizindex import MizIndex  # app.mizindex imports app.events, which imports this module
+
+    func, past_tense = SERVER_ACTIONS[action]
+    if action == "start":
+        error = MizIndex.start_error(dcs)
+        if error:
+            raise JobRefused(error)
+    try:
+        if func(dcs, job.timer):
+            logger.info(f"'{user}' {past_tense} DCS server '{dcs.name}'")
+            if action == "start":
+                StateArchive.begin_turn(dcs, user)
+            else:
+                with job.timer.phase("archive_state"):
+                    StateArchive.capture(dcs, "stop", user)
+            return True
+        return False
+    finally:
+        ProcessWatcher.notify(dcs)
+
+def submit_server_action(dcs: DCSControl, action: str, user: str) -> Job:
+    """
+    Queue a start/stop job for a DCS server instance on behalf of `user`.
+    """
+    return JobManager.submit(dcs.name, action, lambda job: run_server_action(dcs, action, user, job), user)
@@ -0,0 +1,82 @@
+"""
+Launchers start the DCS server executable for an instance.
+
+A launcher returns the `psutil.Popen` handle of the process it started, so the app knows
+the PID immediately and the process watcher can block on the handle for the exit instead
+of rescanning. The launcher of an instance is picked by its `launcher` setting.
+"""
+
+import abc
+import os
+import subprocess
+from typing import Dict
+import psutil
+from app.logger import logger
+from app.placement import CPU_PRIORITIES
+
+
+class LaunchError(Exception):
+    """
+    Raised when the DCS server process cannot be started.
+    """
+
+
+class Launcher(abc.ABC):
+    """
+    Base class of launchers; subclasses register themselves under their `name`.
+    """
+    name: str = None
+    launchers: Dict[str, "Launcher"] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Launcher.launchers[cls.name] = cls()
+
+    @classmethod
+    def get(cls, name: str) -> "Launcher":
+        return cls.launchers[name]
+
+    @abc.abstractmethod
+    def launch(self, dcs, env: Dict[str, str]) -> psutil.Popen:
+        """
+        Start the DCS server of `dcs` with the environment `env`.
+        Returns:
+            psutil.Popen: The handle of the started process.
+        Raises:
+            LaunchError: If the process cannot be started.
+        """
+
+
+class DirectLauncher(Launcher):
+    """
+    Runs the executable directly, without a shell, detached from the app so the server
+    outlives an app restart. On Windows the priority class is set at creation.
+    """
+    name = "direct"
+
+    def launch(self, dcs, env: Dict[str, str]) -> psutil.Popen:
+        args = [str(dcs.dcs_server_exe), "-w", dcs.save_dir.name]
+        kwargs = {}
+        if os.name == "nt":
+            windows_class, _ = CPU_PRIORITIES[dcs.setting("cpu_priority")]
+            kwargs["creationflags"] = (
+                subprocess.DETACHED_PROCESS
+                | subprocess.CREATE_NEW_PROCESS_GROUP
+                | getattr(subprocess, windows_class)
+            )
+        else:
+            kwargs["start_new_session"] = True
+        try:
+            proc = psutil.Popen(
+                args,
+                cwd=dcs.dcs_server_exe.parent,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                **kwargs,
+            )
+        except OSError as e:
+            raise LaunchError(f"Cannot run {dcs.dcs_server_exe}: {e}")
+        logger.debug(f"[{dcs.name}] Launched {' '.join(args)} (PID: {proc.pid})")
+        return proc
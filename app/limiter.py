@@ -1,4 +1,192 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+Per-client rate limiting with token buckets.
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+Requests are sorted into route classes, each with its own limit (`app.rate_limits`):
+- `static`: the web page and its assets
+- `upload`: mission uploads (every chunk counts)
+- `control`: other changes, such as starting and stopping the server
+- `read`: everything else (status, downloads, events, metrics)
+- `auth`: failed logins. Every request with credentials answered by 401 takes a token,
+  and credentials of a client whose bucket is empty are refused before being checked.
+
+Clients are identified by their user once their credentials have been verified, otherwise
+by their IP address (taken from `X-Forwarded-For` when the request comes through one of
+the `app.trusted_proxies`). Buckets live in a fixed-size LRU table, so memory stays
+bounded however many clients show up, and every check is O(1).
+"""
+
+import ipaddress
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.auth import SessionCache
+from app.config import Config
+from app.metrics import Metrics
+
+MAX_BUCKETS = 4096  # clients x route classes tracked at once; the least recently seen are dropped
+ROUTE_CLASSES = ("control", "upload", "read", "static", "auth")
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+LIMIT_FORMAT = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+STATIC_PATHS = ("/assets/", "/static/", "/partials/")
+
+
+def parse_limit(limit) -> Optional[Tuple[float, int]]:
+    """
+    Parse a limit such as "20/minute" into (tokens per second, bucket size).
+    Returns:
+        tuple: The rate and burst, or None for no limit (0).
+    Raises:
+        ValueError: If the limit is not valid.
+    """
+    if limit == 0:
+        return None
+    match = LIMIT_FORMAT.match(str(limit))
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid rate limit '{limit}', use '<count>/<second|minute|hour|day>' or 0.")
+    count = int(match.group(1))
+    return count / PERIODS[match.group(2)], count
+
+def route_class(method: str, path: str) -> str:
+    if method in ("GET", "HEAD"):
+        if path == "/" or path.startswith(STATIC_PATHS):
+            return "static"
+        return "read"
+    if "/files/" in path:
+        return "upload"
+    return "control"
+
+
+class RateLimiter:
+    """
+    Singleton-like token-bucket table, keyed by (route class, client).
+    Used on the event loop; `configure` runs on the config watcher thread and only swaps
+    in new objects, so it never mutates the table being used.
+    """
+    limits: Dict[str, Optional[Tuple[float, int]]] = {}
+    trusted_proxies: tuple = ()
+    buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()  # key: [tokens, last refill]
+
+    @classmethod
+    def configure(cls):
+        """
+        Apply `app.rate_limits` and `app.trusted_proxies` (also on configuration reload).
+        """
+        cls.limits = {name: parse_limit(Config.get(f"app.rate_limits.{name}")) for name in ROUTE_CLASSES}
+        cls.trusted_proxies = tuple(ipaddress.ip_network(p, strict=False) for p in Config.get("app.trusted_proxies"))
+        cls.buckets = OrderedDict()
+
+    @classmethod
+    def acquire(cls, route: str, client: str, now: float = None, take: bool = True) -> float:
+        """
+        Take a token from the bucket of `client` for the `route` class.
+        With `take` False, only check whether a token is left (no bucket is created).
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds until it would be.
+        """
+        limit = cls.limits.get(route)
+        if limit is None:
+            return 0
+        rate, burst = limit
+        now = time.monotonic() if now is None else now
+        buckets = cls.buckets
+        key = (route, client)
+        bucket = buckets.get(key)
+        if bucket is None:
+            if not take:
+                return 0
+            bucket = buckets[key] = [burst, now]
+            if len(buckets) > MAX_BUCKETS:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            if take:
+                bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / rate
+
+    @classmethod
+    def client_key(cls, scope) -> str:
+        """
+        Identify the client of a request: "user:<name>" for a verified session,
+        otherwise "ip:<address>".
+        """
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization")
+        if authorization:
+            username = SessionCache.get(SessionCache.fingerprint(authorization.decode("latin-1")))
+            if username is not None:
+                return f"user:{username}"
+        return f"ip:{cls.client_ip(scope.get('client'), headers.get(b'x-forwarded-for'))}"
+
+    @classmethod
+    def client_ip(cls, client, forwarded_for: Optional[bytes]) -> str:
+        """
+        Return the address of the client, following `X-Forwarded-For` from the right
+        through trusted proxies only.
+        """
+        address = client[0] if client else "unknown"
+        if not forwarded_for:
+            return address
+        hops = [hop.strip() for hop in forwarded_for.decode("latin-1").split(",")]
+        while cls.is_trusted(address) and hops:
+            address = hops.pop()
+        return address
+
+    @classmethod
+    def is_trusted(cls, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in cls.trusted_proxies)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 (with `Retry-After`) once a client has used up the
+    limit of a route class, or its failed logins.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        client = RateLimiter.client_key(scope)
+        # Credentials not verified yet: possibly a password guess
+        unverified = client.startswith("ip:") and any(name == b"authorization" for name, _ in scope["headers"])
+        wait = RateLimiter.acquire("auth", client, take=False) if unverified else 0
+        if not wait:
+            wait = RateLimiter.acquire(route_class(scope["method"], scope["path"]), client)
+        if not wait:
+            if not unverified:
+                return await self.app(scope, receive, send)
+
+            async def send_and_count_failure(message):
+                if message["type"] == "http.response.start" and message["status"] == 401:
+                    RateLimiter.acquire("auth", client)
+                await send(message)
+            return await self.app(scope, receive, send_and_count_failure)
+
+        Metrics.rate_limited.inc()
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+Config.on_reload(RateLimiter.configure)
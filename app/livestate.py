@@ -0,0 +1,174 @@
+"""
+Live mission state folded from the game events pushed by the DCS hook script.
+
+The hook batches events (kills, crashes, ejections, takeoffs and landings, players joining
+and leaving, base captures) into `events` datagrams with a sequence number. Batches go
+through a bounded queue: when the consumer falls behind, the oldest batches are dropped
+and counted instead of growing memory. The consumer folds everything that is queued at
+once and publishes at most one `live` summary per instance and interval.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+from app.control import Instances
+from app.events import EventBus
+from app.hooklink import HookLink
+from app.logger import logger
+
+QUEUE_SIZE = 256  # event batches waiting to be folded
+RECENT_EVENTS = 50  # events kept per instance for display
+PUBLISH_INTERVAL = 1  # seconds between live summaries of an instance
+SIDES = {0: "neutral", 1: "red", 2: "blue"}
+
+
+class LiveModel:
+    """
+    Running totals of one instance's current mission.
+    """
+    def __init__(self, instance: str):
+        self.instance = instance
+        self.last_seq: Optional[int] = None
+        self.received_batches = 0
+        self.lost_batches = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the mission totals, e.g. when a new mission starts.
+        """
+        self.started: Optional[float] = None
+        self.model_time = 0.0
+        self.players: Dict[int, str] = {}
+        self.kills = {"red": 0, "blue": 0}
+        self.losses = {"red": 0, "blue": 0}
+        self.bases: Dict[str, str] = {}
+        self.captures = 0
+        self.recent = deque(maxlen=RECENT_EVENTS)
+
+    def fold_batch(self, message: dict):
+        """
+        Apply one `events` batch, counting batches lost in transit from sequence gaps.
+        """
+        seq = message.get("seq")
+        if isinstance(seq, int):
+            if self.last_seq is not None and seq > self.last_seq + 1:
+                self.lost_batches += seq - self.last_seq - 1
+            self.last_seq = seq  # a lower number means the hook was reloaded
+        self.received_batches += 1
+        for event in message.get("events") or ():
+            if isinstance(event, dict):
+                self.fold(event)
+
+    def fold(self, event: dict):
+        kind = event.get("kind")
+        if kind == "mission_start":
+            self.reset()
+            self.started = time.time()
+        elif kind == "join":
+            player = event.get("player")
+            self.players[event.get("id")] = str(player) if player is not None else None
+        elif kind == "leave":
+            self.players.pop(event.get("id"), None)
+        elif kind == "kill":
+            killer, victim = SIDES.get(event.get("killer_side")), SIDES.get(event.get("victim_side"))
+            if killer in self.kills and killer != victim:
+                self.kills[killer] += 1
+            if victim in self.losses:
+                self.losses[victim] += 1
+        elif kind == "base_captured":
+            self.bases[event.get("base")] = SIDES.get(event.get("side"), "neutral")
+            self.captures += 1
+        if isinstance(event.get("t"), (int, float)):
+            self.model_time = event["t"]
+        self.recent.append(event)
+
+    def to_dict(self) -> dict:
+        return {
+            "instance": self.instance,
+            "started": self.started,
+            "model_time": self.model_time,
+            "players": sorted(name for name in self.players.values() if name),
+            "kills": self.kills,
+            "losses": self.losses,
+            "bases": self.bases,
+            "captures": self.captures,
+            "recent": list(self.recent),
+            "received_batches": self.received_batches,
+            "lost_batches": self.lost_batches,
+        }
+
+
+class LiveState:
+    """
+    Singleton-like consumer of the hook's event batches and owner of the live models.
+    """
+    models: Dict[str, LiveModel] = {}
+    queue: asyncio.Queue = None
+    dropped_batches = 0
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls):
+        if cls._task is None or cls._task.done():
+            cls.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    def on_events(cls, message: dict):
+        """
+        Queue an `events` batch from the hook, dropping the oldest one when full.
+        """
+        if cls.queue is None:
+            return
+        if cls.queue.full():
+            cls.queue.get_nowait()
+            cls.dropped_batches += 1
+        cls.queue.put_nowait(message)
+
+    @classmethod
+    def snapshot(cls, instance: str) -> Optional[dict]:
+        model = cls.models.get(instance)
+        return model.to_dict() if model else None
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            batches = [await cls.queue.get()]
+            while not cls.queue.empty():
+                batches.append(cls.queue.get_nowait())
+
+            changed = set()
+            for message in batches:
+                instance = message.get("instance") or Instances.main.name
+                if not isinstance(instance, str) or Instances.get(instance) is None:
+                    continue
+                try:
+                    cls.models.setdefault(instance, LiveModel(instance)).fold_batch(message)
+                    changed.add(instance)
+                except Exception as e:
+                    logger.error(f"[{instance}] Error folding hook events: {e}")
+
+            for instance in changed:
+                try:
+                    summary = cls.models[instance].to_dict()
+                    summary["recent"] = summary["recent"][-10:]
+                    EventBus.publish("live", summary)
+                except Exception as e:
+                    logger.error(f"[{instance}] Error publishing live state: {e}")
+            # Let batches accumulate instead of publishing every datagram
+            await asyncio.sleep(PUBLISH_INTERVAL)
+
+
+HookLink.on("events", LiveState.on_events)
@@ -1,15 +1,139 @@
+"""
+Application logger.
+
+Log calls only put the record on a queue (`QueueHandler`). A `QueueListener` thread
+formats and writes it to:
+- the console, with colors;
+- `logs/app.log`, rotated by size and daily, as text or JSON lines. Rotated files are
+  gzip-compressed and the oldest are deleted;
+- an in-memory ring buffer of recent records, tailed by the `/api/v1/logs` endpoint.
+
+`configure_logging` applies the `app.log_*` settings once the configuration is loaded.
+"""
+
+import atexit
+import gzip
+import json
 import os
+import queue
+import shutil
+import threading
+import time
 import logging
+import logging.handlers
 import colorlog
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+LOG_DIR = Path("logs")
+LOG_FILE = LOG_DIR / "app.log"
+LOG_BUFFER_SIZE = 2000  # records kept in memory for the log tail endpoint
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+TEXT_FORMAT = "%(asctime)s %(levelname)-8s %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record_to_dict(record, self))
+
+
+def record_to_dict(record: logging.LogRecord, formatter: logging.Formatter) -> dict:
+    entry = {
+        "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+        "level": record.levelname,
+        "message": record.getMessage(),
+        "thread": record.threadName,
+    }
+    if record.exc_info:
+        entry["exception"] = formatter.formatException(record.exc_info)
+    return entry
+
+
+class RotatingLogFile(logging.handlers.BaseRotatingHandler):
+    """
+    Log file rotated when it exceeds `max_bytes` (0 to disable) and, when `daily`, at
+    local midnight. Rotated files are renamed with their rotation time, gzip-compressed
+    and only the newest `backups` are kept. Runs in the listener thread only.
+    """
+    def __init__(self, filename: Path, max_bytes: int = 10 * 1024 * 1024, daily: bool = True, backups: int = 30):
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename, "a", encoding="utf-8", delay=False)
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.backups = backups
+        self.rollover_at = next_midnight(time.time())
+        # A file last written on a previous day belongs to that day
+        if daily and filename.stat().st_size and next_midnight(filename.stat().st_mtime) <= time.time():
+            self.doRollover()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.daily and time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes and self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+            return self.stream.tell() > 0
+        return False
+
+    def doRollover(self):
+        self.stream.close()
+        path = Path(self.baseFilename)
+        rotated = path.with_name(f"{path.stem}-{datetime.now():%Y-%m-%d_%H-%M-%S_%f}{path.suffix}")
+        if path.exists() and path.stat().st_size:
+            os.replace(path, rotated)
+            with rotated.open("rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            rotated.unlink()
+        self.prune()
+        self.stream = self._open()
+        self.rollover_at = next_midnight(time.time())
+
+    def prune(self):
+        path = Path(self.baseFilename)
+        rotated = sorted(path.parent.glob(f"{path.stem}-*{path.suffix}.gz"))
+        for old in rotated[:max(len(rotated) - self.backups, 0)]:
+            old.unlink(missing_ok=True)
+
+
+class LogBuffer(logging.Handler):
+    """
+    Ring buffer of the most recent records, as dicts with an increasing `seq`.
+    """
+    def __init__(self, size: int = LOG_BUFFER_SIZE):
+        super().__init__()
+        self.records = deque(maxlen=size)
+        self.seq = 0
+        self.records_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        entry = record_to_dict(record, self.formatter or logging.Formatter())
+        with self.records_lock:
+            self.seq += 1
+            self.records.append({"seq": self.seq, "levelno": record.levelno, **entry})
+
+    def since(self, seq: int, level: int = logging.NOTSET, limit: int = None) -> List[dict]:
+        """
+        Return the records after `seq` at or above `level`, the newest `limit` at most.
+        """
+        with self.records_lock:
+            records = [r for r in self.records if r["seq"] > seq and r["levelno"] >= level]
+        return records[-limit:] if limit else records
+
+
+def next_midnight(timestamp: float) -> float:
+    day = datetime.fromtimestamp(timestamp).date() + timedelta(days=1)
+    return datetime(day.year, day.month, day.day).timestamp()
 
 
 def setup_logger():
-    """Return a logger with a default ColoredFormatter."""
+    """Return a logger whose records are written by a background listener thread."""
     # Formatter for the stream handler with color codes
     stream_formatter = colorlog.ColoredFormatter(
         "%(cyan)s%(asctime)s %(log_color)s%(levelname)-8s%(reset)s %(message)s",
-        datefmt='%Y-%m-%d %H:%M:%S',
+        datefmt=DATE_FORMAT,
         reset=True,
         log_colors={
             "DEBUG": "blue",
@@ -22,31 +146,42 @@ def setup_logger():
         style='%',
     )
 
-    # Formatter for the file handler without color codes
-    file_formatter = logging.Formatter(
-        "%(asctime)s %(levelname)-8s %(message)s",
-        datefmt='%Y-%m-%d %H:%M:%S',
-    )
-
     logger = colorlog.getLogger("example_logger")
 
     # Stream handler
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(stream_formatter)
-    logger.addHandler(stream_handler)
 
-    # File handler
-    log_dir = 'logs'
-    os.makedirs(log_dir, exist_ok=True)
-    current_time = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    log_file = os.path.join(log_dir, f'{current_time}.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+    # File handler (plain text until the configuration is loaded)
+    file_handler = RotatingLogFile(LOG_FILE)
+    file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
 
+    listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(), stream_handler, file_handler, log_buffer, respect_handler_level=True
+    )
+    logger.addHandler(logging.handlers.QueueHandler(listener.queue))
     logger.setLevel(logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)  # flush the queue on exit
+
+    return logger, file_handler
+
+
+def configure_logging():
+    """
+    Apply the `app.log_*` settings to the log file (also on configuration reload).
+    """
+    from app.config import Config
 
-    return logger
+    with file_handler.lock:
+        file_handler.max_bytes = int(Config.get("app.log_max_size") * 1024 * 1024)
+        file_handler.daily = Config.get("app.log_daily_rotation")
+        file_handler.backups = Config.get("app.log_backups")
+        if Config.get("app.log_format") == "json":
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
 
 
-logger = setup_logger()
+log_buffer = LogBuffer()
+logger, file_handler = setup_logger()
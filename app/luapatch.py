@@ -0,0 +1,119 @@
+"""
+Patching of the DCS Lua files touched before each start (serverSettings.lua, MissionScripting.lua).
+
+Parsed and transformed contents are cached by file mtime/size and content hash, so a
+repeated start does not parse or rewrite files that are already correct. All writes are
+atomic (write to a temp file, then rename).
+"""
+
+import copy
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Tuple
+from app.logger import logger
+import luadata
+
+COMMENT_LINES = [
+    "sanitizeModule('os')",
+    "sanitizeModule('io')",
+    "sanitizeModule('lfs')",
+]
+
+
+class CachedText:
+    """
+    Text of a file together with the key it was read under.
+    """
+    __slots__ = ("key", "text", "digest")
+
+    def __init__(self, key: Tuple[int, int], text: str):
+        self.key = key
+        self.text = text
+        self.digest = hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class LuaPatcher:
+    """
+    Singleton-like cache of file contents, parsed settings and de-sanitized scripts.
+    """
+    _texts: Dict[Path, CachedText] = {}
+    _parsed: Dict[bytes, dict] = {}
+    _desanitized: Dict[bytes, str] = {}
+
+    @classmethod
+    def read_text(cls, path: Path) -> CachedText:
+        """
+        Read a file, reusing the cached text if its mtime and size did not change.
+        """
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = cls._texts.get(path)
+        if cached is None or cached.key != key:
+            cached = CachedText(key, path.read_text(encoding="utf-8"))
+            cls._texts[path] = cached
+        return cached
+
+    @classmethod
+    def read_settings(cls, path: Path) -> dict:
+        """
+        Parse serverSettings.lua, reusing the parsed table if the content did not change.
+        Returns:
+            dict: A copy of the settings that can be modified freely.
+        """
+        cached = cls.read_text(path)
+        cfg = cls._parsed.get(cached.digest)
+        if cfg is None:
+            cfg = luadata.unserialize(cached.text.strip(), encoding="utf-8")
+            cls._parsed = {cached.digest: cfg}
+        return copy.deepcopy(cfg)
+
+    @classmethod
+    def desanitize(cls, path: Path) -> str:
+        """
+        Return the content of MissionScripting.lua with the `os`, `io` and `lfs`
+        sanitization lines commented out.
+        """
+        cached = cls.read_text(path)
+        text = cls._desanitized.get(cached.digest)
+        if text is None:
+            lines = []
+            for line in cached.text.splitlines():
+                stripped_line = line.strip()
+                if stripped_line in COMMENT_LINES:
+                    line = f"\t-- {stripped_line}"
+                    logger.debug(f"MissionScripting.lua line de-sanitized: {line.strip()}")
+                lines.append(line)
+            text = "\n".join(lines)
+            cls._desanitized = {cached.digest: text}
+        return text
+
+    @classmethod
+    def write_if_changed(cls, path: Path, text: str) -> bool:
+        """
+        Atomically write `text` with LF line endings, unless the file already has this content.
+        Returns:
+            bool: True if the file was written.
+        """
+        try:
+            if cls.read_text(path).text == text:
+                return False
+        except FileNotFoundError:
+            pass
+
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", newline="\n", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        ) as f:
+            f.write(text)
+        os.replace(f.name, path)
+        stat = path.stat()
+        cls._texts[path] = CachedText((stat.st_mtime_ns, stat.st_size), text)
+        return True
+
+
+def serialize_settings(cfg: dict) -> str:
+    """
+    Serialize server settings the same way as DCS does (`cfg = {...}`).
+    """
+    return "cfg = " + luadata.serialize(cfg, encoding="utf-8", indent="    ")
@@ -1,78 +1,180 @@
 """
 Main entry point for the FastAPI application.
 Initializes the app, includes routes, and starts the server.
+
+The app is built by `create_app`, so importing this module has no side effects; the
+module attribute `app` is built on first access, for `uvicorn app.main:app`.
+Heavy imports and initialization happen inside the factory, and their cost is
+recorded in a startup timing report (logged and saved to `data/startup.json`).
 """
 
-from fastapi import FastAPI
-from fastapi.requests import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.errors import RateLimitExceeded
-from app.config import Config
-from app.routes import router_spa, router_api_v1
-from app.https import cert_file, key_file
-from app.logger import logger
+from app.timing import StartupReport
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
 import logging
 import asyncio
-import uvicorn
 
 DEBUG_DELAY = 0  # seconds, simulate slow response
-RATE_LIMITE = "100/hour"
-
-# Configs
-host = Config.get("app.host")
-port = Config.get("app.port")
-debug = Config.get("app.debug")
-log_level = logging.DEBUG if debug else logging.INFO
-logger.setLevel(log_level)
-
-# Initialize FastAPI app
-app = FastAPI()
-
-# Include routes
-app.include_router(router_spa, tags=["SPA"])
-app.include_router(router_api_v1, tags=["API"])
-
-# Serve static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-app.mount("/partials", StaticFiles(directory="app/templates/partials"), name="partials")
-
-# Set up rate limiting
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[RATE_LIMITE],
-)
-app.state.limiter = limiter
-app.add_exception_handler(
-    RateLimitExceeded,
-    lambda request, exc: JSONResponse(
-        status_code=429, content={"detail": "Rate limit exceeded"}
-    ),
-)
-app.add_middleware(SlowAPIMiddleware)
-
-
-if debug and DEBUG_DELAY > 0:
-    @app.middleware("http")
-    async def add_delay_middleware(request: Request, call_next):
-        # Apply delay only to routes starting with "/api"
-        if request.url.path.startswith(("/api", "/api/v1/files", "/api/v1/server")):
-            await asyncio.sleep(DEBUG_DELAY)
-        return await call_next(request)
+STARTUP_REPORT_JSON = Path("data/startup.json")
+
+
+def create_app():
+    """
+    Application factory: load the configuration, initialize DCS control and build the FastAPI app.
+    """
+    # Not imported at module level: on Windows the mission check worker process re-imports
+    # this module, and must not open the log file and start a listener of its own
+    from app.logger import logger, configure_logging
+
+    imports = StartupReport.imports
+    phases = StartupReport.phases
+
+    if StartupReport.process_started is None:
+        with imports.phase("psutil"):
+            import psutil
+        StartupReport.process_started = psutil.Process().create_time()
+
+    # Configs
+    with imports.phase("app.config"):
+        from app.config import Config, ConfigWatcher, load_or_exit
+    with phases.phase("load_config"):
+        load_or_exit()
+        configure_logging()
+        Config.on_reload(configure_logging)
+    debug = Config.get("app.debug")
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+
+    with imports.phase("fastapi"):
+        from fastapi import FastAPI
+        from fastapi.requests import Request
+        from fastapi.staticfiles import StaticFiles
+
+    with imports.phase("app.control"):
+        from app.control import initialize_or_exit
+    with phases.phase("initialize_dcs_control"):
+        initialize_or_exit()
+
+    with imports.phase("app.routes"):
+        from app.routes import router_spa, router_api_v1
+        from app.metrics import Metrics, MetricsMiddleware
+        from app.limiter import RateLimiter, RateLimitMiddleware
+        from app.watcher import ProcessWatcher
+        from app.sampler import ResourceSampler
+        from app.scheduler import Scheduler
+        from app.hooklink import HookLink
+        from app.events import StatusProducer
+        from app.statearchive import StateArchive
+        from app.livestate import LiveState
+        from app.mizindex import MizIndex
+        from app.uploads import UploadManager
+        from app.assets import Assets
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Background services
+        ConfigWatcher.start()
+        ProcessWatcher.start()
+        ResourceSampler.start()
+        StateArchive.start()
+        StatusProducer.start()
+        LiveState.start()
+        await MizIndex.start()
+        await UploadManager.start()
+        await HookLink.start()
+        Scheduler.start()
+
+        StartupReport.mark_ready()
+        logger.info(
+            f"Startup took {StartupReport.to_dict()['total_ms']:.0f}ms "
+            f"(imports: {imports.report()}; init: {phases.report()})"
+        )
+        await asyncio.to_thread(StartupReport.save, STARTUP_REPORT_JSON)
+
+        yield
+        Scheduler.stop()
+        HookLink.stop()
+        await LiveState.stop()
+        await UploadManager.stop()
+        MizIndex.stop()
+        await StatusProducer.stop()
+        ResourceSampler.stop()
+        ProcessWatcher.stop()
+        ConfigWatcher.stop()
+
+    with phases.phase("build_assets"):
+        Assets.build()
+
+    with phases.phase("build_app"):
+        # Initialize FastAPI app
+        app = FastAPI(lifespan=lifespan)
+
+        # Include routes
+        app.include_router(router_spa, tags=["SPA"])
+        app.include_router(router_api_v1, tags=["API"])
+
+        # Serve static files (unversioned; the page uses the fingerprinted /assets URLs)
+        app.mount("/static", StaticFiles(directory="app/static"), name="static")
+        app.mount("/partials", StaticFiles(directory="app/templates/partials"), name="partials")
+
+        # Set up rate limiting (per route class, see app.rate_limits)
+        RateLimiter.configure()
+        app.add_middleware(RateLimitMiddleware)
+
+        # Per-route request metrics (outermost middleware)
+        Metrics.register_routes(app.routes)
+        app.add_middleware(MetricsMiddleware)
+
+        if debug and DEBUG_DELAY > 0:
+            @app.middleware("http")
+            async def add_delay_middleware(request: Request, call_next):
+                # Apply delay only to routes starting with "/api"
+                if request.url.path.startswith(("/api", "/api/v1/files", "/api/v1/server")):
+                    await asyncio.sleep(DEBUG_DELAY)
+                return await call_next(request)
+
+    return app
+
+def __getattr__(name: str):
+    """
+    Build the app on first access of `app.main:app`, so `uvicorn app.main:app` keeps working
+    (`uvicorn --factory app.main:create_app` is equivalent).
+    """
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
+    import multiprocessing
+    import uvicorn
+    from app.config import Config, load_or_exit
+    from app.https import prepare_cert
+
+    multiprocessing.freeze_support()  # mission checks run in a worker process
+    load_or_exit()
+    host = Config.get("app.host")
+    port = Config.get("app.port")
+    debug = Config.get("app.debug")
+    log_level = logging.DEBUG if debug else logging.INFO
+    reload = bool(debug and __package__)
+
+    # Check/generate the HTTPS certificate while the app is being built
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="https-cert") as pool:
+        cert = pool.submit(prepare_cert)
+        uvicorn_app = "app.main:create_app" if reload else create_app()
+        cert_file, key_file = cert.result()
+
     # Start web server
-    uvicorn_app = "app.main:app" if __package__ else app
     uvicorn.run(
         uvicorn_app,
+        factory=reload,
         host=host,
         port=port,
         log_level=log_level,
-        reload=debug and __package__,
+        reload=reload,
         access_log=log_level == logging.DEBUG,
         ssl_keyfile=key_file,
         ssl_certfile=cert_file,
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,256 @@
+"""
+Prometheus-style metrics for the remote app and the DCS process, served at `/metrics`.
+
+Counters and histograms are preallocated when the app is built: recording a request,
+an upload chunk or a rejection is a dict lookup plus a bucket increment, and label
+strings are only formatted when the metrics are scraped.
+"""
+
+import bisect
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import psutil
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+JOB_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # seconds
+THROUGHPUT_BUCKETS = (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)  # bytes per second
+
+UPLOAD_KINDS = ("miz", "resumable", "delta")
+AUTH_FAILURE_REASONS = ("missing", "malformed", "invalid")
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; `counts[i]` holds the observations <= `bounds[i]`
+    (not cumulative), the last slot those above every bound.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def expose(self, name: str, labels: str, lines: List[str]):
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels.rstrip(',')}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels.rstrip(',')}}} {cumulative}")
+
+
+class RouteMetrics:
+    """
+    Latency histogram and responses by status class (1xx-5xx) of one API route.
+    """
+    __slots__ = ("method", "path", "latency", "responses")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.responses = [0] * 6
+
+    def observe(self, seconds: float, status: int):
+        self.latency.observe(seconds)
+        self.responses[min(status // 100, 5)] += 1
+
+
+class Metrics:
+    """
+    Singleton-like registry of the app metrics.
+    - Route metrics are registered once per API route by `register_routes`.
+    - Job phase histograms are created on first use, when a job finishes.
+    """
+    routes: Dict[int, RouteMetrics] = {}
+    upload_bytes: Dict[str, Counter] = {kind: Counter() for kind in UPLOAD_KINDS}
+    upload_throughput: Dict[str, Histogram] = {kind: Histogram(THROUGHPUT_BUCKETS) for kind in UPLOAD_KINDS}
+    auth_failures: Dict[str, Counter] = {reason: Counter() for reason in AUTH_FAILURE_REASONS}
+    rate_limited = Counter()
+    jobs: Dict[Tuple[str, str, str], Histogram] = {}
+    job_phases: Dict[Tuple[str, str, str], Histogram] = {}
+
+    @classmethod
+    def register_routes(cls, routes, prefix: str = "/api/v1"):
+        """
+        Preallocate metrics for the API routes of the app, keyed by route object id
+        (routes are not hashable).
+        """
+        for route in routes:
+            path = getattr(route, "path", "")
+            methods = getattr(route, "methods", None)
+            if path.startswith(prefix) and methods:
+                cls.routes[id(route)] = RouteMetrics(",".join(sorted(methods)), path)
+
+    @classmethod
+    def observe_job(cls, instance: str, action: str, state: str, seconds: float, phases: Dict[str, float]):
+        """
+        Record the duration of a finished job and of each of its phases (in seconds).
+        """
+        histogram = cls.jobs.get((instance, action, state))
+        if histogram is None:
+            histogram = cls.jobs[(instance, action, state)] = Histogram(JOB_BUCKETS)
+        histogram.observe(seconds)
+        for phase, phase_seconds in phases.items():
+            histogram = cls.job_phases.get((instance, action, phase))
+            if histogram is None:
+                histogram = cls.job_phases[(instance, action, phase)] = Histogram(JOB_BUCKETS)
+            histogram.observe(phase_seconds)
+
+    @classmethod
+    def expose(cls, dcs_processes: Dict[str, Optional[psutil.Process]]) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def header(name: str, kind: str, text: str):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        name = "dcs_remote_http_request_duration_seconds"
+        header(name, "histogram", "Time until the response starts, per API route.")
+        for route in cls.routes.values():
+            route.latency.expose(name, f'method="{route.method}",route="{route.path}",', lines)
+
+        name = "dcs_remote_http_responses_total"
+        header(name, "counter", "API responses per route and status class.")
+        for route in cls.routes.values():
+            for code in range(1, 6):
+                if route.responses[code]:
+                    lines.append(
+                        f'{name}{{method="{route.method}",route="{route.path}",code="{code}xx"}} {route.responses[code]}'
+                    )
+
+        name = "dcs_remote_upload_bytes_total"
+        header(name, "counter", "Mission file bytes received, per upload method.")
+        for kind, counter in cls.upload_bytes.items():
+            lines.append(f'{name}{{kind="{kind}"}} {counter.value}')
+
+        name = "dcs_remote_upload_throughput_bytes_per_second"
+        header(name, "histogram", "Throughput of each upload request body, per upload method.")
+        for kind, histogram in cls.upload_throughput.items():
+            histogram.expose(name, f'kind="{kind}",', lines)
+
+        name = "dcs_remote_job_duration_seconds"
+        header(name, "histogram", "Duration of start/stop jobs.")
+        for (instance, action, state), histogram in cls.jobs.items():
+            histogram.expose(name, f'instance="{instance}",action="{action}",state="{state}",', lines)
+
+        name = "dcs_remote_job_phase_duration_seconds"
+        header(name, "histogram", "Duration of each phase of start/stop jobs.")
+        for (instance, action, phase), histogram in cls.job_phases.items():
+            histogram.expose(name, f'instance="{instance}",action="{action}",phase="{phase}",', lines)
+
+        name = "dcs_remote_rate_limited_total"
+        header(name, "counter", "Requests rejected by the rate limiter.")
+        lines.append(f"{name} {cls.rate_limited.value}")
+
+        name = "dcs_remote_auth_failures_total"
+        header(name, "counter", "Rejected authentication attempts, per reason.")
+        for reason, counter in cls.auth_failures.items():
+            lines.append(f'{name}{{reason="{reason}"}} {counter.value}')
+
+        expose_processes(lines, header, "process", {None: psutil.Process(os.getpid())}, "The remote app process")
+
+        name = "dcs_server_up"
+        header(name, "gauge", "Whether the DCS server process is running, per instance.")
+        for instance, process in dcs_processes.items():
+            lines.append(f'{name}{{instance="{instance}"}} {1 if process else 0}')
+        running = {instance: process for instance, process in dcs_processes.items() if process}
+        if running:
+            expose_processes(lines, header, "dcs_server", running, "The DCS server process")
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+def expose_processes(lines: List[str], header, prefix: str, processes: Dict[Optional[str], psutil.Process], text: str):
+    """
+    Append CPU, memory and start time gauges of processes, labelled by instance
+    (no label for the None key).
+    """
+    samples = {}
+    for instance, process in processes.items():
+        try:
+            with process.oneshot():
+                cpu = process.cpu_times()
+                samples[instance] = (cpu.user + cpu.system, process.memory_info().rss, process.create_time())
+        except psutil.Error:
+            continue
+
+    for i, (suffix, kind, help_text) in enumerate((
+        ("cpu_seconds_total", "counter", "user and system CPU time."),
+        ("resident_memory_bytes", "gauge", "resident memory size."),
+        ("start_time_seconds", "gauge", "start time since the epoch."),
+    )):
+        name = f"{prefix}_{suffix}"
+        header(name, kind, f"{text}: {help_text}")
+        for instance, values in samples.items():
+            labels = f'{{instance="{instance}"}}' if instance is not None else ""
+            lines.append(f"{name}{labels} {values[i]}")
+
+
+async def count_upload(chunks: AsyncIterator[bytes], kind: str) -> AsyncIterator[bytes]:
+    """
+    Pass an upload stream through, counting its bytes and recording its throughput.
+    """
+    counter = Metrics.upload_bytes[kind]
+    total = 0
+    start = time.perf_counter()
+    async for chunk in chunks:
+        total += len(chunk)
+        counter.inc(len(chunk))
+        yield chunk
+    elapsed = time.perf_counter() - start
+    if total and elapsed > 0:
+        Metrics.upload_throughput[kind].observe(total / elapsed)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency (until the response starts) and the status of
+    every request matched to a registered API route.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        elapsed = None
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal elapsed, status
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = Metrics.routes.get(id(scope.get("route")))
+            if route is not None:
+                route.observe(elapsed if elapsed is not None else time.perf_counter() - start, status)
@@ -0,0 +1,99 @@
+"""
+Validation and metadata extraction of .miz mission files.
+
+Runs in a worker process (see `app.mizindex`): parsing the `mission` entry of a large
+campaign takes seconds of pure-Python CPU time, which would otherwise hold the GIL away
+from the event loop. This module therefore only imports what the check needs.
+"""
+
+import zipfile
+import zlib
+from pathlib import Path
+import luadata
+
+CLIENT_SKILLS = ("Client", "Player")
+FLIGHT_CATEGORIES = ("plane", "helicopter")
+
+
+def inspect_miz(path: str) -> dict:
+    """
+    Check the zip central directory and the CRC of every member of a .miz, then read the
+    mission metadata from its `mission` entry.
+    Returns:
+        dict: {"valid", "error", "size", "entries", "uncompressed_size"} and, for a
+        readable mission, {"theatre", "date", "start_time", "coalitions", "flights"}.
+    """
+    info = {"valid": False, "error": None, "size": Path(path).stat().st_size}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = archive.infolist()
+            info["entries"] = len(members)
+            info["uncompressed_size"] = sum(m.file_size for m in members)
+            bad = archive.testzip()
+            if bad is not None:
+                info["error"] = f"CRC mismatch in '{bad}'"
+                return info
+            if "mission" not in archive.NameToInfo:
+                info["error"] = "No 'mission' entry in the archive"
+                return info
+            data = archive.read("mission")
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, ValueError) as e:
+        info["error"] = f"Not a valid .miz archive: {e}"
+        return info
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        info["error"] = f"The 'mission' entry is not UTF-8 text: {e}"
+        return info
+
+    try:
+        mission = luadata.unserialize(text, encoding="utf-8")
+    except Exception as e:
+        info["error"] = f"Cannot parse the 'mission' entry: {e}"
+        return info
+    if not isinstance(mission, dict) or "theatre" not in mission:
+        info["error"] = "The 'mission' entry is not a DCS mission"
+        return info
+
+    try:
+        info.update(mission_metadata(mission))
+    except Exception as e:
+        info["error"] = f"Invalid mission data: {type(e).__name__}: {e}"
+        return info
+    info["valid"] = True
+    return info
+
+def mission_metadata(mission: dict) -> dict:
+    """
+    Read the theatre, date and flights of a parsed mission.
+    Raises:
+        Exception: If the mission tables do not have the expected types.
+    """
+    date = mission.get("date") or {}
+    coalitions = {}
+    for side, coalition in (mission.get("coalition") or {}).items():
+        countries, flights, client_slots = [], 0, 0
+        for country in items(coalition.get("country")):
+            countries.append(country.get("name"))
+            for category in FLIGHT_CATEGORIES:
+                for group in items((country.get(category) or {}).get("group")):
+                    flights += 1
+                    client_slots += sum(unit.get("skill") in CLIENT_SKILLS for unit in items(group.get("units")))
+        coalitions[side] = {"countries": countries, "flights": flights, "client_slots": client_slots}
+    return {
+        "theatre": mission.get("theatre"),
+        "date": f"{date.get('Year', 0):04d}-{date.get('Month', 0):02d}-{date.get('Day', 0):02d}" if date else None,
+        "start_time": mission.get("start_time"),
+        "coalitions": coalitions,
+        "flights": sum(c["flights"] for c in coalitions.values()),
+    }
+
+def items(table) -> list:
+    """
+    Values of a Lua array, which is parsed as a list or as a dict with integer keys.
+    """
+    if isinstance(table, dict):
+        return [v for v in table.values() if isinstance(v, dict)]
+    if isinstance(table, list):
+        return [v for v in table if isinstance(v, dict)]
+    return []
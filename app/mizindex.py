@@ -0,0 +1,162 @@
+"""
+Index of checked .miz files, and what each instance will run on its next start.
+
+After every upload (and at startup) the staged mission of an instance is hashed in a worker
+thread and looked up in the index; a file not seen before is checked by `app.mizcheck` in
+a worker process. Results are kept by file hash in `data/miz_index.json`, so the status
+endpoint and the web interface show the staged mission from memory, and a file is only
+checked once however often it is staged.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.control import DCSControl, Instances, UPLOAD_CHUNK_SIZE
+from app.events import EventBus
+from app.logger import logger
+from app.mizcheck import inspect_miz
+
+INDEX_JSON = Path("data/miz_index.json").absolute()
+MAX_INDEX_ENTRIES = 64  # checked files remembered, the oldest are forgotten
+
+
+class MizIndex:
+    """
+    Singleton-like index of checked mission files and the staged mission of each instance.
+    All methods except the blocking helpers run on the event loop.
+    """
+    checked: Dict[str, dict] = {}  # sha256: check result, oldest first
+    staged: Dict[str, dict] = {}  # instance: staged mission
+    _generation: Dict[str, int] = {}
+    _pool: Optional[ProcessPoolExecutor] = None
+    _startup: Optional[asyncio.Future] = None
+
+    @classmethod
+    async def start(cls):
+        """
+        Load the index and check the staged mission of every instance.
+        """
+        cls.checked = await run_in_threadpool(load_index)
+        cls._startup = asyncio.gather(*(cls.check(dcs) for dcs in Instances.all()))
+
+    @classmethod
+    def stop(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
+
+    @classmethod
+    async def check(cls, dcs: DCSControl):
+        """
+        Check the staged mission of `dcs` and publish the result as a `mission` event.
+        """
+        generation = cls._generation[dcs.name] = cls._generation.get(dcs.name, 0) + 1
+        try:
+            staged = await run_in_threadpool(lambda: stat_and_hash(dcs.staged_mission()))
+        except FileNotFoundError:
+            staged = None
+        except OSError as e:
+            logger.error(f"[{dcs.name}] Cannot read the staged mission file: {e}")
+            return
+
+        if staged is not None:
+            result = cls.checked.get(staged["sha256"])
+            if result is None:
+                if generation == cls._generation[dcs.name]:
+                    cls.publish(dcs.name, {**staged, "state": "checking"})
+                start = time.perf_counter()
+                try:
+                    result = await cls.inspect(staged["path"])
+                except Exception as e:
+                    # Not remembered: the file may be readable on the next check
+                    logger.error(f"[{dcs.name}] Cannot check the staged mission file: {e}")
+                    result = {"valid": False, "error": f"Cannot check the file: {e}"}
+                else:
+                    logger.debug(f"[{dcs.name}] {Path(staged['path']).name} checked in {time.perf_counter() - start:.2f}s")
+                    cls.checked.pop(staged["sha256"], None)
+                    cls.checked[staged["sha256"]] = result
+                    while len(cls.checked) > MAX_INDEX_ENTRIES:
+                        cls.checked.pop(next(iter(cls.checked)))
+                    await run_in_threadpool(save_index, dict(cls.checked))
+            staged = {**staged, **result, "state": "valid" if result["valid"] else "invalid"}
+            if not result["valid"]:
+                logger.warning(f"[{dcs.name}] Staged mission {Path(staged['path']).name} is invalid: {result['error']}")
+        if generation == cls._generation[dcs.name]:  # a newer upload is checked meanwhile
+            cls.publish(dcs.name, staged)
+
+    @classmethod
+    async def inspect(cls, path: str) -> dict:
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(max_workers=1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(cls._pool, inspect_miz, path)
+        except BrokenProcessPool:
+            cls._pool = None
+            logger.warning("Mission check worker process failed, checking in a thread instead")
+            return await run_in_threadpool(inspect_miz, path)
+
+    @classmethod
+    def publish(cls, instance: str, staged: Optional[dict]):
+        if staged is None:
+            cls.staged.pop(instance, None)
+        else:
+            cls.staged[instance] = staged
+        EventBus.publish("mission", {"instance": instance, "mission": cls.summary(instance)})
+
+    @classmethod
+    def summary(cls, instance: str) -> Optional[dict]:
+        """
+        Return the staged mission of an instance for the API, without internal fields.
+        """
+        staged = cls.staged.get(instance)
+        if staged is None:
+            return None
+        return {"filename": Path(staged["path"]).name, **{k: v for k, v in staged.items() if k not in ("path", "mtime_ns")}}
+
+    @classmethod
+    def start_error(cls, dcs: DCSControl) -> Optional[str]:
+        """
+        Return why the staged mission of `dcs` cannot be started, if it was found invalid
+        and has not changed since. Blocks on a file stat.
+        """
+        staged = cls.staged.get(dcs.name)
+        if staged is None or staged["state"] != "invalid":
+            return None
+        try:
+            stat = os.stat(staged["path"])
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (staged["mtime_ns"], staged["size"]):
+            return None
+        return f"Mission file '{Path(staged['path']).name}' is invalid: {staged['error']}"
+
+
+def stat_and_hash(path: Path) -> dict:
+    stat = path.stat()
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return {"path": str(path), "sha256": digest.hexdigest(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def load_index() -> Dict[str, dict]:
+    try:
+        return json.loads(INDEX_JSON.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logger.warning(f"Ignoring invalid mission index {INDEX_JSON}")
+        return {}
+
+def save_index(checked: Dict[str, dict]):
+    INDEX_JSON.parent.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_JSON.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checked), encoding="utf-8")
+    os.replace(tmp, INDEX_JSON)
@@ -0,0 +1,419 @@
+"""
+Content-addressed store of .miz archive entries for delta uploads.
+
+A .miz is a zip archive whose entries (kneeboards, sounds, scripts, ...) mostly stay
+byte-identical from one turn to the next. Every uploaded mission is split into its raw,
+still-compressed entries, stored under their SHA-256. A client can then send a manifest
+of entry hashes, upload only the entries the store is missing, and have the server
+rebuild the archive from the store.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import AsyncIterator, List
+from fastapi.concurrency import run_in_threadpool
+from app.control import DCSControl, FileTooLargeError, UPLOAD_CHUNK_SIZE, discard_file
+from app.logger import logger
+
+STORE_DIR = Path("data/miz_store").absolute()
+KEEP_MANIFESTS = 3  # objects referenced by the last N archives are kept
+ORPHAN_GRACE = 60 * 60  # seconds an unreferenced object survives, so in-progress delta uploads are not collected
+
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+ZIP_VERSION = 20
+ZIP32_LIMIT = 0xFFFFFFFF
+OBJECT_FRAME = struct.Struct(">32sQ")  # raw SHA-256 digest, data length
+# Largest value of each integer manifest field, as stored in the zip headers
+ENTRY_INT_LIMITS = {
+    "method": 0xFFFF, "flags": 0xFFFF, "crc32": 0xFFFFFFFF, "compress_size": ZIP32_LIMIT - 1,
+    "file_size": ZIP32_LIMIT - 1, "dos_time": 0xFFFF, "dos_date": 0xFFFF,
+}
+
+
+class DeltaError(Exception):
+    """
+    Raised when a manifest or an uploaded object is invalid.
+    """
+
+
+class EntryMismatchError(DeltaError):
+    """
+    Raised when a stored object does not match the size, CRC or uncompressed size of its manifest entry.
+    """
+
+
+class MizEntry:
+    """
+    One archive entry: its zip metadata and the SHA-256 of its raw (compressed) data.
+    """
+    __slots__ = ("name", "sha256", "method", "flags", "crc32", "compress_size", "file_size", "dos_time", "dos_date")
+
+    def __init__(self, name: str, sha256: str, method: int, flags: int, crc32: int,
+                 compress_size: int, file_size: int, dos_time: int, dos_date: int):
+        self.name = name
+        self.sha256 = sha256
+        self.method = method
+        self.flags = flags & ~FLAG_DATA_DESCRIPTOR
+        self.crc32 = crc32
+        self.compress_size = compress_size
+        self.file_size = file_size
+        self.dos_time = dos_time
+        self.dos_date = dos_date
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MizEntry":
+        try:
+            entry = cls(**{key: data[key] for key in cls.__slots__})
+        except (KeyError, TypeError) as e:
+            raise DeltaError(f"Invalid manifest entry: {e}")
+        if not isinstance(entry.name, str) or not entry.name or not is_sha256(entry.sha256):
+            raise DeltaError(f"Invalid manifest entry: {data.get('name')}")
+        for key, limit in ENTRY_INT_LIMITS.items():
+            value = data[key]
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise DeltaError(f"Invalid manifest entry: {entry.name}: {key} must be a non-negative integer")
+            if value > limit:
+                if key in ("compress_size", "file_size"):
+                    raise DeltaError(f"Entry too large for delta upload: {entry.name}")
+                raise DeltaError(f"Invalid manifest entry: {entry.name}: {key} out of range")
+        return entry
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class IncomingObject:
+    """
+    An object being received from a delta upload stream: written to a temp file in the
+    store and hashed as its data arrives. The blocking methods run in a worker thread.
+    """
+    def __init__(self, digest: bytes, length: int):
+        self.digest = digest
+        self.remaining = length
+        self.buffer = bytearray()
+        self.sha256 = hashlib.sha256()
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=STORE_DIR, suffix=".part", delete=False)
+        self.path = Path(self.file.name)
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.sha256.update(self.buffer)
+        self.buffer.clear()
+
+    def discard(self):
+        discard_file(self.file, self.path)
+
+
+class MizStore:
+    """
+    Singleton-like content-addressed store of raw .miz entries.
+    """
+    objects_dir = STORE_DIR / "objects"
+    manifests_json = STORE_DIR / "manifests.json"
+    lock = threading.Lock()
+
+    @classmethod
+    def object_path(cls, sha256: str) -> Path:
+        return cls.objects_dir / sha256[:2] / sha256
+
+    @classmethod
+    def missing(cls, entries: List[MizEntry]) -> List[str]:
+        """
+        Return the hashes of the entries that are not in the store, without duplicates.
+        """
+        missing = []
+        for sha256 in dict.fromkeys(e.sha256 for e in entries):
+            path = cls.object_path(sha256)
+            try:
+                # Refresh present objects so they survive garbage collection until the commit
+                os.utime(path)
+            except FileNotFoundError:
+                missing.append(sha256)
+        return missing
+
+    @classmethod
+    def put_object(cls, sha256: str, data: bytes):
+        """
+        Store raw entry data under its SHA-256.
+        """
+        path = cls.object_path(sha256)
+        if path.exists():
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".part", delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+    @classmethod
+    def store_object(cls, incoming: IncomingObject):
+        """
+        Verify a fully received object against its digest and move it into place.
+        Raises:
+            DeltaError: If the object does not match its digest.
+        """
+        incoming.flush()
+        incoming.file.close()
+        sha256 = incoming.digest.hex()
+        if incoming.sha256.digest() != incoming.digest:
+            raise DeltaError(f"Object {sha256} does not match its hash")
+        path = cls.object_path(sha256)
+        if path.exists():
+            os.utime(path)
+            incoming.path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(incoming.path, path)
+
+    @classmethod
+    async def receive_objects(cls, chunks: AsyncIterator[bytes], max_size: int = 0) -> int:
+        """
+        Store a stream of framed objects: each frame is a 32-byte SHA-256 digest, an 8-byte
+        big-endian length and the raw entry data. Object data is streamed to a temp file and
+        hashed as it arrives, so memory use does not depend on the object sizes; every object
+        is verified against its digest before it is moved into the store.
+        Returns:
+            int: The number of objects received.
+        Raises:
+            DeltaError: If a frame is truncated or an object does not match its digest.
+            FileTooLargeError: If the stream exceeds `max_size` bytes (0 to disable).
+        """
+        header = bytearray()
+        incoming = None
+        count = 0
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise FileTooLargeError(f"Upload exceeds the limit of {max_size} bytes")
+                view = memoryview(chunk)
+                while view:
+                    if incoming is None:
+                        needed = OBJECT_FRAME.size - len(header)
+                        header += view[:needed]
+                        view = view[needed:]
+                        if len(header) < OBJECT_FRAME.size:
+                            break
+                        digest, length = OBJECT_FRAME.unpack(header)
+                        header.clear()
+                        if length >= ZIP32_LIMIT:
+                            raise DeltaError("Object too large")
+                        incoming = await run_in_threadpool(IncomingObject, digest, length)
+                    taken = view[:incoming.remaining]
+                    incoming.buffer += taken
+                    incoming.remaining -= len(taken)
+                    view = view[len(taken):]
+                    if incoming.remaining == 0:
+                        await run_in_threadpool(cls.store_object, incoming)
+                        incoming = None
+                        count += 1
+                    elif len(incoming.buffer) >= UPLOAD_CHUNK_SIZE:
+                        await run_in_threadpool(incoming.flush)
+            if header or incoming is not None:
+                raise DeltaError("Truncated object stream")
+        except BaseException:
+            if incoming is not None:
+                await run_in_threadpool(incoming.discard)
+            raise
+        return count
+
+    @classmethod
+    def build(cls, dcs: DCSControl, entries: List[MizEntry], filename: str, max_size: int = 0) -> int:
+        """
+        Rebuild a .miz from stored entries and commit it as the current mission file of `dcs`.
+        Returns:
+            int: Size of the built archive.
+        Raises:
+            DeltaError: If an entry is not in the store.
+            EntryMismatchError: If a stored object does not match its manifest entry.
+            FileTooLargeError: If the archive would exceed `max_size` (0 to disable).
+        """
+        missing = cls.missing(entries)
+        if missing:
+            raise DeltaError(f"{len(missing)} entries are missing from the store")
+        # Offsets are computed from the manifest, so its sizes must match the stored data
+        for entry in entries:
+            size = cls.object_path(entry.sha256).stat().st_size
+            if size != entry.compress_size:
+                raise EntryMismatchError(
+                    f"Entry {entry.name}: compress_size is {entry.compress_size}, the stored object has {size} bytes"
+                )
+
+        tmp = tempfile.NamedTemporaryFile(dir=dcs.mission_dir, prefix=f".{filename}.", suffix=".part", delete=False)
+        tmp_path = Path(tmp.name)
+        try:
+            size = write_archive(tmp, entries, cls.object_path, max_size)
+            tmp.close()
+            dcs.commit_mission_file(tmp_path, filename)
+        except BaseException:
+            discard_file(tmp, tmp_path)
+            raise
+        cls.record_manifest(entries)
+        return size
+
+    @classmethod
+    def ingest(cls, path: Path):
+        """
+        Split an uploaded archive into the store so later uploads can be sent as a delta.
+        Archives that cannot be read as zip are ignored.
+        """
+        start = time.perf_counter()
+        try:
+            entries = []
+            with zipfile.ZipFile(path) as archive, path.open("rb") as f:
+                for info in archive.infolist():
+                    if max(info.compress_size, info.file_size, info.header_offset) >= ZIP32_LIMIT:
+                        logger.debug(f"Skipping delta store ingest of {path.name}: zip64 archive")
+                        return
+                    f.seek(info.header_offset)
+                    header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+                    f.seek(header[-2] + header[-1], os.SEEK_CUR)
+                    data = f.read(info.compress_size)
+                    sha256 = hashlib.sha256(data).hexdigest()
+                    cls.put_object(sha256, data)
+                    entries.append(MizEntry(
+                        info.filename, sha256, info.compress_type, info.flag_bits, info.CRC,
+                        info.compress_size, info.file_size, *dos_time_date(info.date_time),
+                    ))
+        except (zipfile.BadZipFile, struct.error, OSError) as e:
+            logger.debug(f"Skipping delta store ingest of {path.name}: {e}")
+            return
+        cls.record_manifest(entries)
+        logger.debug(f"{path.name} ingested into delta store ({len(entries)} entries, {time.perf_counter() - start:.2f}s)")
+
+    @classmethod
+    def record_manifest(cls, entries: List[MizEntry]):
+        """
+        Remember the entries of the latest archive, and collect objects no longer referenced.
+        """
+        with cls.lock:
+            manifests = []
+            if cls.manifests_json.exists():
+                try:
+                    manifests = json.loads(cls.manifests_json.read_text(encoding="utf-8"))
+                except ValueError:
+                    logger.warning(f"Ignoring invalid delta store manifests {cls.manifests_json}")
+                if not isinstance(manifests, list):
+                    manifests = []
+            manifests.append(sorted({e.sha256 for e in entries}))
+            manifests = manifests[-KEEP_MANIFESTS:]
+            STORE_DIR.mkdir(parents=True, exist_ok=True)
+            cls.manifests_json.write_text(json.dumps(manifests), encoding="utf-8")
+            cls.collect({h for manifest in manifests for h in manifest})
+
+    @classmethod
+    def collect(cls, keep: set):
+        """
+        Delete stored objects that are not in `keep` and older than `ORPHAN_GRACE`.
+        """
+        cutoff = time.time() - ORPHAN_GRACE
+        removed = 0
+        for path in cls.objects_dir.glob("*/*"):
+            if path.name not in keep and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        # Objects of interrupted uploads
+        for path in STORE_DIR.glob("*.part"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        if removed:
+            logger.debug(f"Delta store: {removed} unreferenced objects removed")
+
+
+def is_sha256(value) -> bool:
+    return isinstance(value, str) and len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+def dos_time_date(date_time: tuple) -> tuple:
+    """
+    Convert a zipfile `date_time` tuple to the (time, date) pair stored in zip headers.
+    """
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+class EntryChecker:
+    """
+    CRC-32 and size of the uncompressed data of a stored (0) or deflated (8) entry,
+    fed with its raw data. Other compression methods are not checked.
+    """
+    def __init__(self, entry: MizEntry):
+        self.entry = entry
+        self.crc32 = 0
+        self.size = 0
+        self.inflater = zlib.decompressobj(-zlib.MAX_WBITS) if entry.method == zipfile.ZIP_DEFLATED else None
+        self.checked = entry.method in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+    def update(self, raw: bytes):
+        if not self.checked:
+            return
+        try:
+            data = self.inflater.decompress(raw) if self.inflater else raw
+        except zlib.error as e:
+            raise EntryMismatchError(f"Entry {self.entry.name}: invalid deflate data: {e}")
+        self.crc32 = zlib.crc32(data, self.crc32)
+        self.size += len(data)
+
+    def verify(self):
+        if not self.checked:
+            return
+        if self.inflater:
+            self.update(b"")
+            data = self.inflater.flush()
+            self.crc32 = zlib.crc32(data, self.crc32)
+            self.size += len(data)
+        if self.size != self.entry.file_size or self.crc32 != self.entry.crc32:
+            raise EntryMismatchError(f"Entry {self.entry.name}: CRC or file_size does not match the stored data")
+
+def write_archive(f, entries: List[MizEntry], object_path, max_size: int = 0) -> int:
+    """
+    Write a zip archive from raw entry data without recompressing anything.
+    Stored and deflated entries are decompressed on the fly to check their CRC and size.
+    Returns:
+        int: Size of the archive.
+    Raises:
+        EntryMismatchError: If an entry does not match its CRC or uncompressed size.
+    """
+    if len(entries) > 0xFFFF:
+        raise DeltaError("Too many entries for delta upload")
+    central = bytearray()
+    offset = 0
+    for entry in entries:
+        name = entry.name.encode("utf-8")
+        flags = entry.flags | (FLAG_UTF8 if not entry.name.isascii() else 0)
+        if offset >= ZIP32_LIMIT:
+            raise DeltaError("Archive too large for delta upload")
+        if max_size and offset + entry.compress_size > max_size:
+            raise FileTooLargeError(f"Upload exceeds the limit of {max_size} bytes")
+        f.write(LOCAL_HEADER.pack(
+            b"PK\x03\x04", ZIP_VERSION, 0, flags, entry.method, entry.dos_time, entry.dos_date,
+            entry.crc32, entry.compress_size, entry.file_size, len(name), 0,
+        ))
+        f.write(name)
+        checker = EntryChecker(entry)
+        with object_path(entry.sha256).open("rb") as data:
+            while chunk := data.read(UPLOAD_CHUNK_SIZE):
+                checker.update(chunk)
+                f.write(chunk)
+        checker.verify()
+        central += CENTRAL_HEADER.pack(
+            b"PK\x01\x02", ZIP_VERSION, 0, ZIP_VERSION, 0, flags, entry.method, entry.dos_time, entry.dos_date,
+            entry.crc32, entry.compress_size, entry.file_size, len(name), 0, 0, 0, 0, 0, offset,
+        ) + name
+        offset += LOCAL_HEADER.size + len(name) + entry.compress_size
+
+    f.write(central)
+    f.write(END_RECORD.pack(b"PK\x05\x06", 0, 0, len(entries), len(entries), len(central), offset, 0))
+    return offset + len(central) + END_RECORD.size
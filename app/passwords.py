@@ -0,0 +1,119 @@
+"""
+Password hashing and verification for user credentials in `config.yaml`.
+
+Supported hash formats:
+- `scrypt$<n>$<r>$<p>$<salt>$<hash>` (standard library, used by `hash_password`)
+- `$argon2...` (requires the `argon2-cffi` package)
+- `$2a$`/`$2b$`/`$2y$` bcrypt (requires the `bcrypt` package)
+
+Generate a hash with: python -m app.passwords
+"""
+
+import base64
+import functools
+import hashlib
+import hmac
+import secrets
+
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with scrypt and a random salt.
+    """
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, maxmem=SCRYPT_MAXMEM)
+    return "$".join(["scrypt", str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P), b64(salt), b64(digest)])
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """
+    Check a password against a stored hash. This is deliberately slow.
+    Raises:
+        ValueError: If the hash format is unknown or its library is not installed.
+    """
+    if password_hash.startswith("scrypt$"):
+        _, n, r, p, salt, expected = password_hash.split("$")
+        digest = hashlib.scrypt(
+            password.encode("utf-8"), salt=unb64(salt), n=int(n), r=int(r), p=int(p), maxmem=SCRYPT_MAXMEM
+        )
+        return hmac.compare_digest(digest, unb64(expected))
+
+    if password_hash.startswith("$argon2"):
+        try:
+            from argon2 import PasswordHasher
+            from argon2.exceptions import VerificationError, InvalidHashError
+        except ImportError:
+            raise ValueError("argon2 password hashes require the 'argon2-cffi' package")
+        try:
+            return PasswordHasher().verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    if password_hash.startswith(("$2a$", "$2b$", "$2y$")):
+        try:
+            import bcrypt
+        except ImportError:
+            raise ValueError("bcrypt password hashes require the 'bcrypt' package")
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+    raise ValueError("Unknown password hash format")
+
+@functools.lru_cache(maxsize=8)
+def dummy_hash(like: str) -> str:
+    """
+    Return a hash that matches no password, with the format and cost parameters of `like`,
+    so verifying against it takes as long as verifying against `like`.
+    Raises:
+        ValueError: If the hash format is unknown or its library is not installed.
+    """
+    password = secrets.token_urlsafe(16)
+    if like.startswith("scrypt$"):
+        _, n, r, p, salt, expected = like.split("$")
+        return "$".join(["scrypt", n, r, p, b64(secrets.token_bytes(16)), b64(secrets.token_bytes(len(unb64(expected))))])
+
+    if like.startswith("$argon2"):
+        try:
+            from argon2 import PasswordHasher, extract_parameters
+        except ImportError:
+            raise ValueError("argon2 password hashes require the 'argon2-cffi' package")
+        return PasswordHasher.from_parameters(extract_parameters(like)).hash(password)
+
+    if like.startswith(("$2a$", "$2b$", "$2y$")):
+        try:
+            import bcrypt
+        except ImportError:
+            raise ValueError("bcrypt password hashes require the 'bcrypt' package")
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(int(like.split("$")[2]))).decode("ascii")
+
+    raise ValueError("Unknown password hash format")
+
+def check_hash_format(password_hash: str):
+    """
+    Validate that a hash can be verified in this environment, without a password.
+    Raises:
+        ValueError: If it cannot.
+    """
+    if password_hash.startswith("scrypt$"):
+        if len(password_hash.split("$")) != 6:
+            raise ValueError("Malformed scrypt password hash")
+        return
+    verify_password("", password_hash)
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def unb64(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+if __name__ == "__main__":
+    from getpass import getpass
+
+    password = getpass("Password: ")
+    if password != getpass("Repeat password: "):
+        raise SystemExit("Passwords do not match.")
+    print(f"password_hash: {hash_password(password)}")
@@ -0,0 +1,153 @@
+"""
+CPU placement of the DCS server processes: core affinity, CPU priority and I/O priority.
+
+Each instance sets `cpu_affinity` to one of:
+- `auto`: an equal share of the cores left after `app.reserved_cores` and the cores
+  pinned by other instances, so auto-placed instances never overlap.
+- `all`: every core, as DCS does by default.
+- a list of logical core numbers.
+
+Placement is applied through psutil right after the process is found, and again to the
+running processes when the configuration is reloaded.
+"""
+
+from typing import Dict, List, Optional
+import psutil
+from app.config import Config
+from app.logger import logger
+
+# psutil priority class names on Windows, nice values elsewhere
+CPU_PRIORITIES = {
+    "idle": ("IDLE_PRIORITY_CLASS", 19),
+    "below_normal": ("BELOW_NORMAL_PRIORITY_CLASS", 10),
+    "normal": ("NORMAL_PRIORITY_CLASS", 0),
+    "above_normal": ("ABOVE_NORMAL_PRIORITY_CLASS", -5),
+    "high": ("HIGH_PRIORITY_CLASS", -10),
+    "realtime": ("REALTIME_PRIORITY_CLASS", -20),
+}
+# psutil I/O priority constant names on Windows, (class, value) names elsewhere
+IO_PRIORITIES = {
+    "low": ("IOPRIO_LOW", ("IOPRIO_CLASS_IDLE", 0)),
+    "normal": ("IOPRIO_NORMAL", ("IOPRIO_CLASS_BE", 4)),
+    "high": ("IOPRIO_HIGH", ("IOPRIO_CLASS_BE", 0)),
+}
+
+
+class CpuPlacement:
+    """
+    Singleton-like planner and applier of the per-instance CPU placement.
+    """
+
+    @classmethod
+    def plan(cls, instances: list) -> Dict[str, List[int]]:
+        """
+        Compute the cores of every instance from the configuration.
+        Returns:
+            dict: Instance name to the sorted list of logical cores it may run on.
+        """
+        cores = list(range(psutil.cpu_count() or 1))
+        reserved = min(Config.get("app.reserved_cores"), len(cores) - 1)
+        free = cores[reserved:]
+        plan = {}
+        auto = []
+        for dcs in instances:
+            setting = dcs.setting("cpu_affinity")
+            if setting == "auto":
+                auto.append(dcs.name)
+            elif setting == "all":
+                plan[dcs.name] = cores
+            else:
+                pinned = sorted({core for core in setting if core < len(cores)})
+                if not pinned:
+                    logger.warning(f"[{dcs.name}] None of the cores in 'cpu_affinity' exist, using all cores.")
+                    pinned = cores
+                plan[dcs.name] = pinned
+                free = [core for core in free if core not in pinned]
+
+        if auto:
+            if len(free) < len(auto):
+                logger.warning(f"Not enough free cores to separate {len(auto)} instances, they will share them.")
+                free = cores[reserved:]
+                plan.update({name: free for name in auto})
+            else:
+                # Contiguous blocks keep hyper-threading siblings together; the last one takes the remainder
+                size = len(free) // len(auto)
+                for i, name in enumerate(auto):
+                    plan[name] = free[i * size:] if i == len(auto) - 1 else free[i * size:(i + 1) * size]
+        return plan
+
+    @classmethod
+    def apply(cls, dcs, proc: psutil.Process, cores: List[int]):
+        """
+        Apply the affinity and priorities of `dcs` to its process. Settings the platform or
+        the app's privileges do not allow are logged and skipped.
+        """
+        try:
+            current = proc.cpu_affinity()
+            if sorted(current) != cores:
+                proc.cpu_affinity(cores)
+                logger.debug(f"[{dcs.name}] DCS server affinity set to cores {format_cores(cores)}")
+        except AttributeError:
+            logger.debug("CPU affinity is not supported on this platform.")
+        except psutil.AccessDenied:
+            logger.warning(f"[{dcs.name}] Not allowed to set the DCS server CPU affinity.")
+
+        priority = dcs.setting("cpu_priority")
+        try:
+            windows_class, nice = CPU_PRIORITIES[priority]
+            proc.nice(getattr(psutil, windows_class, nice))
+            logger.debug(f"[{dcs.name}] DCS server priority set to {priority}")
+        except psutil.AccessDenied:
+            logger.warning(f"[{dcs.name}] Not allowed to set the DCS server priority to {priority}.")
+
+        io_priority = dcs.setting("io_priority")
+        if io_priority:
+            windows_value, (linux_class, value) = IO_PRIORITIES[io_priority]
+            try:
+                if hasattr(psutil, windows_value):
+                    proc.ionice(getattr(psutil, windows_value))
+                else:
+                    proc.ionice(getattr(psutil, linux_class), value)
+                logger.debug(f"[{dcs.name}] DCS server I/O priority set to {io_priority}")
+            except AttributeError:
+                logger.debug("I/O priority is not supported on this platform.")
+            except psutil.AccessDenied:
+                logger.warning(f"[{dcs.name}] Not allowed to set the DCS server I/O priority to {io_priority}.")
+
+    @classmethod
+    def effective(cls, proc: Optional[psutil.Process]) -> Optional[dict]:
+        """
+        Read back the affinity and priority a process actually runs with.
+        Returns:
+            dict: {"cpu_affinity": [cores], "cpu_priority": name}, or None if not running.
+        """
+        if proc is None:
+            return None
+        try:
+            with proc.oneshot():
+                nice = proc.nice()
+                try:
+                    cores = sorted(proc.cpu_affinity())
+                except AttributeError:
+                    cores = None
+        except psutil.Error:
+            return None
+        priority = next(
+            (name for name, (windows_class, value) in CPU_PRIORITIES.items()
+             if getattr(psutil, windows_class, value) == nice),
+            str(nice),
+        )
+        return {"cpu_affinity": cores, "cpu_priority": priority}
+
+
+def format_cores(cores: List[int]) -> str:
+    """
+    Format a list of cores as ranges, e.g. "0-3,6".
+    """
+    ranges = []
+    for core in sorted(cores):
+        if ranges and core == ranges[-1][1] + 1:
+            ranges[-1][1] = core
+        else:
+            ranges.append([core, core])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
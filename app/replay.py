@@ -0,0 +1,52 @@
+"""
+Stand-in for the DCS hook script: plays a recorded stream of hook messages back to the app.
+
+Record a real session with `app.hook_record: true`, then replay it against a running app:
+    python -m app.replay data/hook_recording.jsonl --speed 10
+Messages are sent as UDP datagrams to the hook port with their recorded spacing, divided
+by `--speed` (0 sends them as fast as possible).
+"""
+
+import argparse
+import json
+import socket
+import time
+from pathlib import Path
+
+
+def replay(path: Path, port: int, speed: float = 1.0, instance: str = None) -> int:
+    """
+    Send the recorded messages of `path` to 127.0.0.1:`port`.
+    Returns:
+        int: The number of messages sent.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    first_recorded = None
+    started = time.monotonic()
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            message = record["message"]
+            if instance:
+                message["instance"] = instance
+            if speed > 0:
+                first_recorded = record["t"] if first_recorded is None else first_recorded
+                delay = (record["t"] - first_recorded) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            sock.sendto(json.dumps(message).encode("utf-8"), ("127.0.0.1", port))
+            sent += 1
+    sock.close()
+    return sent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded DCS hook messages to the remote app.")
+    parser.add_argument("recording", type=Path, help="JSON lines file written with app.hook_record")
+    parser.add_argument("--port", type=int, default=9097, help="hook port of the app (app.hook_port)")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor, 0 for no delays")
+    parser.add_argument("--instance", help="send the messages as this instance instead of the recorded one")
+    args = parser.parse_args()
+    count = replay(args.recording, args.port, args.speed, args.instance)
+    print(f"{count} messages sent.")
@@ -3,35 +3,107 @@ Handles all web and API routes for the application.
 Includes endpoints for uploading files, starting/stopping the DCS server, and more.
 """
 
-from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+import asyncio
+import base64
+import json
+import logging
+import time
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from app.auth import get_current_user
-from app.control import DCSControl
+from app.control import DCSControl, FileTooLargeError, Instances, UPLOAD_CHUNK_SIZE
+from app.jobs import JobManager, submit_server_action
+from app.events import EventBus, server_status
+from app.livestate import LiveState
+from app.frametimes import FrameTelemetry
+from app.sampler import ResourceSampler
+from app.scheduler import Scheduler
+from app.uploads import UploadManager, UploadError
+from app.mizstore import MizStore, MizEntry, DeltaError, EntryMismatchError
+from app.mizindex import MizIndex
+from app.placement import CpuPlacement
+from app.statefile import StateFileCache, etag_matches, parse_accept_encoding
+from app.statearchive import StateArchive, StateVersion
+from app.assets import Asset, Assets
 from app.config import Config
-from app.logger import logger
+from app.timing import StartupReport
+from app.metrics import Metrics, count_upload
+from app.logger import logger, log_buffer, LOG_BUFFER_SIZE
 
 
-allowed_filenames: list = Config.get("app.allowed_filenames")
+allowed_filenames: tuple = Config.get("app.allowed_filenames")
 allowed_max_size: int = Config.get("app.allowed_max_size")
-state_json = DCSControl.state_json
-logger.info(f"state.json will be saved at: {state_json}")
 
-index_html = HTMLResponse(
-    Path("app/templates/index.html").read_text(encoding="utf-8"),
-    media_type="text/html"
-)
+def reload_upload_limits():
+    global allowed_filenames, allowed_max_size
+    allowed_filenames = Config.get("app.allowed_filenames")
+    allowed_max_size = Config.get("app.allowed_max_size")
+
+Config.on_reload(reload_upload_limits)
 
 router_spa = APIRouter()
 router_api_v1 = APIRouter(prefix="/api/v1")
+# Per-instance endpoints, mounted both at /api/v1 (main instance) and /api/v1/instances/{instance}
+router_instance = APIRouter()
+
+def get_instance(instance: str = None) -> DCSControl:
+    """
+    Resolve the DCS instance of a request; the main instance when none is given.
+    """
+    if instance is None:
+        return Instances.main
+    dcs = Instances.get(instance)
+    if dcs is None:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    return dcs
+
+def asset_response(asset: Asset, request: Request, cache_control: str) -> Response:
+    """
+    Serve a built asset in the best encoding the client accepts, or 304 when its ETag matches.
+    """
+    encoding = asset.negotiate(request.headers.get("accept-encoding"))
+    headers = {
+        "etag": asset.etag(encoding),
+        "vary": "Accept-Encoding",
+        "cache-control": cache_control,
+    }
+    if encoding != "identity":
+        headers["content-encoding"] = encoding
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(asset.bodies[encoding], media_type=asset.content_type, headers=headers)
 
 # Serve the SPA entry point
 @router_spa.get("/", response_class=HTMLResponse)
-async def serve_spa():
+async def serve_spa(request: Request):
     """
-    Serve the main SPA entry point (index.html).
+    Serve the main SPA entry point (index.html), built at startup with fingerprinted
+    asset URLs and the partials inlined. Revalidated on every visit.
     """
-    return index_html
+    return asset_response(Assets.index, request, "no-cache")
+
+@router_spa.get("/assets/{name:path}")
+async def serve_asset(name: str, request: Request):
+    """
+    Serve a fingerprinted static asset; its URL changes with its content, so it is cached forever.
+    """
+    asset = Assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset_response(asset, request, "public, max-age=31536000, immutable")
+
+@router_spa.get("/metrics", response_class=PlainTextResponse)
+async def metrics(user=Depends(get_current_user)):
+    """
+    Expose app and DCS process metrics in the Prometheus text format.
+    """
+    processes = await run_in_threadpool(lambda: {dcs.name: dcs.find_process() for dcs in Instances.all()})
+    body = await run_in_threadpool(Metrics.expose, processes)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 # API endpoints under /api/v1
 @router_api_v1.get("/auth/validate", response_model=dict)
@@ -42,64 +114,485 @@ async def validate_auth(user=Depends(get_current_user)):
     """
     return {"message": "Authentication valid", "user": user}
 
-@router_api_v1.post("/server/start", response_model=dict)
-async def start_server(user=Depends(get_current_user)):
+@router_api_v1.get("/instances", response_model=dict)
+async def list_instances(user=Depends(get_current_user)):
+    """
+    List the DCS server instances managed by this application, the main instance first.
+    Per-instance endpoints are available under `/instances/{name}/...`.
+    """
+    return {"instances": await run_in_threadpool(lambda: [server_status(dcs) for dcs in Instances.all()])}
+
+@router_instance.post("/server/start", response_model=dict, status_code=202)
+async def start_server(dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Queue a background job to start the DCS server process.
+    Poll `/jobs/{id}` for the result.
+    Refused (409) when the staged mission file was found invalid; the start job checks again,
+    as for scheduled starts, and fails if the mission was found invalid meanwhile.
+    """
+    error = await run_in_threadpool(MizIndex.start_error, dcs)
+    if error:
+        raise HTTPException(status_code=409, detail=error)
+    job = submit_server_action(dcs, "start", user)
+    return {"message": "DCS server start queued", "job": job.to_dict()}
+
+@router_instance.post("/server/stop", response_model=dict, status_code=202)
+async def stop_server(dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Queue a background job to stop the DCS server process.
+    Poll `/jobs/{id}` for the result.
+    """
+    job = submit_server_action(dcs, "stop", user)
+    return {"message": "DCS server stop queued", "job": job.to_dict()}
+
+@router_instance.get("/server/resources", response_model=dict)
+async def get_server_resources(seconds: int = 3600, points: int = 120, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Get the DCS server resource usage of the last `seconds`, downsampled to at most
+    `points` buckets with the min/avg/max of each field.
+    """
+    if seconds <= 0 or points <= 0:
+        raise HTTPException(status_code=400, detail="'seconds' and 'points' must be positive")
+    series = await run_in_threadpool(ResourceSampler.series, dcs.name, seconds, points)
+    return {
+        "interval": Config.get("app.resource_sample_interval"),
+        "latest": ResourceSampler.latest(dcs.name),
+        **series,
+    }
+
+@router_instance.get("/server/frames", response_model=dict)
+async def get_server_frames(seconds: int = 3600, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Get the frame-time summaries reported by the DCS hook over the last `seconds`:
+    p50/p95/max/avg frame time (ms) and effective tick rate of each interval.
+    """
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="'seconds' must be positive")
+    return {"summaries": FrameTelemetry.history(dcs.name, seconds)}
+
+class ScheduleRequest(BaseModel):
+    action: str
+    at: datetime
+
+@router_instance.get("/schedule", response_model=dict)
+async def get_schedule(dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    List the scheduled starts/stops and when the automatic shutdowns will fire (epoch seconds).
+    """
+    actions = (e.to_dict() for e in Scheduler.actions.values() if e.instance == dcs.name)
+    return {
+        "actions": sorted(actions, key=lambda e: e["at"]),
+        "shutdown_at": Scheduler.shutdown_at(dcs.name),
+        "players": Scheduler.players(dcs.name),
+    }
+
+@router_instance.post("/schedule", response_model=dict, status_code=201)
+async def schedule_action(request: ScheduleRequest, dcs=Depends(get_instance), user=Depends(get_current_user)):
     """
-    Start the DCS server process.
+    Schedule a start or stop of the DCS server at the given time
+    (ISO 8601, local time of the server if no offset is given, or epoch seconds).
     """
-    if DCSControl.start_process():
-        logger.info(f"'{user}' started DCS server")
-        return {"message": "DCS server started successfully"}
+    at = request.at.timestamp()
+    if at <= time.time():
+        raise HTTPException(status_code=400, detail="Scheduled time must be in the future")
+    try:
+        entry = Scheduler.add(dcs.name, request.action, at, user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"[{dcs.name}] '{user}' scheduled a DCS server {entry.action} at {request.at.isoformat()}")
+    return entry.to_dict()
 
-    raise HTTPException(status_code=500, detail="Failed to start DCS server")
+@router_instance.delete("/schedule/{action_id}", response_model=dict)
+async def cancel_scheduled_action(action_id: str, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Cancel a scheduled start or stop.
+    """
+    if not Scheduler.cancel(dcs.name, action_id):
+        raise HTTPException(status_code=404, detail="Scheduled action not found")
+    logger.info(f"[{dcs.name}] '{user}' cancelled scheduled action {action_id}")
+    return {"message": "Scheduled action cancelled"}
 
-@router_api_v1.post("/server/stop", response_model=dict)
-async def stop_server(user=Depends(get_current_user)):
+@router_api_v1.get("/jobs/{job_id}", response_model=dict)
+async def job_status(job_id: str, user=Depends(get_current_user)):
     """
-    Stop the DCS server process.
+    Get the state of a background job.
     """
-    if DCSControl.stop_process():
-        logger.info(f"'{user}' stopped DCS server")
-        return {"message": "DCS server stopped successfully"}
-    
-    raise HTTPException(status_code=500, detail="Failed to stop DCS server")
+    job = JobManager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
-@router_api_v1.get("/status", response_model=dict)
-async def server_status(user=Depends(get_current_user)):
+@router_instance.get("/status", response_model=dict)
+async def get_server_status(dcs=Depends(get_instance), user=Depends(get_current_user)):
     """
     Get the current status of the DCS server and this application.
+    - `placement`: the CPU cores and priority the DCS process actually runs with.
+    - `mission`: the staged mission file and its check result (theatre, date, flights per
+      coalition), or its error when invalid; `state` is checking, valid or invalid.
     """
-    status = DCSControl.get_status()
+    def process_status() -> dict:
+        return {**server_status(dcs), "placement": CpuPlacement.effective(dcs.find_process())}
+
     return {
-        "status": "running" if status else "stopped",
-        "uptime": str(status) if status else "N/A",
+        **await run_in_threadpool(process_status),
+        "mission": MizIndex.summary(dcs.name),
         "allowed_filenames": allowed_filenames,
         "allowed_max_size": allowed_max_size,
     }
 
-@router_api_v1.post("/files/upload_miz", response_model=dict)
-async def upload_file(file: UploadFile, user=Depends(get_current_user)):
+@router_instance.get("/live", response_model=dict)
+async def get_live_state(dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Get the live state of the running mission, built from the events of the DCS hook:
+    connected players, kills and losses per side, captured bases and recent events.
+    """
+    live = LiveState.snapshot(dcs.name)
+    if live is None:
+        raise HTTPException(status_code=404, detail="No events received from this DCS server yet")
+    return live
+
+@router_api_v1.get("/startup", response_model=dict)
+async def get_startup_report(user=Depends(get_current_user)):
+    """
+    Get the cold-start timing report (imports and initialization phases).
+    """
+    return StartupReport.to_dict()
+
+LOG_FOLLOW_INTERVAL = 0.5  # seconds between checks for new log records when following
+
+@router_api_v1.get("/logs")
+async def tail_logs(lines: int = Query(200, ge=0, le=LOG_BUFFER_SIZE), level: str = "DEBUG",
+                    follow: bool = False, format: str = Query("text", pattern="^(text|json)$"),
+                    user=Depends(get_current_user)):
+    """
+    Stream the most recent app log records from memory.
+    - `lines`: number of past records to send first.
+    - `level`: minimum level (DEBUG, INFO, WARNING, ERROR).
+    - `follow`: keep the response open and send new records as they are logged.
+    - `format`: `text` lines, or `json` (one object per line).
+    """
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        raise HTTPException(status_code=400, detail="Invalid log level")
+
+    def render(record: dict) -> str:
+        if format == "json":
+            return json.dumps({k: v for k, v in record.items() if k != "levelno"}) + "\n"
+        return f"{record['time']} {record['level']:<8} {record['message']}\n"
+
+    async def stream():
+        records = log_buffer.since(0, levelno, lines) if lines else []
+        seq = records[-1]["seq"] if records else log_buffer.seq
+        if records:
+            yield "".join(render(record) for record in records)
+        while follow:
+            await asyncio.sleep(LOG_FOLLOW_INTERVAL)
+            records = log_buffer.since(seq, levelno)
+            if records:
+                seq = records[-1]["seq"]
+                yield "".join(render(record) for record in records)
+
+    media_type = "application/x-ndjson" if format == "json" else "text/plain; charset=utf-8"
+    return StreamingResponse(stream(), media_type=media_type, headers={"cache-control": "no-cache", "x-accel-buffering": "no"})
+
+@router_api_v1.get("/events")
+async def server_events(user=Depends(get_current_user)):
+    """
+    Stream server events (Server-Sent Events):
+    - `status`: status transitions (starting, running, stopping, stopped)
+    - `uptime`: periodic uptime ticks while running
+    - `job`: background job state changes
+    - `state`: a new state.json is available
+    - `live`: summary of the running mission from the DCS hook (players, kills, captures)
+    - `frames`: frame-time summary of the last interval from the DCS hook
+    - `mission`: the staged mission file was checked (see `/status`)
+
+    Events of all instances share the stream; all but `job` carry an `instance`.
+    """
+    initial = await run_in_threadpool(lambda: [("status", server_status(dcs)) for dcs in Instances.all()])
+    initial += [("live", live) for dcs in Instances.all() if (live := LiveState.snapshot(dcs.name))]
+    initial += [("mission", {"instance": dcs.name, "mission": MizIndex.summary(dcs.name)}) for dcs in Instances.all()]
+    return StreamingResponse(
+        EventBus.subscribe(initial),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"},
+    )
+
+@router_instance.post("/files/upload_miz", response_model=dict)
+async def upload_file(request: Request, background_tasks: BackgroundTasks, filename: str = None,
+                      dcs=Depends(get_instance), user=Depends(get_current_user)):
     """
     Upload a mission file to the server.
+    - Raw body upload (preferred): `POST /files/upload_miz?filename=<name>` with the file as body.
+    - Multipart upload: form field `file`, kept for compatibility.
+
+    The file is streamed to disk in chunks and rejected as soon as it exceeds `allowed_max_size`.
     """
-    # Validate file name
-    if file.filename not in allowed_filenames:
-        raise HTTPException(status_code=400, detail=f"Invalid file name: {file.filename}")
+    max_size = allowed_max_size * 1024 * 1024
+    is_multipart = request.headers.get("content-type", "").startswith("multipart/form-data")
 
-    # Save the file
+    # A multipart body is spooled whole by the form parser before it can be counted, so its
+    # declared length is checked first, like the raw body's
+    content_length = request.headers.get("content-length")
+    if max_size and content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=f"File exceeds the limit of {allowed_max_size} MB")
+    if max_size and is_multipart and not (content_length and content_length.isdigit()):
+        raise HTTPException(status_code=411, detail="Multipart uploads require a Content-Length header")
+
+    form = None
     try:
-        DCSControl.save_mission_file(await file.read(), file.filename)
-        logger.info(f"'{user}' uploaded '{file.filename}'")
-        return {"message": f"File '{file.filename}' uploaded successfully"}
+        if is_multipart:
+            form = await request.form(max_files=1, max_fields=0)
+            file = form.get("file")
+            if file is None or isinstance(file, str):
+                raise HTTPException(status_code=400, detail="Missing file field")
+            filename = file.filename
+
+            async def read_chunks():
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    yield chunk
+            chunks = count_upload(read_chunks(), "miz")
+        else:
+            chunks = count_upload(request.stream(), "miz")
+
+        # Validate file name
+        if filename not in allowed_filenames:
+            raise HTTPException(status_code=400, detail=f"Invalid file name: {filename}")
+
+        # Save the file
+        size = await dcs.save_mission_stream(chunks, filename, max_size)
+        logger.info(f"[{dcs.name}] '{user}' uploaded '{filename}' ({size} bytes)")
+        background_tasks.add_task(MizStore.ingest, dcs.mission_dir / filename)
+        background_tasks.add_task(MizIndex.check, dcs)
+        return {"message": f"File '{filename}' uploaded successfully"}
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File exceeds the limit of {allowed_max_size} MB")
     except PermissionError:
         raise HTTPException(status_code=403, detail="Permission denied to save file.\nIs the current mission file being used?")
+    finally:
+        if form is not None:
+            await form.close()
+
+class UploadInit(BaseModel):
+    filename: str
+    size: int
+
+def decode_digest(value: str, name: str) -> bytes:
+    try:
+        return base64.b64decode(value, validate=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+def get_upload_session(upload_id: str, user: str, dcs: DCSControl):
+    session = UploadManager.get(upload_id, user, dcs)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+@router_instance.post("/files/uploads", response_model=dict, status_code=201)
+async def create_upload(upload: UploadInit, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Open a resumable upload session for a mission file.
+    """
+    if upload.filename not in allowed_filenames:
+        raise HTTPException(status_code=400, detail=f"Invalid file name: {upload.filename}")
+    if upload.size < 0:
+        raise HTTPException(status_code=400, detail="Invalid file size")
+
+    try:
+        session = await UploadManager.create(dcs, upload.filename, upload.size, user, allowed_max_size * 1024 * 1024)
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File exceeds the limit of {allowed_max_size} MB")
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.to_dict()
+
+@router_instance.get("/files/uploads/{upload_id}", response_model=dict)
+async def get_upload(upload_id: str, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Report the progress of an upload session, including the chunks still missing.
+    """
+    return get_upload_session(upload_id, user, dcs).to_dict()
+
+@router_instance.put("/files/uploads/{upload_id}/chunks/{index}", response_model=dict)
+async def upload_chunk(upload_id: str, index: int, request: Request, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Upload one chunk of a session as the raw request body.
+    An optional `Upload-Checksum: sha256 <base64>` header is verified before the chunk is accepted.
+    """
+    session = get_upload_session(upload_id, user, dcs)
+    checksum = None
+    if header := request.headers.get("upload-checksum"):
+        algorithm, _, value = header.partition(" ")
+        if algorithm.lower() != "sha256":
+            raise HTTPException(status_code=400, detail=f"Unsupported checksum algorithm: {algorithm}")
+        checksum = decode_digest(value, "Upload-Checksum")
 
-@router_api_v1.get("/files/state.json", response_class=FileResponse)
-async def download_state_file(user=Depends(get_current_user)):
+    try:
+        await UploadManager.write_chunk(session, index, count_upload(request.stream(), "resumable"), checksum)
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"received_bytes": session.received_bytes}
+
+@router_instance.post("/files/uploads/{upload_id}/complete", response_model=dict)
+async def complete_upload(upload_id: str, background_tasks: BackgroundTasks, digest: str = None,
+                          dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Verify and commit an upload session as the current mission file.
+    `digest` is the base64 SHA-256 of all chunk SHA-256 digests concatenated in order.
+    """
+    session = get_upload_session(upload_id, user, dcs)
+    try:
+        file_hash = await UploadManager.complete(session, decode_digest(digest, "digest") if digest else None)
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Permission denied to save file.\nIs the current mission file being used?")
+    logger.info(f"[{dcs.name}] '{user}' uploaded '{session.filename}' ({session.size} bytes, resumable)")
+    background_tasks.add_task(MizStore.ingest, dcs.mission_dir / session.filename)
+    background_tasks.add_task(MizIndex.check, dcs)
+    return {"message": f"File '{session.filename}' uploaded successfully", "sha256": file_hash}
+
+@router_instance.delete("/files/uploads/{upload_id}", response_model=dict)
+async def abort_upload(upload_id: str, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Abort an upload session and delete its partial file.
+    """
+    UploadManager.discard(get_upload_session(upload_id, user, dcs))
+    return {"message": "Upload aborted"}
+
+class DeltaManifest(BaseModel):
+    filename: str
+    entries: List[dict]
+
+def parse_manifest(manifest: DeltaManifest) -> List[MizEntry]:
+    if manifest.filename not in allowed_filenames:
+        raise HTTPException(status_code=400, detail=f"Invalid file name: {manifest.filename}")
+    try:
+        return [MizEntry.from_dict(entry) for entry in manifest.entries]
+    except DeltaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router_api_v1.post("/files/delta/missing", response_model=dict)
+async def delta_missing(manifest: DeltaManifest, user=Depends(get_current_user)):
+    """
+    Compare a .miz manifest against the delta store.
+    Returns the hashes of the entries the client still needs to upload.
+    """
+    entries = parse_manifest(manifest)
+    missing = await run_in_threadpool(MizStore.missing, entries)
+    sizes = {e.sha256: e.compress_size for e in entries}
+    return {"missing": missing, "missing_bytes": sum(sizes[h] for h in missing)}
+
+@router_api_v1.post("/files/delta/objects", response_model=dict)
+async def delta_objects(request: Request, user=Depends(get_current_user)):
+    """
+    Upload missing .miz entries as a stream of frames:
+    32-byte SHA-256 digest, 8-byte big-endian length, raw entry data.
+    The stream is rejected as soon as it exceeds `allowed_max_size`.
+    """
+    try:
+        count = await MizStore.receive_objects(count_upload(request.stream(), "delta"), allowed_max_size * 1024 * 1024)
+    except DeltaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File exceeds the limit of {allowed_max_size} MB")
+    return {"stored": count}
+
+@router_instance.post("/files/delta/commit", response_model=dict)
+async def delta_commit(manifest: DeltaManifest, background_tasks: BackgroundTasks,
+                       dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Build the mission file from the delta store and make it the current mission.
+    """
+    entries = parse_manifest(manifest)
+    try:
+        size = await run_in_threadpool(MizStore.build, dcs, entries, manifest.filename, allowed_max_size * 1024 * 1024)
+    except EntryMismatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DeltaError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File exceeds the limit of {allowed_max_size} MB")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Permission denied to save file.\nIs the current mission file being used?")
+    logger.info(f"[{dcs.name}] '{user}' uploaded '{manifest.filename}' ({size} bytes, delta)")
+    background_tasks.add_task(MizIndex.check, dcs)
+    return {"message": f"File '{manifest.filename}' uploaded successfully"}
+
+@router_instance.get("/files/state.json", response_class=FileResponse)
+async def download_state_file(request: Request, dcs=Depends(get_instance), user=Depends(get_current_user)):
     """
     Download the `state.json` file from the server.
+    - Served gzip or brotli compressed when the client accepts it.
+    - Supports `If-None-Match` (304) and `Range`/`If-Range` for resumed downloads.
     """
-    if not state_json.exists():
+    try:
+        variants = await StateFileCache.get_variants(dcs.state_json)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="state.json file not found")
 
-    return FileResponse(state_json, media_type="application/json", filename="state.json")
+    variant = StateFileCache.negotiate(variants, request.headers.get("accept-encoding"))
+    headers = {
+        "etag": variant.etag,
+        "vary": "Accept-Encoding",
+        "cache-control": "private, no-cache",
+    }
+    if variant.encoding != "identity":
+        headers["content-encoding"] = variant.encoding
+
+    if etag_matches(request.headers.get("if-none-match"), variant.etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(variant.path, media_type="application/json", filename="state.json", headers=headers)
+
+
+def get_state_version(dcs: DCSControl, version_id: int) -> StateVersion:
+    version = StateArchive.get(dcs.name, version_id)
+    if version is None or not StateArchive.object_path(version.sha256).exists():
+        raise HTTPException(status_code=404, detail="state.json version not found")
+    return version
+
+@router_instance.get("/files/state/history", response_model=dict)
+async def list_state_history(offset: int = 0, limit: int = 50, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    List the archived state.json versions, newest first, with their turn, time and user.
+    """
+    if offset < 0 or not 0 < limit <= 500:
+        raise HTTPException(status_code=400, detail="'offset' must be >= 0 and 'limit' between 1 and 500")
+    return StateArchive.page(dcs.name, offset, limit)
+
+@router_instance.get("/files/state/history/diff")
+async def diff_state_versions(old: int = Query(alias="from"), new: int = Query(alias="to"),
+                              dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Stream the JSON Patch (RFC 6902) that turns version `from` into version `to`.
+    """
+    old_version, new_version = get_state_version(dcs, old), get_state_version(dcs, new)
+    return StreamingResponse(
+        StateArchive.diff(old_version, new_version),  # sync iterator, run in the threadpool
+        media_type="application/json-patch+json",
+    )
+
+@router_instance.get("/files/state/history/{version_id}")
+async def download_state_version(version_id: int, request: Request, dcs=Depends(get_instance), user=Depends(get_current_user)):
+    """
+    Download an archived state.json version, gzip-compressed when the client accepts it.
+    """
+    version = get_state_version(dcs, version_id)
+    etag = f'"{version.sha256[:32]}"'
+    headers = {"etag": etag, "vary": "Accept-Encoding", "cache-control": "private, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    filename = f"state-{dcs.name}-{version.id}.json"
+    headers["content-disposition"] = f'attachment; filename="{filename}"'
+    accepted = parse_accept_encoding(request.headers.get("accept-encoding"))
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        headers["content-encoding"] = "gzip"
+        return FileResponse(StateArchive.object_path(version.sha256), media_type="application/json", headers=headers)
+    return StreamingResponse(StateArchive.read_chunks(version), media_type="application/json", headers=headers)
+
+
+router_api_v1.include_router(router_instance)
+router_api_v1.include_router(router_instance, prefix="/instances/{instance}")
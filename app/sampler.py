@@ -0,0 +1,191 @@
+"""
+Background sampler of the DCS server process resources (CPU, memory, threads, handles, I/O).
+
+Samples of each instance are kept in a fixed-size ring buffer backed by one `array` per
+field, so memory stays constant however long the server runs. Readers get downsampled series
+(min/avg/max per bucket) for charting; the status endpoint is not involved.
+"""
+
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+import psutil
+from app.config import Config
+from app.control import Instances
+from app.logger import logger
+
+FIELDS = (
+    "cpu_percent",      # % of one core, can exceed 100
+    "rss",              # bytes
+    "threads",
+    "handles",          # handles on Windows, file descriptors elsewhere
+    "read_bytes_per_s",
+    "write_bytes_per_s",
+)
+MAX_POINTS = 1000  # upper bound of buckets returned per series
+
+
+class ResourceRing:
+    """
+    Fixed-capacity time series of samples, one preallocated `array('d')` per field.
+    Not thread-safe by itself; `ResourceSampler` guards it with a lock.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self.next = 0
+        self.count = 0
+
+    def append(self, timestamp: float, sample: Dict[str, float]):
+        i = self.next
+        self.times[i] = timestamp
+        for field, column in self.values.items():
+            column[i] = sample[field]
+        self.next = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def indexes_since(self, since: float) -> List[int]:
+        """
+        Return the buffer indexes of the samples taken at or after `since`, oldest first.
+        """
+        start = (self.next - self.count) % self.capacity
+        order = [(start + k) % self.capacity for k in range(self.count)]
+        # Samples are in time order, so binary search for the first one in range
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[order[mid]] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return order[lo:]
+
+    def latest(self) -> Optional[dict]:
+        if not self.count:
+            return None
+        i = (self.next - 1) % self.capacity
+        return {"time": self.times[i], **{field: column[i] for field, column in self.values.items()}}
+
+
+class ResourceSampler:
+    """
+    Singleton-like daemon thread sampling the tracked DCS process of every instance every
+    `app.resource_sample_interval` seconds. Nothing is recorded while DCS is not running.
+    """
+    rings: Dict[str, ResourceRing] = {}
+    lock = threading.Lock()
+    _thread: threading.Thread = None
+    _stop = threading.Event()
+
+    @classmethod
+    def start(cls):
+        if cls._thread and cls._thread.is_alive():
+            return
+        for dcs in Instances.all():
+            if dcs.name not in cls.rings:
+                cls.rings[dcs.name] = ResourceRing(Config.get("app.resource_history"))
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._run, name="resource-sampler", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+
+    @classmethod
+    def _run(cls):
+        procs: Dict[str, Optional[psutil.Process]] = {}
+        last_io: Dict[str, Optional[tuple]] = {}
+        while not cls._stop.wait(Config.get("app.resource_sample_interval")):
+            for dcs in Instances.all():
+                try:
+                    current = dcs.find_process()
+                    if current is None:
+                        procs[dcs.name] = last_io[dcs.name] = None
+                        continue
+                    if current is not procs.get(dcs.name):
+                        # New process: prime the CPU counter, the first reading would be 0
+                        procs[dcs.name], last_io[dcs.name] = current, None
+                        current.cpu_percent()
+                        continue
+                    sample, last_io[dcs.name] = read_sample(current, last_io[dcs.name])
+                    with cls.lock:
+                        cls.rings[dcs.name].append(time.time(), sample)
+                except psutil.Error:
+                    procs[dcs.name] = last_io[dcs.name] = None
+                except Exception as e:
+                    logger.error(f"[{dcs.name}] Resource sampler error: {e}")
+
+    @classmethod
+    def series(cls, instance: str, seconds: float, points: int) -> dict:
+        """
+        Downsample the samples of an instance over the last `seconds` into at most `points` time buckets.
+        Returns:
+            dict: {"time": [bucket start], "<field>": {"min": [...], "avg": [...], "max": [...]}}
+        """
+        points = max(1, min(points, MAX_POINTS))
+        ring = cls.rings.get(instance)
+        if ring is None:
+            return {"time": [], **{field: {"min": [], "avg": [], "max": []} for field in FIELDS}}
+
+        with cls.lock:
+            indexes = ring.indexes_since(time.time() - seconds)
+            times = [ring.times[i] for i in indexes]
+            columns = {field: [column[i] for i in indexes] for field, column in ring.values.items()}
+
+        result = {"time": [], **{field: {"min": [], "avg": [], "max": []} for field in FIELDS}}
+        if not times:
+            return result
+        size = math.ceil(len(times) / points)
+        for start in range(0, len(times), size):
+            result["time"].append(times[start])
+            for field, values in columns.items():
+                bucket = values[start:start + size]
+                result[field]["min"].append(min(bucket))
+                result[field]["avg"].append(sum(bucket) / len(bucket))
+                result[field]["max"].append(max(bucket))
+        return result
+
+    @classmethod
+    def latest(cls, instance: str) -> Optional[dict]:
+        ring = cls.rings.get(instance)
+        if ring is None:
+            return None
+        with cls.lock:
+            return ring.latest()
+
+
+def read_sample(proc: psutil.Process, last_io: Optional[tuple]) -> tuple:
+    """
+    Read one sample from the process.
+    Returns:
+        tuple: (sample, io) where `io` is (timestamp, read_bytes, write_bytes) for the next rate.
+    """
+    with proc.oneshot():
+        cpu = proc.cpu_percent()
+        rss = proc.memory_info().rss
+        threads = proc.num_threads()
+        handles = proc.num_handles() if hasattr(proc, "num_handles") else proc.num_fds()
+        try:
+            counters = proc.io_counters()
+            io = (time.monotonic(), counters.read_bytes, counters.write_bytes)
+        except (AttributeError, psutil.AccessDenied):
+            io = None
+
+    read_rate = write_rate = 0.0
+    if io and last_io and io[0] > last_io[0]:
+        elapsed = io[0] - last_io[0]
+        read_rate = max(0, io[1] - last_io[1]) / elapsed
+        write_rate = max(0, io[2] - last_io[2]) / elapsed
+    sample = {
+        "cpu_percent": cpu,
+        "rss": rss,
+        "threads": threads,
+        "handles": handles,
+        "read_bytes_per_s": read_rate,
+        "write_bytes_per_s": write_rate,
+    }
+    return sample, io
@@ -0,0 +1,277 @@
+"""
+Timed server actions on the event loop:
+- `max_running_time`: stop a server once it has been running that long.
+- `idle_shutdown`: stop a server when no player has been connected for that long,
+  based on the player counts reported by the hook script (see `app.hooklink`).
+- Scheduled starts and stops requested through the API, kept in `data/schedule.json`.
+
+Every deadline is a single `loop.call_at` timer that is re-armed when a DCS process
+starts or exits, when the player count changes or when the configuration is reloaded;
+nothing polls. Each instance has its own timers and settings.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import psutil
+from app.config import Config
+from app.control import DCSControl, Instances
+from app.hooklink import HookLink
+from app.jobs import submit_server_action
+from app.logger import logger
+from app.watcher import ProcessWatcher
+
+SCHEDULE_JSON = Path("data/schedule.json")
+SCHEDULER_USER = "scheduler"
+ACTIONS = ("start", "stop")
+MISSED_ACTION_GRACE = 5 * 60  # seconds a scheduled action may be late after an app restart
+
+
+class ScheduledAction:
+    """
+    A start or stop of an instance requested for a given time (epoch seconds).
+    """
+    def __init__(self, instance: str, action: str, at: float, user: str, id: str = None):
+        self.id = id or secrets.token_urlsafe(8)
+        self.instance = instance
+        self.action = action
+        self.at = at
+        self.user = user
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "instance": self.instance, "action": self.action, "at": self.at, "user": self.user}
+
+
+class ShutdownTimers:
+    """
+    Automatic shutdown state of one instance.
+    """
+    def __init__(self, dcs: DCSControl):
+        self.dcs = dcs
+        self.players: Optional[int] = None  # None until the hook reports a count
+        self.process_started: Optional[float] = None
+        self.idle_since: Optional[float] = None  # only set from hook reports, never guessed
+        self.max_running_handle: Optional[asyncio.TimerHandle] = None
+        self.idle_handle: Optional[asyncio.TimerHandle] = None
+
+    def cancel(self):
+        for handle in (self.max_running_handle, self.idle_handle):
+            if handle:
+                handle.cancel()
+        self.max_running_handle = self.idle_handle = None
+
+
+class Scheduler:
+    """
+    Singleton-like owner of the shutdown timers and scheduled actions.
+    All methods except the thread-safe `notify_*` entry points run on the event loop.
+    """
+    loop: asyncio.AbstractEventLoop = None
+    actions: Dict[str, ScheduledAction] = {}
+    timers: Dict[str, ShutdownTimers] = {}
+
+    @classmethod
+    def start(cls):
+        cls.loop = asyncio.get_running_loop()
+        cls.timers = {dcs.name: ShutdownTimers(dcs) for dcs in Instances.all()}
+        entries = load_schedule()
+        for entry in entries:
+            if entry.at < time.time() - MISSED_ACTION_GRACE or entry.instance not in cls.timers:
+                logger.warning(f"Skipping scheduled {entry.action} of '{entry.instance}' missed or no longer configured")
+                continue
+            cls.add(entry.instance, entry.action, entry.at, entry.user, entry.id, save=False)
+        if len(cls.actions) != len(entries):
+            save_schedule(cls.actions.values())
+        for dcs in Instances.all():
+            cls.on_process(dcs, dcs.process)
+
+    @classmethod
+    def stop(cls):
+        for entry in cls.actions.values():
+            if entry.handle:
+                entry.handle.cancel()
+        cls.actions = {}
+        for timers in cls.timers.values():
+            timers.cancel()
+        cls.loop = None
+
+    # Thread-safe entry points
+
+    @classmethod
+    def notify_process(cls, dcs: DCSControl, proc: Optional[psutil.Process]):
+        if cls.loop is not None:
+            cls.loop.call_soon_threadsafe(cls.on_process, dcs, proc)
+
+    @classmethod
+    def notify_config(cls):
+        if cls.loop is not None:
+            cls.loop.call_soon_threadsafe(cls.rearm_all)
+
+    # Shutdown timers
+
+    @classmethod
+    def on_process(cls, dcs: DCSControl, proc: Optional[psutil.Process]):
+        """
+        Reset the shutdown timers for a newly found process, or cancel them when it exited.
+        """
+        timers = cls.timers[dcs.name]
+        try:
+            started = proc.create_time() if proc else None
+        except psutil.Error:
+            started = None
+        if started == timers.process_started:
+            return
+        timers.process_started = started
+        timers.players = None
+        timers.idle_since = None
+        cls.rearm(timers)
+
+    @classmethod
+    def on_players(cls, message: dict):
+        """
+        Handle a player count reported by the hook script.
+        """
+        timers = cls.timers.get(message.get("instance") or Instances.main.name)
+        count = message.get("count")
+        if timers is None or not isinstance(count, int) or count == timers.players:
+            return
+        timers.idle_since = time.time() if count == 0 else None
+        timers.players = count
+        logger.debug(f"[{timers.dcs.name}] DCS server has {count} player(s) connected")
+        cls.rearm(timers)
+
+    @classmethod
+    def rearm_all(cls):
+        for timers in cls.timers.values():
+            cls.rearm(timers)
+
+    @classmethod
+    def rearm(cls, timers: ShutdownTimers):
+        """
+        (Re)arm the max running time and idle timers of an instance from its current
+        state and configuration.
+        """
+        timers.cancel()
+        if timers.process_started is None:
+            return
+        dcs = timers.dcs
+
+        max_running_time = dcs.setting("max_running_time")
+        if max_running_time:
+            timers.max_running_handle = cls._call_at(
+                timers.process_started + max_running_time * 60,
+                cls._shutdown, dcs, f"running for more than {max_running_time} minutes",
+            )
+
+        idle_shutdown = dcs.setting("idle_shutdown")
+        if idle_shutdown and timers.idle_since is not None:
+            timers.idle_handle = cls._call_at(
+                timers.idle_since + idle_shutdown * 60,
+                cls._shutdown, dcs, f"no players connected for {idle_shutdown} minutes",
+            )
+
+    @classmethod
+    def shutdown_at(cls, instance: str) -> dict:
+        """
+        Return when the shutdown timers of an instance will fire (epoch seconds), None if not armed.
+        """
+        timers = cls.timers.get(instance)
+        return {
+            "max_running_time": cls._deadline(timers and timers.max_running_handle),
+            "idle": cls._deadline(timers and timers.idle_handle),
+        }
+
+    @classmethod
+    def players(cls, instance: str) -> Optional[int]:
+        timers = cls.timers.get(instance)
+        return timers.players if timers else None
+
+    @classmethod
+    def _shutdown(cls, dcs: DCSControl, reason: str):
+        cls.timers[dcs.name].cancel()
+        logger.info(f"[{dcs.name}] Stopping DCS server: {reason}")
+        submit_server_action(dcs, "stop", SCHEDULER_USER)
+
+    # Scheduled actions
+
+    @classmethod
+    def add(cls, instance: str, action: str, at: float, user: str, id: str = None, save: bool = True) -> ScheduledAction:
+        """
+        Schedule a start or stop of an instance at `at` (epoch seconds).
+        Raises:
+            ValueError: If the action is unknown.
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        entry = ScheduledAction(instance, action, at, user, id)
+        entry.handle = cls._call_at(at, cls._run_scheduled, entry.id)
+        cls.actions[entry.id] = entry
+        if save:
+            save_schedule(cls.actions.values())
+        return entry
+
+    @classmethod
+    def cancel(cls, instance: str, action_id: str) -> bool:
+        entry = cls.actions.get(action_id)
+        if entry is None or entry.instance != instance:
+            return False
+        del cls.actions[action_id]
+        entry.handle.cancel()
+        save_schedule(cls.actions.values())
+        return True
+
+    @classmethod
+    def _run_scheduled(cls, action_id: str):
+        entry = cls.actions.pop(action_id, None)
+        if entry is None:
+            return
+        save_schedule(cls.actions.values())
+        dcs = Instances.get(entry.instance)
+        logger.info(f"[{entry.instance}] Running scheduled {entry.action} of the DCS server (scheduled by '{entry.user}')")
+        submit_server_action(dcs, entry.action, entry.user)
+
+    # Helpers
+
+    @classmethod
+    def _call_at(cls, timestamp: float, callback, *args) -> asyncio.TimerHandle:
+        """
+        Schedule `callback` at a wall-clock time; past times run as soon as possible.
+        """
+        delay = max(0.0, timestamp - time.time())
+        return cls.loop.call_at(cls.loop.time() + delay, callback, *args)
+
+    @classmethod
+    def _deadline(cls, handle: Optional[asyncio.TimerHandle]) -> Optional[float]:
+        if handle is None or handle.cancelled():
+            return None
+        return time.time() + max(0.0, handle.when() - cls.loop.time())
+
+
+def load_schedule() -> list:
+    try:
+        entries = json.loads(SCHEDULE_JSON.read_text(encoding="utf-8"))
+        return [
+            ScheduledAction(e.get("instance", Instances.main.name), e["action"], e["at"], e["user"], e["id"])
+            for e in entries
+        ]
+    except FileNotFoundError:
+        return []
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Ignoring invalid {SCHEDULE_JSON}: {e}")
+        return []
+
+def save_schedule(entries):
+    SCHEDULE_JSON.parent.mkdir(parents=True, exist_ok=True)
+    tmp = SCHEDULE_JSON.with_suffix(".tmp")
+    tmp.write_text(json.dumps([e.to_dict() for e in entries], indent=2), encoding="utf-8")
+    os.replace(tmp, SCHEDULE_JSON)
+
+
+ProcessWatcher.on_change(Scheduler.notify_process)
+Config.on_reload(Scheduler.notify_config)
+HookLink.on("players", Scheduler.on_players)
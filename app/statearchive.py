@@ -0,0 +1,282 @@
+"""
+History of the `state.json` files produced by each DCS run.
+
+Every snapshot is stored gzip-compressed under its SHA-256, so identical snapshots (the
+same file seen on change and again on stop, or by several instances) are kept once.
+An append-only index records who produced each version and when:
+- `turn` counts the runs of an instance; the snapshots of one run share it.
+- `user` is the user who started the run, or who stopped the server.
+Old versions are evicted by total size and age, keeping the latest one of each instance.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from app.config import Config
+from app.control import DCSControl, Instances
+from app.logger import logger
+
+ARCHIVE_DIR = Path("data/state_history").absolute()
+READ_CHUNK_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+DIFF_CHUNK_SIZE = 64 * 1024  # bytes of JSON Patch text per streamed chunk
+
+
+class StateVersion:
+    """
+    One archived state.json snapshot.
+    """
+    __slots__ = ("id", "instance", "sha256", "size", "stored_size", "time", "turn", "user", "reason")
+
+    def __init__(self, id: int, instance: str, sha256: str, size: int, stored_size: int,
+                 time: float, turn: int, user: Optional[str], reason: str):
+        self.id = id
+        self.instance = instance
+        self.sha256 = sha256
+        self.size = size
+        self.stored_size = stored_size
+        self.time = time
+        self.turn = turn
+        self.user = user
+        self.reason = reason
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class StateArchive:
+    """
+    Singleton-like content-addressed archive of state.json snapshots and its index.
+    All methods may block on disk I/O and are meant to run in worker threads.
+    """
+    objects_dir = ARCHIVE_DIR / "objects"
+    index_jsonl = ARCHIVE_DIR / "index.jsonl"
+    lock = threading.Lock()
+    versions: List[StateVersion] = []  # oldest first
+    turns: Dict[str, int] = {}
+    run_users: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def object_path(cls, sha256: str) -> Path:
+        return cls.objects_dir / sha256[:2] / f"{sha256}.json.gz"
+
+    @classmethod
+    def start(cls):
+        """
+        Load the index, then archive any state.json written while the app was not running
+        from a daemon thread.
+        """
+        with cls.lock:
+            cls.versions = load_index(cls.index_jsonl)
+            cls.turns = {}
+            for version in cls.versions:
+                cls.turns[version.instance] = max(cls.turns.get(version.instance, 0), version.turn)
+        threading.Thread(target=cls._capture_all, name="state-archive", daemon=True).start()
+
+    @classmethod
+    def _capture_all(cls):
+        for dcs in Instances.all():
+            try:
+                cls.capture(dcs, "startup")
+            except Exception as e:
+                logger.error(f"[{dcs.name}] Error archiving state.json: {e}")
+
+    @classmethod
+    def begin_turn(cls, dcs: DCSControl, user: str):
+        """
+        Start a new turn for `dcs`: the snapshots of this run are attributed to `user`.
+        """
+        with cls.lock:
+            cls.turns[dcs.name] = cls.turns.get(dcs.name, 0) + 1
+            cls.run_users[dcs.name] = user
+
+    @classmethod
+    def capture(cls, dcs: DCSControl, reason: str, user: str = None) -> Optional[StateVersion]:
+        """
+        Archive the current state.json of `dcs` unless it is identical to its latest version.
+        A file that is not valid JSON (e.g. still being written) is skipped.
+        Returns:
+            StateVersion: The new version, or None if nothing was archived.
+        """
+        try:
+            data = dcs.state_json.read_bytes()
+        except FileNotFoundError:
+            return None
+        sha256 = hashlib.sha256(data).hexdigest()
+        latest = cls.latest(dcs.name)
+        if latest and latest.sha256 == sha256:
+            return None
+        try:
+            json.loads(data)
+        except ValueError:
+            logger.debug(f"[{dcs.name}] Not archiving state.json, it is not valid JSON (yet)")
+            return None
+
+        path = cls.object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".part", delete=False) as f:
+                f.write(gzip.compress(data, GZIP_LEVEL, mtime=0))
+            os.replace(f.name, path)
+
+        with cls.lock:
+            # Recheck under the lock: a stop and a change may capture the same file concurrently
+            latest = cls.latest(dcs.name)
+            if latest and latest.sha256 == sha256:
+                return None
+            version = StateVersion(
+                (cls.versions[-1].id + 1) if cls.versions else 1,
+                dcs.name, sha256, len(data), path.stat().st_size, time.time(),
+                cls.turns.get(dcs.name, 0), user or cls.run_users.get(dcs.name), reason,
+            )
+            cls.versions.append(version)
+            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+            with cls.index_jsonl.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(version.to_dict()) + "\n")
+            cls.evict()
+        logger.debug(f"[{dcs.name}] state.json archived as version {version.id} ({reason})")
+        return version
+
+    @classmethod
+    def latest(cls, instance: str) -> Optional[StateVersion]:
+        return next((v for v in reversed(cls.versions) if v.instance == instance), None)
+
+    @classmethod
+    def get(cls, instance: str, version_id: int) -> Optional[StateVersion]:
+        return next((v for v in cls.versions if v.id == version_id and v.instance == instance), None)
+
+    @classmethod
+    def page(cls, instance: str, offset: int, limit: int) -> dict:
+        """
+        List the versions of an instance, newest first.
+        Returns:
+            dict: {"total": count, "versions": [version dicts]}
+        """
+        versions = [v for v in reversed(cls.versions) if v.instance == instance]
+        return {"total": len(versions), "versions": [v.to_dict() for v in versions[offset:offset + limit]]}
+
+    @classmethod
+    def read_chunks(cls, version: StateVersion) -> Iterator[bytes]:
+        """
+        Yield the decompressed content of a version.
+        """
+        with gzip.open(cls.object_path(version.sha256), "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    @classmethod
+    def load(cls, version: StateVersion):
+        with gzip.open(cls.object_path(version.sha256), "rb") as f:
+            return json.load(f)
+
+    @classmethod
+    def diff(cls, old: StateVersion, new: StateVersion) -> Iterator[str]:
+        """
+        Yield a JSON Patch (RFC 6902) array turning `old` into `new`, in text chunks.
+        """
+        ops = json_diff(cls.load(old), cls.load(new))
+        buffer = ["["]
+        size = 1
+        for i, op in enumerate(ops):
+            text = ("," if i else "") + json.dumps(op)
+            buffer.append(text)
+            size += len(text)
+            if size >= DIFF_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        buffer.append("]")
+        yield "".join(buffer)
+
+    @classmethod
+    def evict(cls):
+        """
+        Drop the oldest versions beyond `app.state_history_max_size` (MB) or older than
+        `app.state_history_max_days`, keeping the latest version of every instance.
+        Objects no longer referenced are deleted. Must be called with the lock held.
+        """
+        max_size = Config.get("app.state_history_max_size") * 1024 * 1024
+        max_days = Config.get("app.state_history_max_days")
+        cutoff = time.time() - max_days * 86400 if max_days else None
+        keep = {v.instance: v.id for v in cls.versions}.values()
+        refs: Dict[str, int] = {}
+        for v in cls.versions:
+            refs[v.sha256] = refs.get(v.sha256, 0) + 1
+        stored = sum(
+            v.stored_size for v in {v.sha256: v for v in cls.versions}.values()
+        )
+
+        evicted = []
+        for v in cls.versions:
+            if v.id in keep:
+                continue
+            too_old = cutoff is not None and v.time < cutoff
+            too_big = max_size and stored > max_size
+            if not too_old and not too_big:
+                break
+            evicted.append(v)
+            refs[v.sha256] -= 1
+            if not refs[v.sha256]:
+                stored -= v.stored_size
+                cls.object_path(v.sha256).unlink(missing_ok=True)
+        if not evicted:
+            return
+
+        gone = {v.id for v in evicted}
+        cls.versions = [v for v in cls.versions if v.id not in gone]
+        tmp = cls.index_jsonl.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(v.to_dict()) + "\n" for v in cls.versions)
+        os.replace(tmp, cls.index_jsonl)
+        logger.debug(f"state.json history: {len(evicted)} old versions evicted")
+
+
+def load_index(path: Path) -> List[StateVersion]:
+    """
+    Read the index, skipping a line left incomplete by an interrupted write.
+    """
+    versions = []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    versions.append(StateVersion(**json.loads(line)))
+                except (ValueError, TypeError):
+                    logger.warning(f"Skipping invalid line in {path}")
+    except FileNotFoundError:
+        pass
+    return versions
+
+def json_diff(old, new, path: str = "") -> Iterator[dict]:
+    """
+    Yield the JSON Patch operations turning `old` into `new`.
+    Lists are compared index by index; items are added or removed at the end.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                yield {"op": "remove", "path": f"{path}/{escape_pointer(key)}"}
+        for key, value in new.items():
+            child = f"{path}/{escape_pointer(key)}"
+            if key not in old:
+                yield {"op": "add", "path": child, "value": value}
+            else:
+                yield from json_diff(old[key], value, child)
+    elif isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for i in range(common):
+            yield from json_diff(old[i], new[i], f"{path}/{i}")
+        for i in range(len(old) - 1, common - 1, -1):
+            yield {"op": "remove", "path": f"{path}/{i}"}
+        for i in range(common, len(new)):
+            yield {"op": "add", "path": f"{path}/-", "value": new[i]}
+    elif type(old) is not type(new) or old != new:
+        yield {"op": "replace", "path": path, "value": new}
+
+def escape_pointer(key: str) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
@@ -0,0 +1,167 @@
+"""
+Serves `state.json` with content negotiation, strong ETags and resumable (Range) downloads.
+
+Each version of the file is served from a snapshot next to it, named after its digest
+(`state.json.<digest>`, plus `.gz`/`.br` compressed copies), built once when the file
+changes. A download in progress keeps reading its own snapshot, so the game can rewrite
+state.json meanwhile, and the ETag always matches the bytes sent. Snapshots of older
+versions are deleted once they are two versions old (retried later if still open on Windows).
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.logger import logger
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+KEEP_VERSIONS = 2  # snapshot versions kept per file, so a download of the previous one can finish
+
+
+class StateVariant:
+    """
+    One stored representation of state.json.
+    """
+    __slots__ = ("path", "encoding", "etag")
+
+    def __init__(self, path: Path, encoding: str, etag: str):
+        self.path = path
+        self.encoding = encoding
+        self.etag = etag
+
+
+class StateFileCache:
+    """
+    Singleton-like cache of the identity, gzip and brotli representations of state.json files
+    (one per instance). Each entry is keyed on the file's mtime and size, so a new state.json
+    is compressed once.
+    """
+    _keys: Dict[Path, Tuple[int, int]] = {}
+    _variants: Dict[Path, Dict[str, StateVariant]] = {}
+    _digests: Dict[Path, List[str]] = {}  # snapshot digests of each file, newest last
+    _lock = asyncio.Lock()
+
+    @classmethod
+    async def get_variants(cls, path: Path) -> Dict[str, StateVariant]:
+        """
+        Return the current representations of `path`, rebuilding them if the file changed.
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        stat = await run_in_threadpool(os.stat, path)
+        if (stat.st_mtime_ns, stat.st_size) == cls._keys.get(path):
+            return cls._variants[path]
+
+        async with cls._lock:
+            stat = await run_in_threadpool(os.stat, path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key != cls._keys.get(path):
+                variants = await run_in_threadpool(build_variants, path)
+                digest = variants["identity"].etag.strip('"')
+                digests = [d for d in cls._digests.get(path, []) if d != digest] + [digest]
+                cls._digests[path] = digests[-KEEP_VERSIONS:]
+                cls._variants[path] = variants
+                cls._keys[path] = key
+                await run_in_threadpool(remove_old_snapshots, path, set(cls._digests[path]))
+        return cls._variants[path]
+
+    @classmethod
+    def negotiate(cls, variants: Dict[str, StateVariant], accept_encoding: str) -> StateVariant:
+        """
+        Pick the smallest representation the client accepts.
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return variants[encoding]
+        return variants["identity"]
+
+
+def build_variants(path: Path) -> Dict[str, StateVariant]:
+    """
+    Hash the file and write its snapshot and precompressed copies next to it, named after
+    its digest. Existing snapshots of the same content are reused.
+    """
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    snapshot = path.with_name(f"{path.name}.{digest}")
+    if not snapshot.exists():
+        write_atomic(snapshot, data)
+    variants = {"identity": StateVariant(snapshot, "identity", f'"{digest}"')}
+
+    gz_path = snapshot.with_name(snapshot.name + ".gz")
+    if not gz_path.exists():
+        write_atomic(gz_path, gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+    variants["gzip"] = StateVariant(gz_path, "gzip", f'"{digest}-gz"')
+
+    if brotli is not None:
+        br_path = snapshot.with_name(snapshot.name + ".br")
+        if not br_path.exists():
+            write_atomic(br_path, brotli.compress(data, quality=BROTLI_QUALITY))
+        variants["br"] = StateVariant(br_path, "br", f'"{digest}-br"')
+
+    logger.debug(
+        f"{path.name} compressed: {len(data)} bytes -> "
+        + ", ".join(f"{v.encoding} {v.path.stat().st_size}" for v in variants.values() if v.encoding != "identity")
+    )
+    return variants
+
+def write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def remove_old_snapshots(path: Path, keep: set):
+    """
+    Delete the snapshots of `path` whose digest is not in `keep`, and the compressed copies
+    of older releases (`state.json.gz`/`.br`). Files still open are left for the next time.
+    """
+    pattern = re.compile(rf"^{re.escape(path.name)}(?:\.([0-9a-f]{{32}}))?(?:\.gz|\.br)?$")
+    for candidate in path.parent.glob(f"{path.name}.*"):
+        match = pattern.match(candidate.name)
+        if match is None or match.group(1) in keep or candidate.name == path.name:
+            continue
+        try:
+            candidate.unlink()
+        except OSError as e:
+            logger.debug(f"Cannot remove old {candidate.name} yet: {e}")
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into {encoding: q-value}.
+    """
+    accepted = {}
+    for item in (header or "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        if not encoding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[encoding.lower()] = q
+    return accepted
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
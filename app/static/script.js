@@ -9,6 +9,11 @@ document.addEventListener("DOMContentLoaded", () => {
         return auth ? `Basic ${auth}` : null;
     };
 
+    // Base URL of the per-instance endpoints of the selected DCS instance
+    let currentInstance = localStorage.getItem("instance");
+    const apiBase = () =>
+        currentInstance ? `/api/v1/instances/${encodeURIComponent(currentInstance)}` : "/api/v1";
+
     // Helper function to handle fetch errors
     const handleFetchError = (response) => {
         if (response.status === 401) {
@@ -38,7 +43,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const fetchAndUpdateStatus = async () => {
         toggleRefreshSpinner(true);
         try {
-            const response = await fetch("/api/v1/status", {
+            const response = await fetch(`${apiBase()}/status`, {
                 headers: { Authorization: getAuthHeader() },
             });
             handleFetchError(response);
@@ -57,26 +62,268 @@ document.addEventListener("DOMContentLoaded", () => {
     const updateUIWithServerStatus = (data) => {
         const powerButton = document.getElementById("power-button");
         const uploadButton = document.getElementById("upload-button");
+        const statusText = document.getElementById("status-text");
+        if (!powerButton) {
+            return;
+        }
 
-        if (data.status === "running") {
+        const pending = data.status === "starting" || data.status === "stopping";
+        powerButton.classList.toggle("pending", pending);
+        if (data.status === "running" || data.status === "stopping") {
             powerButton.classList.replace("off", "on");
             powerButton.setAttribute("data-tooltip", "Stop Server");
-            uploadButton.classList.add("disabled");
-            uploadButton.setAttribute("disabled", "true");
         } else {
             powerButton.classList.replace("on", "off");
             powerButton.setAttribute("data-tooltip", "Start Server");
+        }
+
+        if (data.status === "stopped") {
             uploadButton.classList.remove("disabled");
             uploadButton.removeAttribute("disabled");
+        } else {
+            uploadButton.classList.add("disabled");
+            uploadButton.setAttribute("disabled", "true");
+        }
+
+        if (data.allowed_filenames) {
+            uploadButton.setAttribute("data-tooltip", data.allowed_filenames.join(" "));
+        }
+
+        const label = data.status.charAt(0).toUpperCase() + data.status.slice(1);
+        statusText.textContent = data.status === "running" ? `${label} (uptime ${data.uptime})` : label;
+
+        const placementText = document.getElementById("placement-text");
+        const placement = data.status === "running" ? data.placement : null;
+        placementText.textContent = placement
+            ? `Cores ${placement.cpu_affinity ? formatCores(placement.cpu_affinity) : "all"}, ${placement.cpu_priority.replace("_", " ")} priority`
+            : "";
+
+        if ("mission" in data) {
+            updateMissionText(data.mission);
+        }
+    };
+
+    // Show the staged mission file and the result of its check
+    const updateMissionText = (mission) => {
+        const missionText = document.getElementById("mission-text");
+        if (!missionText) {
+            return;
+        }
+        missionText.classList.toggle("invalid", mission?.state === "invalid");
+        if (!mission) {
+            missionText.textContent = "";
+        } else if (mission.state === "checking") {
+            missionText.textContent = `Checking ${mission.filename}…`;
+        } else if (mission.state === "invalid") {
+            missionText.textContent = `${mission.filename} is invalid: ${mission.error}`;
+        } else {
+            const { blue, red } = mission.coalitions;
+            const time = mission.start_time != null
+                ? ` ${String(Math.floor(mission.start_time / 3600) % 24).padStart(2, "0")}:${String(Math.floor(mission.start_time / 60) % 60).padStart(2, "0")}`
+                : "";
+            missionText.textContent = `${mission.filename}: ${mission.theatre}, ${mission.date}${time}`
+                + ` · ${blue?.flights ?? 0} blue / ${red?.flights ?? 0} red flights`;
+        }
+    };
+
+    // Format a list of cores as ranges, e.g. "0-3,6"
+    const formatCores = (cores) => {
+        const ranges = [];
+        for (const core of cores) {
+            const last = ranges[ranges.length - 1];
+            if (last && core === last[1] + 1) {
+                last[1] = core;
+            } else {
+                ranges.push([core, core]);
+            }
+        }
+        return ranges.map(([a, b]) => (a === b ? `${a}` : `${a}-${b}`)).join(",");
+    };
+
+    const EVENTS_RECONNECT_DELAY = 5000; // ms
+    let eventsController = null;
+    const jobWaiters = new Map();
+
+    // Handle one server-sent event
+    const handleServerEvent = (event, data) => {
+        if (data.instance && currentInstance && data.instance !== currentInstance) {
+            return; // status, uptime and state events of another instance
+        }
+        if (event === "status") {
+            serverInfo = { ...serverInfo, ...data };
+            updateUIWithServerStatus(serverInfo);
+        } else if (event === "uptime") {
+            serverInfo.uptime = data.uptime;
+            updateUIWithServerStatus(serverInfo);
+        } else if (event === "job") {
+            const resolve = jobWaiters.get(data.id);
+            if (resolve && (data.state === "succeeded" || data.state === "failed")) {
+                jobWaiters.delete(data.id);
+                resolve(data);
+            }
+        } else if (event === "state") {
+            const downloadButton = document.getElementById("download-button");
+            if (downloadButton) {
+                downloadButton.setAttribute("data-tooltip", "state.json (new)");
+            }
+        } else if (event === "mission") {
+            serverInfo.mission = data.mission;
+            updateMissionText(data.mission);
+        } else if (event === "live") {
+            updateLiveText(data);
+        } else if (event === "frames") {
+            frameHistory.push(data);
+            frameHistory = frameHistory.slice(-FRAME_CHART_POINTS);
+            drawFrameChart();
+        }
+    };
+
+    const FRAME_CHART_POINTS = 180; // 30 minutes of 10 s summaries
+    let frameHistory = [];
+
+    // Load the recent frame-time summaries of the selected instance
+    const fetchFrames = () =>
+        fetch(`${apiBase()}/server/frames?seconds=1800`, { headers: { Authorization: getAuthHeader() } })
+            .then(handleFetchError)
+            .then((response) => response.json())
+            .then((data) => {
+                frameHistory = data.summaries.slice(-FRAME_CHART_POINTS);
+                drawFrameChart();
+            })
+            .catch((error) => console.error("Error fetching frame times:", error));
+
+    // Draw p50 and p95 frame times, scaled to at least 50 ms
+    const drawFrameChart = () => {
+        const container = document.getElementById("frame-container");
+        const canvas = document.getElementById("frame-chart");
+        if (!canvas) {
+            return;
+        }
+        container.hidden = frameHistory.length === 0;
+        if (!frameHistory.length) {
+            return;
+        }
+        const ctx = canvas.getContext("2d");
+        const top = Math.max(50, ...frameHistory.map((s) => s.p95));
+        const x = (i) => (i * canvas.width) / Math.max(1, FRAME_CHART_POINTS - 1);
+        const y = (ms) => canvas.height - (ms / top) * (canvas.height - 4);
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        for (const [field, color] of [["p50", "#48719D"], ["p95", "#C28A2C"]]) {
+            ctx.strokeStyle = color;
+            ctx.beginPath();
+            frameHistory.forEach((s, i) => (i ? ctx.lineTo(x(i), y(s[field])) : ctx.moveTo(x(i), y(s[field]))));
+            ctx.stroke();
+        }
+        const last = frameHistory[frameHistory.length - 1];
+        document.getElementById("frame-text").textContent =
+            `Frame time p50 ${last.p50.toFixed(1)} ms, p95 ${last.p95.toFixed(1)} ms · ${last.tick_rate.toFixed(0)} fps`;
+    };
+
+    // Show the live mission summary reported by the DCS hook
+    const updateLiveText = (live) => {
+        const liveText = document.getElementById("live-text");
+        if (!liveText) {
+            return;
+        }
+        liveText.textContent = live
+            ? `${live.players.length} player(s) · kills blue ${live.kills.blue} / red ${live.kills.red} · ${live.captures} base capture(s)`
+            : "";
+    };
+
+    // Subscribe to the server event stream, reconnecting when it drops
+    const subscribeEvents = async () => {
+        if (eventsController) {
+            eventsController.abort();
+        }
+        const controller = new AbortController();
+        eventsController = controller;
+
+        try {
+            const response = await fetch("/api/v1/events", {
+                headers: { Authorization: getAuthHeader() },
+                signal: controller.signal,
+            });
+            handleFetchError(response);
+
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = "";
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffer += value;
+                let end;
+                while ((end = buffer.indexOf("\n\n")) >= 0) {
+                    const message = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+                    let event = "message";
+                    let data = "";
+                    for (const line of message.split("\n")) {
+                        if (line.startsWith("event: ")) {
+                            event = line.slice(7);
+                        } else if (line.startsWith("data: ")) {
+                            data += line.slice(6);
+                        }
+                    }
+                    if (data) {
+                        handleServerEvent(event, JSON.parse(data));
+                    }
+                }
+            }
+        } catch (error) {
+            if (controller.signal.aborted || error.message === "Unauthorized") {
+                return;
+            }
+            console.error("Event stream error:", error);
+        }
+        if (eventsController === controller) {
+            setTimeout(subscribeEvents, EVENTS_RECONNECT_DELAY);
+        }
+    };
+
+    const JOB_POLL_INTERVAL = 10000; // ms, fallback in case a job event is missed
+
+    // Wait until a background job has finished, alerting if it failed
+    const waitForJob = async (job) => {
+        while (job.state === "queued" || job.state === "running") {
+            const finished = await new Promise((resolve) => {
+                jobWaiters.set(job.id, resolve);
+                setTimeout(() => resolve(null), JOB_POLL_INTERVAL);
+            });
+            jobWaiters.delete(job.id);
+            if (finished) {
+                job = finished;
+                continue;
+            }
+            const response = await fetch(`/api/v1/jobs/${job.id}`, {
+                headers: { Authorization: getAuthHeader() },
+            });
+            handleFetchError(response);
+            job = await response.json();
+        }
+        if (job.state === "failed") {
+            alert(job.error || `Failed to ${job.action} the server.`);
         }
+        return job;
+    };
 
-        uploadButton.setAttribute("data-tooltip", data.allowed_filenames.join(" "));
+    // Load a partial: inlined in the page as a <template> when served built, fetched otherwise
+    const loadPartial = (name) => {
+        const template = document.getElementById(`partial-${name}`);
+        if (template) {
+            return Promise.resolve(template.innerHTML);
+        }
+        return fetch(`/partials/${name}.html`).then((response) => response.text());
     };
 
     // Render the login UI
     const renderLoginUI = () => {
-        fetch("/partials/login.html")
-            .then((response) => response.text())
+        if (eventsController) {
+            eventsController.abort();
+            eventsController = null;
+        }
+        loadPartial("login")
             .then((html) => {
                 appContainer.innerHTML = html;
 
@@ -101,14 +348,51 @@ document.addEventListener("DOMContentLoaded", () => {
             .catch((error) => console.error("Error loading login UI:", error));
     };
 
+    // Fill the instance selector; it stays hidden when only one instance is configured
+    const setupInstanceSelect = async () => {
+        const select = document.getElementById("instance-select");
+        try {
+            const response = await fetch("/api/v1/instances", {
+                headers: { Authorization: getAuthHeader() },
+            });
+            handleFetchError(response);
+            const { instances } = await response.json();
+            if (!instances.some((instance) => instance.instance === currentInstance)) {
+                currentInstance = instances[0].instance;
+                localStorage.setItem("instance", currentInstance);
+                fetchAndUpdateStatus();
+            }
+            select.replaceChildren(...instances.map((instance) => new Option(instance.instance, instance.instance)));
+            select.value = currentInstance;
+            select.hidden = instances.length < 2;
+        } catch (error) {
+            console.error("Error listing instances:", error);
+            return;
+        }
+
+        select.addEventListener("change", () => {
+            currentInstance = select.value;
+            localStorage.setItem("instance", currentInstance);
+            document.getElementById("download-button").setAttribute("data-tooltip", "state.json");
+            updateLiveText(null);
+            fetchFrames();
+            fetchAndUpdateStatus();
+            fetch(`${apiBase()}/live`, { headers: { Authorization: getAuthHeader() } })
+                .then((response) => (response.ok ? response.json() : null))
+                .then(updateLiveText)
+                .catch((error) => console.error("Error fetching live state:", error));
+        });
+    };
+
     // Render the control UI
     const renderControlUI = () => {
-        fetch("/partials/control.html")
-            .then((response) => response.text())
+        loadPartial("control")
             .then((html) => {
                 appContainer.innerHTML = html;
                 setupButtonListeners();
+                setupInstanceSelect().then(fetchFrames);
                 setTimeout(fetchAndUpdateStatus, 0); // Defer status update
+                subscribeEvents();
             })
             .catch((error) => console.error("Error loading control UI:", error));
     };
@@ -122,8 +406,11 @@ document.addEventListener("DOMContentLoaded", () => {
         const refreshButton = document.getElementById("refresh-button");
 
         powerButton.addEventListener("click", () => {
+            if (powerButton.classList.contains("pending")) {
+                return;
+            }
             const isOn = powerButton.classList.contains("on");
-            const action = isOn ? "/api/v1/server/stop" : "/api/v1/server/start";
+            const action = `${apiBase()}/server/${isOn ? "stop" : "start"}`;
 
             toggleRefreshSpinner(true);
             fetch(action, {
@@ -131,6 +418,8 @@ document.addEventListener("DOMContentLoaded", () => {
                 headers: { Authorization: getAuthHeader() },
             })
                 .then(handleFetchError)
+                .then((response) => response.json())
+                .then((data) => waitForJob(data.job))
                 .then(fetchAndUpdateStatus)
                 .catch((error) => console.error("Error toggling server power:", error))
                 .finally(() => toggleRefreshSpinner(false));
@@ -151,7 +440,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
         downloadButton.addEventListener("click", () => {
             toggleRefreshSpinner(true);
-            fetch("/api/v1/files/state.json", {
+            fetch(`${apiBase()}/files/state.json`, {
                 headers: { Authorization: getAuthHeader() },
             })
                 .then(handleFetchError)
@@ -165,6 +454,7 @@ document.addEventListener("DOMContentLoaded", () => {
                     a.click();
                     document.body.removeChild(a);
                     window.URL.revokeObjectURL(url);
+                    downloadButton.setAttribute("data-tooltip", "state.json");
                 })
                 .catch((error) => {
                     console.error("Error downloading file:", error);
@@ -192,16 +482,16 @@ document.addEventListener("DOMContentLoaded", () => {
             return;
         }
 
-        const formData = new FormData();
-        formData.append("file", file);
-
         toggleRefreshSpinner(true);
-        fetch("/api/v1/files/upload_miz", {
-            method: "POST",
-            body: formData,
-            headers: { Authorization: getAuthHeader() },
-        })
-            .then(handleFetchError)
+        uploadDelta(file)
+            .catch((error) => {
+                if (error.message === "Unauthorized") {
+                    throw error;
+                }
+                console.warn("Delta upload failed, uploading the full file:", error);
+                return false;
+            })
+            .then((uploaded) => uploaded || uploadResumable(file))
             .then(fetchAndUpdateStatus)
             .catch((error) => {
                 console.error("Error uploading file:", error);
@@ -210,6 +500,289 @@ document.addEventListener("DOMContentLoaded", () => {
             .finally(() => toggleRefreshSpinner(false));
     };
 
+    const UPLOAD_PARALLEL_CHUNKS = 3;
+    const UPLOAD_CHUNK_RETRIES = 5;
+
+    const SHA256_K = new Uint32Array([
+        0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+        0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+        0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+        0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+        0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+        0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+        0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+        0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+    ]);
+
+    // SHA-256 in plain JavaScript, for where WebCrypto is unavailable (it requires HTTPS or localhost)
+    const sha256Fallback = (buffer) => {
+        const h = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+        ]);
+        const w = new Uint32Array(64);
+        const rotr = (x, n) => (x >>> n) | (x << (32 - n));
+        const compress = (view, offset) => {
+            for (let i = 0; i < 16; i++) {
+                w[i] = view.getUint32(offset + i * 4);
+            }
+            for (let i = 16; i < 64; i++) {
+                const s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >>> 3);
+                const s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >>> 10);
+                w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+            }
+            let [a, b, c, d, e, f, g, hh] = h;
+            for (let i = 0; i < 64; i++) {
+                const t1 = (hh + (rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)) + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) | 0;
+                const t2 = ((rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+                hh = g;
+                g = f;
+                f = e;
+                e = (d + t1) | 0;
+                d = c;
+                c = b;
+                b = a;
+                a = (t1 + t2) | 0;
+            }
+            [a, b, c, d, e, f, g, hh].forEach((value, i) => { h[i] += value; });
+        };
+
+        // Whole blocks are read in place, only the padded tail is copied
+        const bytes = new Uint8Array(buffer);
+        const whole = bytes.length - (bytes.length % 64);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        for (let offset = 0; offset < whole; offset += 64) {
+            compress(view, offset);
+        }
+        const tail = new Uint8Array(bytes.length % 64 < 56 ? 64 : 128);
+        tail.set(bytes.subarray(whole));
+        tail[bytes.length - whole] = 0x80;
+        const tailView = new DataView(tail.buffer);
+        tailView.setUint32(tail.length - 8, Math.floor(bytes.length / 0x20000000));
+        tailView.setUint32(tail.length - 4, (bytes.length * 8) >>> 0);
+        for (let offset = 0; offset < tail.length; offset += 64) {
+            compress(tailView, offset);
+        }
+
+        const digest = new Uint8Array(32);
+        const digestView = new DataView(digest.buffer);
+        h.forEach((value, i) => digestView.setUint32(i * 4, value));
+        return digest;
+    };
+
+    // SHA-256 digest of an ArrayBuffer or typed array
+    const sha256 = async (buffer) => {
+        if (!window.crypto || !window.crypto.subtle) {
+            return sha256Fallback(buffer);
+        }
+        return new Uint8Array(await window.crypto.subtle.digest("SHA-256", buffer));
+    };
+
+    const toBase64 = (bytes) => btoa(String.fromCharCode(...bytes));
+
+    // Resume a previous session for the same file if the server still has it, otherwise open a new one
+    const openUploadSession = async (file, storageKey) => {
+        const savedId = localStorage.getItem(storageKey);
+        if (savedId) {
+            const response = await fetch(`${apiBase()}/files/uploads/${savedId}`, {
+                headers: { Authorization: getAuthHeader() },
+            });
+            if (response.ok) {
+                return response.json();
+            }
+            localStorage.removeItem(storageKey);
+        }
+
+        const response = await fetch(`${apiBase()}/files/uploads`, {
+            method: "POST",
+            headers: {
+                Authorization: getAuthHeader(),
+                "Content-Type": "application/json",
+            },
+            body: JSON.stringify({ filename: file.name, size: file.size }),
+        });
+        handleFetchError(response);
+        const session = await response.json();
+        localStorage.setItem(storageKey, session.id);
+        return session;
+    };
+
+    // Upload one chunk, retrying with backoff so a dropped connection only costs this chunk
+    const uploadChunk = async (file, session, index, digests) => {
+        const start = index * session.chunk_size;
+        const buffer = await file.slice(start, start + session.chunk_size).arrayBuffer();
+        const digest = await sha256(buffer);
+        const headers = { Authorization: getAuthHeader(), "Upload-Checksum": `sha256 ${toBase64(digest)}` };
+
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await fetch(`${apiBase()}/files/uploads/${session.id}/chunks/${index}`, {
+                    method: "PUT",
+                    headers,
+                    body: buffer,
+                });
+                handleFetchError(response);
+                digests[index] = digest;
+                return;
+            } catch (error) {
+                if (attempt >= UPLOAD_CHUNK_RETRIES || error.message === "Unauthorized") {
+                    throw error;
+                }
+                await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+            }
+        }
+    };
+
+    const DELTA_MAX_RATIO = 0.8; // fall back to a full upload when most of the archive is new
+    const ZIP_EOCD_SIGNATURE = 0x06054b50;
+    const ZIP_CENTRAL_SIGNATURE = 0x02014b50;
+
+    const toHex = (bytes) => Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+
+    // Read the zip central directory of a .miz, or return null if it cannot be used for a delta upload
+    const readZipEntries = async (file) => {
+        const tailSize = Math.min(file.size, 22 + 0xffff);
+        const tail = new DataView(await file.slice(file.size - tailSize).arrayBuffer());
+        let eocd = -1;
+        for (let i = tailSize - 22; i >= 0; i--) {
+            if (tail.getUint32(i, true) === ZIP_EOCD_SIGNATURE) {
+                eocd = i;
+                break;
+            }
+        }
+        if (eocd < 0) {
+            return null;
+        }
+
+        const count = tail.getUint16(eocd + 10, true);
+        const centralSize = tail.getUint32(eocd + 12, true);
+        const centralOffset = tail.getUint32(eocd + 16, true);
+        if (count === 0xffff || centralOffset === 0xffffffff) {
+            return null; // zip64
+        }
+
+        const central = new DataView(await file.slice(centralOffset, centralOffset + centralSize).arrayBuffer());
+        const decoder = new TextDecoder();
+        const entries = [];
+        let p = 0;
+        for (let i = 0; i < count; i++) {
+            if (central.getUint32(p, true) !== ZIP_CENTRAL_SIGNATURE) {
+                return null;
+            }
+            const nameLength = central.getUint16(p + 28, true);
+            entries.push({
+                name: decoder.decode(new Uint8Array(central.buffer, p + 46, nameLength)),
+                flags: central.getUint16(p + 8, true),
+                method: central.getUint16(p + 10, true),
+                dos_time: central.getUint16(p + 12, true),
+                dos_date: central.getUint16(p + 14, true),
+                crc32: central.getUint32(p + 16, true),
+                compress_size: central.getUint32(p + 20, true),
+                file_size: central.getUint32(p + 24, true),
+                offset: central.getUint32(p + 42, true),
+            });
+            p += 46 + nameLength + central.getUint16(p + 30, true) + central.getUint16(p + 32, true);
+        }
+
+        // The raw data starts after the local header, whose extra field may differ from the central one
+        for (const entry of entries) {
+            const local = new DataView(await file.slice(entry.offset, entry.offset + 30).arrayBuffer());
+            entry.dataStart = entry.offset + 30 + local.getUint16(26, true) + local.getUint16(28, true);
+        }
+        return entries;
+    };
+
+    // Upload only the .miz entries the server has not seen before, then let it rebuild the archive.
+    // Returns false when a delta upload is not possible or not worth it.
+    const uploadDelta = async (file) => {
+        const entries = await readZipEntries(file);
+        if (!entries) {
+            return false;
+        }
+
+        const dataOf = (entry) => file.slice(entry.dataStart, entry.dataStart + entry.compress_size);
+        for (const entry of entries) {
+            entry.digest = await sha256(await dataOf(entry).arrayBuffer());
+            entry.sha256 = toHex(entry.digest);
+        }
+        const manifest = JSON.stringify({
+            filename: file.name,
+            entries: entries.map(({ name, sha256, method, flags, crc32, compress_size, file_size, dos_time, dos_date }) => (
+                { name, sha256, method, flags, crc32, compress_size, file_size, dos_time, dos_date }
+            )),
+        });
+        const jsonHeaders = { Authorization: getAuthHeader(), "Content-Type": "application/json" };
+
+        const response = await fetch("/api/v1/files/delta/missing", {
+            method: "POST",
+            headers: jsonHeaders,
+            body: manifest,
+        });
+        handleFetchError(response);
+        const { missing, missing_bytes } = await response.json();
+        if (missing_bytes > file.size * DELTA_MAX_RATIO) {
+            return false;
+        }
+
+        if (missing.length) {
+            // Frame each missing entry as: 32-byte digest, 8-byte big-endian length, raw data
+            const wanted = new Set(missing);
+            const parts = [];
+            for (const entry of entries) {
+                if (wanted.delete(entry.sha256)) {
+                    const header = new DataView(new ArrayBuffer(40));
+                    entry.digest.forEach((b, i) => header.setUint8(i, b));
+                    header.setBigUint64(32, BigInt(entry.compress_size));
+                    parts.push(header.buffer, dataOf(entry));
+                }
+            }
+            handleFetchError(await fetch("/api/v1/files/delta/objects", {
+                method: "POST",
+                headers: { Authorization: getAuthHeader(), "Content-Type": "application/octet-stream" },
+                body: new Blob(parts),
+            }));
+        }
+
+        handleFetchError(await fetch(`${apiBase()}/files/delta/commit`, {
+            method: "POST",
+            headers: jsonHeaders,
+            body: manifest,
+        }));
+        return true;
+    };
+
+    // Upload a file through a resumable session, sending missing chunks in parallel
+    const uploadResumable = async (file) => {
+        const storageKey = `upload:${currentInstance || ""}:${file.name}:${file.size}:${file.lastModified}`;
+        const session = await openUploadSession(file, storageKey);
+        const digests = new Array(session.chunk_count).fill(null);
+
+        const pending = [...session.missing];
+        const worker = async () => {
+            while (pending.length) {
+                await uploadChunk(file, session, pending.shift(), digests);
+            }
+        };
+        await Promise.all(Array.from({ length: UPLOAD_PARALLEL_CHUNKS }, worker));
+
+        // Chunks sent before a resume are hashed from the local file, so the whole upload is verified
+        for (let index = 0; index < digests.length; index++) {
+            if (!digests[index]) {
+                const start = index * session.chunk_size;
+                digests[index] = await sha256(await file.slice(start, start + session.chunk_size).arrayBuffer());
+            }
+        }
+        const joined = new Uint8Array(digests.length * 32);
+        digests.forEach((digest, i) => joined.set(digest, i * 32));
+        const query = `?digest=${encodeURIComponent(toBase64(await sha256(joined)))}`;
+
+        const response = await fetch(`${apiBase()}/files/uploads/${session.id}/complete${query}`, {
+            method: "POST",
+            headers: { Authorization: getAuthHeader() },
+        });
+        handleFetchError(response);
+        localStorage.removeItem(storageKey);
+    };
+
     // Check authentication and render the appropriate UI
     const authHeader = getAuthHeader();
     if (!authHeader) {
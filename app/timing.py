@@ -0,0 +1,71 @@
+"""
+Lightweight timing of named phases, used to report where start/stop and
+application startup time is spent.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+
+class PhaseTimer:
+    """
+    Records the wall-clock duration of named phases, in the order they ran.
+    """
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Return the phase durations in milliseconds.
+        """
+        return {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+
+    def report(self) -> str:
+        return ", ".join(f"{name} {ms:.1f}ms" for name, ms in self.to_dict().items())
+
+
+class StartupReport:
+    """
+    Singleton-like record of cold-start costs: module imports and initialization phases,
+    measured from process creation until the app is ready to serve.
+    """
+    imports = PhaseTimer()
+    phases = PhaseTimer()
+    process_started: float = None
+    ready: float = None
+
+    @classmethod
+    def mark_ready(cls):
+        cls.ready = time.time()
+
+    @classmethod
+    def to_dict(cls) -> dict:
+        total = (cls.ready - cls.process_started) if cls.ready and cls.process_started else None
+        return {
+            "total_ms": round(total * 1000, 2) if total is not None else None,
+            "imports_ms": cls.imports.to_dict(),
+            "phases_ms": cls.phases.to_dict(),
+        }
+
+    @classmethod
+    def save(cls, path: Path):
+        """
+        Write the report as JSON, so cold-start times can be compared between releases.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"timestamp": cls.ready, **cls.to_dict()}, indent=2), encoding="utf-8")
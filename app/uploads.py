@@ -0,0 +1,269 @@
+"""
+Resumable, chunked uploads for large mission files.
+
+A client opens an upload session, sends fixed-size chunks by index (in any order,
+possibly in parallel), can ask which chunks are still missing after a dropped
+connection, and finally commits the session into the mission directory.
+"""
+
+import asyncio
+import hashlib
+import secrets
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.control import DCSControl, FileTooLargeError, Instances, UPLOAD_CHUNK_SIZE
+from app.logger import logger
+
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024  # bytes per chunk
+SESSION_TTL = 24 * 60 * 60  # seconds an idle upload session is kept
+EXPIRE_INTERVAL = 15 * 60  # seconds between checks for idle sessions
+MAX_SESSIONS_PER_USER = 4  # open sessions per user, the least recently used idle one is discarded
+
+
+class UploadError(Exception):
+    """
+    Raised when a chunk or commit request does not match the upload session.
+    """
+
+
+class UploadSession:
+    """
+    State of one resumable upload: the preallocated temp file and the chunks received so far.
+    """
+    def __init__(self, dcs: DCSControl, filename: str, size: int, user: str, path: Path):
+        self.id = secrets.token_urlsafe(16)
+        self.dcs = dcs
+        self.filename = filename
+        self.size = size
+        self.user = user
+        self.path = path
+        self.chunk_size = RESUMABLE_CHUNK_SIZE
+        self.chunk_count = max(1, -(-size // self.chunk_size))
+        self.digests: Dict[int, bytes] = {}
+        self.in_flight: set = set()
+        self.updated = time.monotonic()
+
+    def chunk_length(self, index: int) -> int:
+        if index == self.chunk_count - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(self.chunk_length(i) for i in self.digests)
+
+    @property
+    def missing(self) -> list:
+        return [i for i in range(self.chunk_count) if i not in self.digests]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "instance": self.dcs.name,
+            "filename": self.filename,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "chunk_count": self.chunk_count,
+            "received_bytes": self.received_bytes,
+            "missing": self.missing,
+        }
+
+
+class UploadManager:
+    """
+    Singleton-like registry of open upload sessions.
+    """
+    sessions: Dict[str, UploadSession] = {}
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def start(cls):
+        """
+        Delete partial files left by a previous run, and expire idle sessions periodically.
+        """
+        await run_in_threadpool(remove_stale_parts, [dcs.mission_dir for dcs in Instances.all()])
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            await asyncio.sleep(EXPIRE_INTERVAL)
+            try:
+                cls.expire()
+            except Exception as e:
+                logger.error(f"Error expiring upload sessions: {e}")
+
+    @classmethod
+    async def create(cls, dcs: DCSControl, filename: str, size: int, user: str, max_size: int = 0) -> UploadSession:
+        """
+        Open a new upload session and preallocate its temp file in the mission directory of `dcs`.
+        Past `MAX_SESSIONS_PER_USER`, the least recently used idle session of `user` is discarded.
+        Raises:
+            FileTooLargeError: If `size` exceeds `max_size` (0 to disable).
+            UploadError: If `user` already has `MAX_SESSIONS_PER_USER` sessions receiving chunks.
+        """
+        if max_size and size > max_size:
+            raise FileTooLargeError(f"Upload exceeds the limit of {max_size} bytes")
+        cls.expire()
+        own = sorted((s for s in cls.sessions.values() if s.user == user), key=lambda s: s.updated)
+        if len(own) >= MAX_SESSIONS_PER_USER:
+            idle = [s for s in own if not s.in_flight]
+            if not idle:
+                raise UploadError(f"Too many uploads in progress (at most {MAX_SESSIONS_PER_USER})")
+            logger.debug(f"Upload session {idle[0].id} discarded for a new upload of '{user}'")
+            cls.discard(idle[0])
+
+        def allocate() -> Path:
+            with tempfile.NamedTemporaryFile(
+                dir=dcs.mission_dir, prefix=f".{filename}.", suffix=".part", delete=False
+            ) as f:
+                f.truncate(size)
+                return Path(f.name)
+
+        session = UploadSession(dcs, filename, size, user, await run_in_threadpool(allocate))
+        cls.sessions[session.id] = session
+        logger.debug(f"Upload session {session.id} opened for '{filename}' ({size} bytes)")
+        return session
+
+    @classmethod
+    def get(cls, session_id: str, user: str, dcs: DCSControl) -> Optional[UploadSession]:
+        """
+        Return the session if it exists and belongs to `user` and the instance `dcs`.
+        """
+        session = cls.sessions.get(session_id)
+        if session is None or session.user != user or session.dcs is not dcs:
+            return None
+        return session
+
+    @classmethod
+    async def write_chunk(cls, session: UploadSession, index: int, chunks: AsyncIterator[bytes], checksum: bytes = None):
+        """
+        Stream one chunk into its slot of the temp file.
+        - The chunk must be exactly as long as its slot.
+        - If `checksum` (SHA-256 digest) is given, the chunk is only accepted when it matches.
+        Raises:
+            UploadError: On an invalid index, length or checksum, or a concurrent write of the same chunk.
+        """
+        if not 0 <= index < session.chunk_count:
+            raise UploadError(f"Chunk index {index} out of range")
+        if index in session.in_flight:
+            raise UploadError(f"Chunk {index} is already being uploaded")
+
+        expected = session.chunk_length(index)
+        digest = hashlib.sha256()
+        received = 0
+        session.in_flight.add(index)
+        session.digests.pop(index, None)
+        f = await run_in_threadpool(session.path.open, "r+b")
+        try:
+            await run_in_threadpool(f.seek, index * session.chunk_size)
+            buffer = bytearray()
+            async for data in chunks:
+                received += len(data)
+                if received > expected:
+                    raise UploadError(f"Chunk {index} is longer than {expected} bytes")
+                buffer += data
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    digest.update(buffer)
+                    await run_in_threadpool(f.write, bytes(buffer))
+                    buffer.clear()
+            digest.update(buffer)
+            await run_in_threadpool(f.write, bytes(buffer))
+        finally:
+            await run_in_threadpool(f.close)
+            session.in_flight.discard(index)
+            session.updated = time.monotonic()
+
+        if received != expected:
+            raise UploadError(f"Chunk {index} has {received} bytes, expected {expected}")
+        if checksum is not None and digest.digest() != checksum:
+            raise UploadError(f"Chunk {index} checksum mismatch")
+        session.digests[index] = digest.digest()
+
+    @classmethod
+    async def complete(cls, session: UploadSession, digest: bytes = None) -> str:
+        """
+        Verify the upload and commit it as the current mission file.
+        - `digest` is the SHA-256 of all chunk digests concatenated in order, if given.
+        Returns:
+            str: SHA-256 hex digest of the committed file.
+        Raises:
+            UploadError: If chunks are missing or the digest does not match.
+        """
+        if session.in_flight or session.missing:
+            raise UploadError(f"Upload incomplete, {len(session.missing)} chunk(s) missing")
+        chunk_digests = b"".join(session.digests[i] for i in range(session.chunk_count))
+        if digest is not None and hashlib.sha256(chunk_digests).digest() != digest:
+            cls.discard(session)
+            raise UploadError("Upload digest mismatch, the upload has been discarded")
+
+        # Take the session out of the registry first so a concurrent commit cannot race it
+        cls.sessions.pop(session.id, None)
+        try:
+            file_hash = await run_in_threadpool(hash_file, session.path)
+            await run_in_threadpool(session.dcs.commit_mission_file, session.path, session.filename)
+        except BaseException:
+            cls.sessions[session.id] = session
+            raise
+        return file_hash
+
+    @classmethod
+    def discard(cls, session: UploadSession):
+        """
+        Abort a session and delete its temp file.
+        """
+        cls.sessions.pop(session.id, None)
+        try:
+            session.path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not remove partial upload {session.path}: {e}")
+
+    @classmethod
+    def expire(cls):
+        """
+        Discard sessions that have been idle for longer than `SESSION_TTL`.
+        """
+        now = time.monotonic()
+        for session in list(cls.sessions.values()):
+            if not session.in_flight and now - session.updated > SESSION_TTL:
+                logger.debug(f"Upload session {session.id} expired")
+                cls.discard(session)
+
+
+def remove_stale_parts(directories: list):
+    """
+    Delete partial upload files older than `SESSION_TTL`, whose sessions were lost on restart.
+    """
+    cutoff = time.time() - SESSION_TTL
+    for directory in directories:
+        for path in Path(directory).glob(".*.part"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    logger.debug(f"Removed stale partial upload {path}")
+            except OSError as e:
+                logger.warning(f"Could not remove stale partial upload {path}: {e}")
+
+def hash_file(path: Path) -> str:
+    """
+    Return the SHA-256 hex digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
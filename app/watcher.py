@@ -0,0 +1,103 @@
+"""
+Background watchers that keep track of the DCS server processes.
+Status requests answer from the watchers' cached processes instead of scanning
+every process on the host.
+"""
+
+import threading
+import psutil
+from typing import Callable, Dict, List, Optional
+from app.control import DCSControl, Instances
+from app.logger import logger
+
+WATCH_INTERVAL = 5  # seconds between scans while DCS is not running
+
+
+class ProcessWatcher:
+    """
+    Singleton-like set of daemon threads, one per DCS instance, tracking its server process.
+    - While DCS is not running, it rescans the process list every `WATCH_INTERVAL` seconds.
+    - While DCS is running, it blocks on the process and notices the exit immediately.
+      A process started by the app is waited on through its handle, without any polling.
+    - `notify()` wakes it up early, e.g. right after a launch.
+    - Listeners are called from the watcher threads with the instance and its process when
+      one is found, and with None when it exits.
+    """
+    listeners: List[Callable[[DCSControl, Optional[psutil.Process]], None]] = []
+    _threads: Dict[str, threading.Thread] = {}
+    _wake: Dict[str, threading.Event] = {}
+    _stop = threading.Event()
+
+    @classmethod
+    def start(cls):
+        cls._stop.clear()
+        for dcs in Instances.all():
+            thread = cls._threads.get(dcs.name)
+            if thread and thread.is_alive():
+                continue
+            cls._wake[dcs.name] = threading.Event()
+            thread = threading.Thread(target=cls._run, args=(dcs,), name=f"dcs-watcher-{dcs.name}", daemon=True)
+            cls._threads[dcs.name] = thread
+            thread.start()
+        logger.debug("Process watchers started.")
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+        for wake in cls._wake.values():
+            wake.set()
+
+    @classmethod
+    def notify(cls, dcs: DCSControl = None):
+        """
+        Ask the watcher of `dcs` (or all watchers) to rescan now instead of at the next interval.
+        """
+        for name, wake in cls._wake.items():
+            if dcs is None or name == dcs.name:
+                wake.set()
+
+    @classmethod
+    def on_change(cls, callback: Callable[[DCSControl, Optional[psutil.Process]], None]):
+        """
+        Register a callback for DCS process starts and exits.
+        """
+        cls.listeners.append(callback)
+
+    @classmethod
+    def _emit(cls, dcs: DCSControl, proc: Optional[psutil.Process]):
+        for callback in cls.listeners:
+            try:
+                callback(dcs, proc)
+            except Exception as e:
+                logger.error(f"Process watcher listener error: {e}")
+
+    @classmethod
+    def _run(cls, dcs: DCSControl):
+        wake = cls._wake[dcs.name]
+        while not cls._stop.is_set():
+            try:
+                proc = dcs.find_process(refresh=True)
+                if proc is not None:
+                    cls._emit(dcs, proc)
+                    cls._wait_for_exit(dcs, proc)
+                    cls._emit(dcs, None)
+                    continue
+            except Exception as e:
+                logger.error(f"[{dcs.name}] Process watcher error: {e}")
+            wake.wait(WATCH_INTERVAL)
+            wake.clear()
+
+    @classmethod
+    def _wait_for_exit(cls, dcs: DCSControl, proc: psutil.Process):
+        while not cls._stop.is_set():
+            try:
+                # Our own child: the OS reports its exit (and it gets reaped), no timeout needed
+                proc.wait(timeout=None if isinstance(proc, psutil.Popen) else WATCH_INTERVAL)
+            except psutil.TimeoutExpired:
+                continue
+            except psutil.Error:
+                pass
+            logger.debug(f"[{dcs.name}] DCS server process exited (PID: {proc.pid})")
+            if dcs.process is proc:
+                dcs.process = None
+            return
@@ -0,0 +1,3 @@
+"""
+Load test and benchmark harness of the remote app, see `python -m bench --help`.
+"""
@@ -0,0 +1,160 @@
+"""
+Load test and benchmark of the remote app, with a stand-in DCS server (Linux).
+
+    python -m bench                      # full profile, compared with its baseline
+    python -m bench --profile quick      # smaller sizes and durations, e.g. for CI
+    python -m bench --save-baseline      # store the results as the new baseline
+
+The app is started with uvicorn in a generated tree (DCS installation, Saved Games folder,
+config.yaml) in a temporary directory, so nothing of the local setup is used or touched.
+Results are printed and written as JSON; when a baseline exists for the platform and
+profile, latencies, throughput and peak RSS worse than the baseline by more than the
+tolerance are reported as regressions and the exit code is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from bench.fixtures import MISSION_FILENAME, build_tree, write_miz, write_state_json
+from bench.scenarios import AppServer, PeakRss, large_uploads, start_stop_cycles, state_downloads, status_polling
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+SCENARIOS = ("status", "upload", "download", "startstop")
+PROFILES = {
+    "full": {"clients": 16, "duration": 10, "state_mb": 20, "upload_mb": 50, "uploads": 5, "downloads": 48, "cycles": 5},
+    "quick": {"clients": 8, "duration": 3, "state_mb": 5, "upload_mb": 10, "uploads": 3, "downloads": 16, "cycles": 2},
+}
+# Compared metrics: True when higher is better
+COMPARED = {"ready_ms": False, "p50_ms": False, "p99_ms": False, "requests_per_s": True, "mb_per_s": True, "peak_rss_mb": False}
+MIN_LATENCY_DELTA_MS = 2  # latency changes below this are noise, whatever the ratio
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def run(scenarios, params: dict) -> dict:
+    """
+    Build the tree, start the app and run the scenarios in order.
+    Returns:
+        dict: {scenario: metrics}, with the peak RSS of the app during each scenario.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dcs-remote-bench-") as tmp:
+        work_dir = Path(tmp)
+        port = free_port()
+        tree = build_tree(work_dir, port)
+        write_state_json(tree["app_dir"] / "data" / "state.json", params["state_mb"])
+        write_miz(tree["missions"] / MISSION_FILENAME, 0.1)
+
+        server = AppServer(tree["app_dir"], port, params["state_mb"])
+        started = time.perf_counter()
+        server.start()
+        results["startup"] = {"ready_ms": round((time.perf_counter() - started) * 1000, 1)}
+        try:
+            for scenario in scenarios:
+                print(f"Running {scenario}...", file=sys.stderr)
+                with PeakRss(server.psutil_process) as rss:
+                    if scenario == "status":
+                        metrics = status_polling(port, params["clients"], params["duration"])
+                    elif scenario == "upload":
+                        metrics = large_uploads(port, work_dir, params["upload_mb"], params["uploads"])
+                    elif scenario == "download":
+                        metrics = state_downloads(port, params["clients"], params["downloads"])
+                    else:
+                        metrics = start_stop_cycles(port, params["cycles"])
+                results[scenario] = {**metrics, "peak_rss_mb": round(rss.peak / 1024 / 1024, 1)}
+        finally:
+            server.stop()
+    return results
+
+def flatten(metrics: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    List the metrics that are worse than the baseline by more than `tolerance` (a ratio).
+    """
+    regressions = []
+    for scenario, metrics in results.items():
+        base = flatten(baseline.get(scenario, {}))
+        for key, value in flatten(metrics).items():
+            higher_is_better = COMPARED.get(key.rsplit(".", 1)[-1])
+            old = base.get(key)
+            if higher_is_better is None or not value or not old:
+                continue
+            if higher_is_better:
+                worse = value < old * (1 - tolerance)
+            else:
+                worse = value > old * (1 + tolerance)
+                if key.endswith("_ms") and value - old < MIN_LATENCY_DELTA_MS:
+                    worse = False
+            if worse:
+                regressions.append(f"{scenario}.{key}: {old} -> {value}")
+    return regressions
+
+def print_report(results: dict):
+    for scenario, metrics in results.items():
+        print(f"{scenario}:")
+        for key, value in flatten(metrics).items():
+            print(f"  {key:<24} {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the DCS remote app with a stand-in DCS server.")
+    parser.add_argument("--profile", choices=PROFILES, default="full", help="sizes and durations of the scenarios")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"), help="results file")
+    parser.add_argument("--baseline", type=Path, help="baseline file (default: bench/baselines/<platform>-<profile>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression ratio (default: 0.25)")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    params = PROFILES[args.profile]
+
+    results = run(scenarios, params)
+    print_report(results)
+    report = {
+        "profile": args.profile,
+        "params": params,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+    baseline_path = args.baseline or BASELINE_DIR / f"{sys.platform}-{args.profile}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+    elif baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8"))["results"], args.tolerance)
+        if regressions:
+            print(f"Regressions against {baseline_path} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regression against {baseline_path}")
+    else:
+        print(f"No baseline at {baseline_path}, run with --save-baseline to create one")
@@ -0,0 +1,44 @@
+"""
+Stand-in for DCS_server.exe, started by the app through a generated executable shim.
+
+- Honors `-w <Saved Games folder>` like the real server (the app finds it by that argument).
+- Writes a synthetic state.json of `BENCH_STATE_MB` MB to the export directory the app
+  passes in `RETRIBUTION_EXPORT_DIR`, once the "mission" has loaded.
+- Exits cleanly on terminate (SIGTERM/SIGINT).
+"""
+
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from bench.fixtures import write_state_json
+
+PROCESS_NAME = "DCS_server.exe"
+MISSION_LOAD_TIME = 0.2  # seconds before the state.json is written
+
+
+def main():
+    # Let the app find the process by the name of the real executable (Linux)
+    try:
+        with open("/proc/self/comm", "w") as f:
+            f.write(PROCESS_NAME)
+    except OSError:
+        pass
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, lambda *_: sys.exit(0))
+
+    args = sys.argv[1:]
+    if "-w" not in args or args.index("-w") + 1 >= len(args):
+        sys.exit("usage: DCS_server.exe -w <Saved Games folder>")
+
+    time.sleep(MISSION_LOAD_TIME)
+    export_dir = os.environ.get("RETRIBUTION_EXPORT_DIR")
+    if export_dir:
+        write_state_json(Path(export_dir) / "state.json", float(os.environ.get("BENCH_STATE_MB", "1")), seed=os.getpid())
+    while True:
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
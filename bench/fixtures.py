@@ -0,0 +1,161 @@
+"""
+Generated files for the benchmark: a Saved Games tree and DCS installation with a stand-in
+`DCS_server.exe`, the app configuration, a synthetic state.json and .miz mission files.
+"""
+
+import json
+import os
+import random
+import stat
+import sys
+import zipfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+USERNAME = "bench"
+PASSWORD = "bench"
+MISSION_FILENAME = "retribution_nextturn.miz"
+
+SERVER_SETTINGS = """cfg =
+{
+    ["description"] = "Benchmark server",
+    ["require_pure_textures"] = true,
+    ["listStartIndex"] = 1,
+    ["missionList"] =
+    {
+    }, -- end of ["missionList"]
+    ["port"] = 10308,
+    ["name"] = "bench",
+} -- end of cfg
+"""
+
+MISSION_SCRIPTING = """--Initialization script for the Mission lua Environment (SSE)
+
+dofile('Scripts/ScriptingSystem.lua')
+
+--Sanitize Mission Scripting environment
+do
+\tsanitizeModule('os')
+\tsanitizeModule('io')
+\tsanitizeModule('lfs')
+\t_G['require'] = nil
+end
+"""
+
+EXE_SHIM = """#!{python}
+import sys
+sys.path.insert(0, {repo!r})
+from bench.fake_dcs import main
+main()
+"""
+
+
+def build_tree(work_dir: Path, port: int) -> dict:
+    """
+    Create the DCS installation, the Saved Games folder and the app working directory
+    (config.yaml, links to `app` and `resources`) under `work_dir`.
+    Returns:
+        dict: The paths of the tree.
+    """
+    install_dir = work_dir / "DCS World Server"
+    exe = install_dir / "bin" / "DCS_server.exe"
+    exe.parent.mkdir(parents=True)
+    exe.write_text(EXE_SHIM.format(python=sys.executable, repo=str(REPO_DIR)), encoding="utf-8")
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    (install_dir / "Scripts").mkdir()
+    (install_dir / "Scripts" / "MissionScripting.lua").write_text(MISSION_SCRIPTING, encoding="utf-8")
+
+    save_dir = work_dir / "Saved Games" / "DCS.bench_server"
+    for folder in ("Config", "Missions", "Scripts/Hooks"):
+        (save_dir / folder).mkdir(parents=True)
+    (save_dir / "Config" / "serverSettings.lua").write_text(SERVER_SETTINGS, encoding="utf-8")
+
+    app_dir = work_dir / "app_root"
+    app_dir.mkdir()
+    for name in ("app", "resources"):
+        os.symlink(REPO_DIR / name, app_dir / name, target_is_directory=True)
+    config = {
+        "server": {
+            "name": "main",
+            "dcs_mission_dir": str(save_dir / "Missions"),
+            "dcs_server_exe": str(exe),
+            "cpu_affinity": "all",
+            "cpu_priority": "normal",
+        },
+        "users": [{"username": USERNAME, "password": PASSWORD}],
+        "app": {
+            "host": "127.0.0.1",
+            "port": port,
+            "allowed_max_size": 0,
+            "rate_limits": {"control": 0, "upload": 0, "read": 0, "static": 0},
+            "hook_port": 0,
+        },
+    }
+    # JSON is valid YAML
+    (app_dir / "config.yaml").write_text(json.dumps(config, indent=2), encoding="utf-8")
+    return {"app_dir": app_dir, "exe": exe, "save_dir": save_dir, "missions": save_dir / "Missions"}
+
+def write_state_json(path: Path, size_mb: float, seed: int = 0):
+    """
+    Write a synthetic Retribution/Liberation state.json of about `size_mb` MB.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    units, size = [], 0
+    while size < target:
+        unit = {
+            "id": rng.randrange(1 << 30),
+            "type": rng.choice(("F-16C_50", "FA-18C_hornet", "Su-27", "MiG-29A", "T-72B", "SA-11 Buk LN 9A310M1")),
+            "position": {"x": rng.uniform(-5e5, 5e5), "y": rng.uniform(-5e5, 5e5), "z": rng.uniform(0, 1e4)},
+            "health": rng.random(),
+        }
+        units.append(unit)
+        size += 160
+    state = {
+        "won": False,
+        "mission_ended": True,
+        "turn": seed,
+        "base_capture_events": [],
+        "killed_aircrafts": [u["id"] for u in units[::50]],
+        "killed_ground_units": [u["id"] for u in units[1::50]],
+        "destroyed_objects_positions": units,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+def mission_lua(flights: int) -> str:
+    groups = "".join(
+        f"""                        [{i}] = {{
+                            ["name"] = "Flight {i}",
+                            ["units"] = {{ [1] = {{ ["type"] = "F-16C_50", ["skill"] = "Client", ["unitId"] = {i} }} }},
+                        }},
+"""
+        for i in range(1, flights + 1)
+    )
+    country = f"""{{ [1] = {{ ["id"] = 2, ["name"] = "USA", ["plane"] = {{ ["group"] = {{
+{groups}                    }} }} }} }}"""
+    return f"""mission =
+{{
+    ["date"] = {{ ["Day"] = 21, ["Year"] = 2004, ["Month"] = 6 }},
+    ["theatre"] = "Caucasus",
+    ["start_time"] = 28800,
+    ["coalition"] = {{
+        ["blue"] = {{ ["name"] = "blue", ["country"] = {country} }},
+        ["red"] = {{ ["name"] = "red", ["country"] = {{}} }},
+    }},
+}}
+"""
+
+def write_miz(path: Path, size_mb: float, seed: int = 0, flights: int = 40):
+    """
+    Write a valid .miz of about `size_mb` MB: a small mission plus an incompressible
+    kneeboard image, like the bulk of a real campaign mission.
+    """
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mission", mission_lua(flights))
+        archive.writestr("options", "options = {}")
+        archive.writestr("l10n/DEFAULT/dictionary", 'dictionary = {["DictKey_sortie_5"] = "Benchmark"}')
+        archive.writestr("KNEEBOARD/IMAGES/bench.png", rng.randbytes(int(size_mb * 1024 * 1024)), zipfile.ZIP_STORED)
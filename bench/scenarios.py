@@ -0,0 +1,272 @@
+"""
+Benchmark scenarios, run against the app served by uvicorn in a subprocess.
+
+Each scenario returns its latency percentiles (ms), throughput and error count; peak RSS of
+the app process is measured around every scenario.
+"""
+
+import base64
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+import psutil
+from bench.fixtures import MISSION_FILENAME, PASSWORD, USERNAME, write_miz
+
+AUTH_HEADER = "Basic " + base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()
+RSS_SAMPLE_INTERVAL = 0.02  # seconds
+JOB_POLL_INTERVAL = 0.02  # seconds
+
+
+def percentiles(samples: List[float]) -> dict:
+    """
+    Return the p50/p90/p99/max of latencies in seconds, in milliseconds.
+    """
+    if not samples:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99), "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+class Client:
+    """
+    Keep-alive HTTP client of one benchmark worker (stdlib only).
+    """
+    def __init__(self, port: int):
+        self.port = port
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        """
+        Send a request and read the whole response.
+        Returns:
+            tuple: (status, body bytes, response headers)
+        """
+        headers = {"Authorization": AUTH_HEADER, **(headers or {})}
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # The server closed the kept-alive connection, retry once on a new one
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        return response.status, response.read(), response.headers
+
+    def json(self, method: str, path: str) -> dict:
+        status, body, _ = self.request(method, path)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} failed with {status}: {body[:200]!r}")
+        return json.loads(body)
+
+    def close(self):
+        self.conn.close()
+
+
+class AppServer:
+    """
+    The app served by uvicorn in a subprocess of the benchmark, in the generated tree.
+    """
+    def __init__(self, app_dir: Path, port: int, state_mb: float):
+        self.app_dir = app_dir
+        self.port = port
+        self.state_mb = state_mb
+        self.process: Optional[subprocess.Popen] = None
+        self.psutil_process: Optional[psutil.Process] = None
+
+    def start(self, timeout: float = 60):
+        env = dict(os.environ, BENCH_STATE_MB=str(self.state_mb), PYTHONPATH=str(self.app_dir))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory",
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        self.psutil_process = psutil.Process(self.process.pid)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"The app exited on startup:\n{self.process.stderr.read().decode(errors='replace')}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                conn.request("GET", "/")
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("The app did not start in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class PeakRss:
+    """
+    Peak resident memory of the app process during a scenario, sampled in a thread.
+    On Linux the kernel's own high-water mark (VmHWM) is reset first and used as well.
+    """
+    def __init__(self, process: psutil.Process):
+        self.process = process
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._kernel_peak = False
+
+    def __enter__(self):
+        try:
+            Path(f"/proc/{self.process.pid}/clear_refs").write_text("5")
+            self._kernel_peak = True
+        except OSError:
+            pass
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if self._kernel_peak:
+            for line in Path(f"/proc/{self.process.pid}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    self.peak = max(self.peak, int(line.split()[1]) * 1024)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            try:
+                self.peak = max(self.peak, self.process.memory_info().rss)
+            except psutil.Error:
+                return
+
+
+def run_workers(port: int, workers: int, work: Callable[[Client], List[float]]) -> List[float]:
+    """
+    Run `work` in `workers` threads, each with its own client, and collect their latencies.
+    """
+    def worker():
+        client = Client(port)
+        try:
+            return work(client)
+        finally:
+            client.close()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = [pool.submit(worker) for _ in range(workers)]
+        return [latency for result in results for latency in result.result()]
+
+
+def status_polling(port: int, clients: int, duration: float) -> dict:
+    """
+    `clients` concurrent clients polling `/api/v1/status` for `duration` seconds.
+    """
+    errors = []
+    deadline = time.monotonic() + duration
+
+    def work(client: Client) -> List[float]:
+        latencies = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status, _, _ = client.request("GET", "/api/v1/status")
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+        return latencies
+
+    start = time.perf_counter()
+    latencies = run_workers(port, clients, work)
+    elapsed = time.perf_counter() - start
+    return {**percentiles(latencies), "requests": len(latencies), "requests_per_s": round(len(latencies) / elapsed, 1), "errors": len(errors)}
+
+
+def large_uploads(port: int, work_dir: Path, size_mb: float, count: int) -> dict:
+    """
+    `count` sequential raw uploads of a `size_mb` MB mission file, each with different content.
+    """
+    files = []
+    for i in range(count):
+        path = work_dir / f"upload_{i}.miz"
+        write_miz(path, size_mb, seed=i)
+        files.append(path)
+
+    client = Client(port)
+    latencies, sent, errors = [], 0, 0
+    start = time.perf_counter()
+    for path in files:
+        data = path.read_bytes()
+        begin = time.perf_counter()
+        status, _, _ = client.request(
+            "POST", f"/api/v1/files/upload_miz?filename={MISSION_FILENAME}", body=data,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        latencies.append(time.perf_counter() - begin)
+        sent += len(data)
+        errors += status != 200
+    elapsed = time.perf_counter() - start
+    client.close()
+    return {**percentiles(latencies), "uploads": count, "mb_per_s": round(sent / 1024 / 1024 / elapsed, 1), "errors": errors}
+
+
+def state_downloads(port: int, clients: int, count: int) -> dict:
+    """
+    `clients` concurrent clients downloading state.json (gzip accepted) `count` times in total.
+    """
+    errors = []
+    per_client = max(1, count // clients)
+    received = [0] * clients
+    index = iter(range(clients))
+
+    def work(client: Client) -> List[float]:
+        me = next(index)
+        latencies = []
+        for _ in range(per_client):
+            start = time.perf_counter()
+            status, body, _ = client.request("GET", "/api/v1/files/state.json", headers={"Accept-Encoding": "gzip"})
+            latencies.append(time.perf_counter() - start)
+            received[me] += len(body)
+            if status != 200:
+                errors.append(status)
+        return latencies
+
+    start = time.perf_counter()
+    latencies = run_workers(port, clients, work)
+    elapsed = time.perf_counter() - start
+    return {
+        **percentiles(latencies), "downloads": len(latencies),
+        "mb_per_s": round(sum(received) / 1024 / 1024 / elapsed, 1), "errors": len(errors),
+    }
+
+
+def start_stop_cycles(port: int, cycles: int) -> dict:
+    """
+    `cycles` start/stop cycles of the stand-in DCS server, each timed until its job finished.
+    """
+    client = Client(port)
+
+    def run_job(action: str) -> float:
+        start = time.perf_counter()
+        job = client.json("POST", f"/api/v1/server/{action}")["job"]
+        while job["state"] not in ("succeeded", "failed"):
+            time.sleep(JOB_POLL_INTERVAL)
+            job = client.json("GET", f"/api/v1/jobs/{job['id']}")
+        if job["state"] == "failed":
+            raise RuntimeError(f"Server {action} failed: {job['error']}")
+        return time.perf_counter() - start
+
+    starts, stops = [], []
+    for _ in range(cycles):
+        starts.append(run_job("start"))
+        stops.append(run_job("stop"))
+    client.close()
+    return {"cycles": cycles, "start": percentiles(starts), "stop": percentiles(stops)}
@@ -2,6 +2,178 @@ if RetCtrl then return end
 
 RetCtrl = {}
 
+---Report to the remote app over UDP on localhost (port from RETRIBUTION_REMOTE_HOOK_PORT)
+local udp = nil
+local instanceName = os.getenv("RETRIBUTION_REMOTE_INSTANCE")
+local hookPort = tonumber(os.getenv("RETRIBUTION_REMOTE_HOOK_PORT") or "")
+if hookPort and hookPort > 0 then
+    package.path = package.path .. ";" .. lfs.currentdir() .. "/LuaSocket/?.lua"
+    package.cpath = package.cpath .. ";" .. lfs.currentdir() .. "/LuaSocket/?.dll"
+    local ok, socket = pcall(require, "socket")
+    if ok then
+        udp = socket.udp()
+        udp:settimeout(0)
+        udp:setpeername("127.0.0.1", hookPort)
+    else
+        log.error("Retribution Remote Control: LuaSocket not available, not reporting to the remote app")
+    end
+end
+
+---@param message table
+local function send(message)
+    if udp then
+        message.instance = instanceName
+        udp:send(net.lua2json(message))
+    end
+end
+
+---Connected players (ID to name), excluding the server itself
+local players = {}
+
+---Game events are batched: one datagram per EVENT_BATCH_SIZE events, or per
+---EVENT_FLUSH_INTERVAL seconds when fewer are pending
+local EVENT_BATCH_SIZE = 20
+local EVENT_FLUSH_INTERVAL = 1
+local CAPTURE_POLL_INTERVAL = 5
+local pendingEvents = {}
+local batchSeq = 0
+local lastFlush = 0
+local lastCapturePoll = 0
+
+local function flushEvents()
+    lastFlush = DCS.getRealTime()
+    if #pendingEvents == 0 then return end
+    batchSeq = batchSeq + 1
+    send({ type = "events", seq = batchSeq, events = pendingEvents })
+    pendingEvents = {}
+end
+
+---@param event table
+local function pushEvent(event)
+    if not udp then return end
+    event.t = DCS.getModelTime()
+    pendingEvents[#pendingEvents + 1] = event
+    if #pendingEvents >= EVENT_BATCH_SIZE then
+        flushEvents()
+    end
+end
+
+---@param playerID integer|nil
+---@return string|nil
+local function playerName(playerID)
+    if not playerID or playerID < 0 then return nil end
+    return players[playerID] or net.get_player_info(playerID, "name")
+end
+
+---Frame-time telemetry: every frame is counted into a fixed histogram (upper bounds in ms,
+---plus an overflow bucket) and one summary is sent per FRAME_REPORT_INTERVAL seconds,
+---so a frame only costs a few comparisons
+local FRAME_REPORT_INTERVAL = 10
+local FRAME_BUCKETS = { 2, 4, 6, 8, 10, 12, 14, 17, 20, 25, 33, 40, 50, 67, 100, 150, 250, 500, 1000 }
+local frameCounts = {}
+local frameCount, frameSum, frameMax = 0, 0, 0
+local lastFrame, frameWindowStart = nil, nil
+
+local function resetFrames()
+    for i = 1, #FRAME_BUCKETS + 1 do
+        frameCounts[i] = 0
+    end
+    frameCount, frameSum, frameMax = 0, 0, 0
+end
+resetFrames()
+
+---Frame time (ms) at quantile `q`, interpolated within its histogram bucket
+---@param q number
+---@return number
+local function frameQuantile(q)
+    local target = q * frameCount
+    local seen = 0
+    for i = 1, #FRAME_BUCKETS + 1 do
+        local count = frameCounts[i]
+        if count > 0 and seen + count >= target then
+            local low = FRAME_BUCKETS[i - 1] or 0
+            local high = math.min(FRAME_BUCKETS[i] or frameMax, frameMax)
+            return low + math.max(high - low, 0) * (target - seen) / count
+        end
+        seen = seen + count
+    end
+    return frameMax
+end
+
+---@param now number real time in seconds
+local function recordFrame(now)
+    if lastFrame then
+        local ms = (now - lastFrame) * 1000
+        local i = 1
+        while i <= #FRAME_BUCKETS and ms > FRAME_BUCKETS[i] do
+            i = i + 1
+        end
+        frameCounts[i] = frameCounts[i] + 1
+        frameCount = frameCount + 1
+        frameSum = frameSum + ms
+        if ms > frameMax then frameMax = ms end
+    else
+        frameWindowStart = now
+    end
+    lastFrame = now
+
+    local elapsed = now - frameWindowStart
+    if elapsed >= FRAME_REPORT_INTERVAL then
+        if frameCount > 0 then
+            send({
+                type = "frames",
+                interval = elapsed,
+                frames = frameCount,
+                tick_rate = frameCount / elapsed,
+                p50 = frameQuantile(0.5),
+                p95 = frameQuantile(0.95),
+                max = frameMax,
+                avg = frameSum / frameCount,
+                buckets = frameCounts,
+            })
+        end
+        resetFrames()
+        frameWindowStart = now
+    end
+end
+
+---Base captures are only visible to mission scripts: a world event handler installed in the
+---mission scripting environment queues them, and the hook drains the queue periodically
+local CAPTURE_HANDLER = [[
+if not RetRemoteCaptures then
+    RetRemoteCaptures = {}
+    world.addEventHandler({ onEvent = function(self, event)
+        if event.id == world.event.S_EVENT_BASE_CAPTURED and event.place then
+            RetRemoteCaptures[#RetRemoteCaptures + 1] = event.place:getName() .. "|" .. event.place:getCoalition()
+        end
+    end })
+end
+]]
+local CAPTURE_DRAIN = [[
+local drained = table.concat(RetRemoteCaptures or {}, "\n")
+RetRemoteCaptures = {}
+return drained
+]]
+
+local function pollCaptures()
+    local ok, drained = pcall(net.dostring_in, "server", CAPTURE_DRAIN)
+    if not ok or type(drained) ~= "string" then return end
+    for line in drained:gmatch("[^\n]+") do
+        local base, side = line:match("^(.*)|(%d+)$")
+        if base then
+            pushEvent({ kind = "base_captured", base = base, side = tonumber(side) })
+        end
+    end
+end
+
+local function sendPlayerCount()
+    local count = 0
+    for _ in pairs(players) do
+        count = count + 1
+    end
+    send({ type = "players", count = count })
+end
+
 ---Chat commands to control the server
 ---@param playerID integer
 ---@param message string
@@ -17,5 +189,72 @@ function RetCtrl.onPlayerTrySendChat(playerID, message, all)
     end
 end
 
+---@param playerID integer
+function RetCtrl.onPlayerConnect(playerID)
+    if playerID == net.get_server_id() then return end
+    players[playerID] = net.get_player_info(playerID, "name") or ""
+    sendPlayerCount()
+    pushEvent({ kind = "join", id = playerID, player = players[playerID] })
+end
+
+---@param playerID integer
+function RetCtrl.onPlayerDisconnect(playerID)
+    local name = players[playerID]
+    players[playerID] = nil
+    sendPlayerCount()
+    pushEvent({ kind = "leave", id = playerID, player = name })
+end
+
+---Forward the game events of the server (arguments as documented for onGameEvent)
+---@param eventName string
+function RetCtrl.onGameEvent(eventName, arg1, arg2, arg3, arg4, arg5, arg6, arg7)
+    if eventName == "kill" then
+        pushEvent({
+            kind = "kill",
+            killer = playerName(arg1), killer_unit = arg2, killer_side = arg3,
+            victim = playerName(arg4), victim_unit = arg5, victim_side = arg6,
+            weapon = arg7,
+        })
+    elseif eventName == "crash" or eventName == "eject" or eventName == "pilot_death" then
+        pushEvent({ kind = eventName, player = playerName(arg1) })
+    elseif eventName == "takeoff" or eventName == "landing" then
+        pushEvent({ kind = eventName, player = playerName(arg1), airbase = arg3 })
+    elseif eventName == "change_slot" then
+        pushEvent({ kind = "change_slot", player = playerName(arg1), side = net.get_player_info(arg1, "side") })
+    elseif eventName == "mission_end" then
+        pushEvent({ kind = "mission_end", winner = arg1 })
+        flushEvents()
+    end
+end
+
+function RetCtrl.onSimulationStart()
+    players = {}
+    sendPlayerCount()
+    if udp then
+        pcall(net.dostring_in, "server", CAPTURE_HANDLER)
+    end
+    pushEvent({ kind = "mission_start" })
+    flushEvents()
+    resetFrames()
+    lastFrame = nil
+end
+
+function RetCtrl.onSimulationFrame()
+    if not udp then return end
+    local now = DCS.getRealTime()
+    recordFrame(now)
+    if now - lastCapturePoll >= CAPTURE_POLL_INTERVAL then
+        lastCapturePoll = now
+        pollCaptures()
+    end
+    if now - lastFlush >= EVENT_FLUSH_INTERVAL then
+        flushEvents()
+    end
+end
+
+function RetCtrl.onSimulationStop()
+    flushEvents()
+end
+
 DCS.setUserCallbacks(RetCtrl)
-log.info("Retribution Remote Control Script loaded")
\ No newline at end of file
+log.info("Retribution Remote Control Script loaded")